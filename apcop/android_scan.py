@@ -1,28 +1,168 @@
-import pathlib, re, xml.etree.ElementTree as ET
+import io, pathlib, xml.etree.ElementTree as ET
+from .cache import FactCache, cache_or_none, extract_entries, fingerprint
+from .gradle import APPLICATION_PLUGINS, CatalogIndex, is_test_configuration, parse_build_file, parse_catalog, parse_lockfile
+from .timings import phase_of
+from .walk import DEFAULT_PRUNE, collect_files
 
-def scan_android(project_path: str):
-    root = pathlib.Path(project_path)
-    facts = {"platform":"android","permissions":[],"targetsdk":None,"deps":[]}
+# Bump whenever extract_file's output changes, to invalidate on-disk caches.
+EXTRACTOR_VERSION = 3
+
+GRADLE_NAMES = ("build.gradle", "build.gradle.kts")
+CATALOG_SUFFIX = ".versions.toml"
+
+def classify(name: str):
+    """Return the handler kind for a file name, or None if scan_android ignores it."""
+    if name == "AndroidManifest.xml":
+        return "manifest"
+    if name in GRADLE_NAMES:
+        return "gradle"
+    if name.endswith(CATALOG_SUFFIX):
+        return "catalog"
+    if name == "gradle.lockfile":
+        return "lockfile"
+    return None
 
-    for mf in root.rglob("AndroidManifest.xml"):
+def _read_text(path, data=None):
+    return pathlib.Path(path).read_text(encoding="utf-8", errors="ignore") if data is None else data.decode("utf-8", errors="ignore")
+
+def extract_file(kind: str, path, tokens=(), data=None) -> dict:
+    """
+    Extract the facts a single file contributes; merged later by `aggregate`.
+    Same signature as ios_scan.extract_file; no symbols are searched, so
+    `tokens` is ignored.
+    """
+    if kind == "manifest":
+        perms = set()
         try:
-            tree = ET.parse(mf)
-            for uses_perm in tree.findall(".//uses-permission"):
+            tree = ET.parse(path if data is None else io.BytesIO(data))
+            for uses_perm in tree.iter("uses-permission"):
                 name = uses_perm.attrib.get("{http://schemas.android.com/apk/res/android}name") or uses_perm.attrib.get("android:name")
-                if name and name not in facts["permissions"]:
-                    facts["permissions"].append(name)
+                if name:
+                    perms.add(name)
         except Exception:
             pass
-
-    for gradle in list(root.rglob("build.gradle")) + list(root.rglob("build.gradle.kts")):
+        return {"permissions": sorted(perms)}
+    if kind == "gradle":
         try:
-            txt = gradle.read_text(encoding="utf-8", errors="ignore")
-            m = re.search(r"targetSdk(?:Version)?\s*=?\s*(\d+)", txt)
-            if m:
-                facts["targetsdk"] = int(m.group(1))
-                break
+            return parse_build_file(_read_text(path, data))
         except Exception:
-            pass
+            return {"targetsdk": None, "minsdk": None, "plugins": [], "deps": []}
+    if kind == "catalog":
+        try:
+            return {"catalog": parse_catalog(_read_text(path, data))}
+        except Exception:
+            return {"catalog": None}
+    if kind == "lockfile":
+        try:
+            return {"locked": parse_lockfile(_read_text(path, data))}
+        except Exception:
+            return {"locked": []}
+    return {}
+
+def _extract_entry(entry, tokens=()):
+    kind, path, _rel = entry
+    return extract_file(kind, path, tokens)
 
-    facts["permissions"] = sorted(set(facts["permissions"]))
+def _module_path(rel):
+    """Gradle project path for a build file: app/build.gradle -> ":app", build.gradle -> ":"."""
+    d = rel.rpartition("/")[0]
+    return ":" + d.replace("/", ":") if d else ":"
+
+def _split_coord(coord):
+    """("group:name", "version") for "group:name[:version]"."""
+    parts = coord.split(":")
+    return ":".join(parts[:2]), ":".join(parts[2:])
+
+def aggregate(items) -> dict:
+    """Merge [(kind, rel_path, extracted)] in walk order into the Android facts schema."""
+    facts = {"platform":"android","permissions":[],"targetsdk":None,"deps":[],"modules":{}}
+    permissions = set()
+    gradle, locks, catalogs = [], [], {}
+    for kind, rel, res in items:
+        if kind == "manifest":
+            permissions.update(res["permissions"])
+        elif kind == "gradle":
+            gradle.append((rel, res))
+        elif kind == "catalog" and res["catalog"] is not None:
+            catalogs.setdefault(rel.rsplit("/", 1)[-1][:-len(CATALOG_SUFFIX)], res["catalog"])
+        elif kind == "lockfile":
+            locks.append((rel, res["locked"]))
+    catalog = CatalogIndex(catalogs)
+
+    modules = {}
+    declared = []  # (rel, targetsdk) per build file
+    for rel, res in gradle:
+        m = modules.setdefault(_module_path(rel), {"file": rel, "application": False, "targetsdk": None, "minsdk": None,
+                                                   "deps": {}, "projects": set()})
+        for p in res["plugins"]:
+            m["application"] |= (catalog.plugin(p) if p.startswith("@") else p) in APPLICATION_PLUGINS
+        for field in ("targetsdk", "minsdk"):
+            value = res[field]
+            if isinstance(value, str):
+                value = catalog.version(value)
+            if field == "targetsdk":
+                declared.append((rel, value))
+            if m[field] is None:
+                m[field] = value
+        for conf, coord in res["deps"]:
+            if is_test_configuration(conf):
+                continue
+            if coord.startswith("project:"):
+                m["projects"].add(coord[len("project:"):])
+                continue
+            for c in (catalog.dependency(coord) if coord.startswith("@") else [coord]):
+                key, version = _split_coord(c)
+                if version or key not in m["deps"]:
+                    m["deps"][key] = version
+    # Lockfiles pin what Gradle actually resolved (transitives included) and win over declarations.
+    for rel, locked in locks:
+        mod = modules.get(_module_path(rel))
+        if mod is None:
+            continue
+        for confs, coord in locked:
+            if confs and all(is_test_configuration(c) for c in confs):
+                continue
+            key, version = _split_coord(coord)
+            mod["deps"][key] = version
+
+    deps = set()
+    for path in sorted(modules):
+        m = modules[path]
+        deps.update(m["deps"])
+        m["deps"] = [f"{k}:{v}" if v else k for k, v in sorted(m["deps"].items())]
+        m["projects"] = sorted(m["projects"])
+        facts["modules"][path] = m
+
+    # The Play target-API policy applies to the application module(s); without
+    # one, fall back to the first declaration, Groovy build files first.
+    apps = [m["targetsdk"] for m in modules.values() if m["application"] and m["targetsdk"] is not None]
+    if apps:
+        facts["targetsdk"] = min(apps)
+    else:
+        for name in GRADLE_NAMES:
+            for rel, tsdk in declared:
+                if rel.rsplit("/", 1)[-1] == name and tsdk is not None and facts["targetsdk"] is None:
+                    facts["targetsdk"] = tsdk
+
+    facts["permissions"] = sorted(permissions)
+    facts["deps"] = sorted(deps)
     return facts
+
+def cache_fingerprint(tokens=()) -> str:
+    return fingerprint("android", EXTRACTOR_VERSION)
+
+def open_cache(cache_dir, tokens=(), use_hash=False, root=None) -> FactCache:
+    return FactCache(cache_dir, "android", cache_fingerprint(tokens), use_hash, root)
+
+def scan_android(project_path: str, prune=DEFAULT_PRUNE, jobs=1, cache_dir=None, cache_hash=False, timings=None):
+    """Scan an Android project tree into facts; `cache_dir` and `timings` work as in scan_ios."""
+    root = pathlib.Path(project_path)
+    phase = phase_of(timings)
+    with phase("android.walk"):
+        entries = collect_files(root, classify, prune, timings=timings)
+    with phase("android.extract"), cache_or_none(open_cache, cache_dir, (), cache_hash, root=root) as cache:
+        results = extract_entries(_extract_entry, entries, jobs, cache, timings)
+        if cache is not None:
+            cache.retain(rel for _kind, _path, rel in entries)
+    with phase("android.aggregate"):
+        return aggregate([(kind, rel, res) for (kind, _path, rel), res in zip(entries, results)])
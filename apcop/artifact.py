@@ -0,0 +1,320 @@
+"""
+Scan built artifacts (.ipa, .apk, .aab) without unpacking them.
+
+Only the zip central directory is read up front; the members that carry
+facts are then decompressed one at a time, straight from the archive:
+
+  IPA  Payload/*.app/Info.plist, PrivacyInfo.xcprivacy files (app and
+       bundled SDKs), Frameworks/*.framework/Info.plist for SDK names,
+       embedded.mobileprovision for entitlements, and the main executable,
+       streamed through the symbol matcher.
+  APK  AndroidManifest.xml in binary AXML, classes*.dex type tables.
+  AAB  <module>/manifest/AndroidManifest.xml in aapt2's protobuf XML,
+       <module>/dex/classes*.dex.
+
+The results go through the same aggregate() as a source scan, so the
+facts schema is unchanged.
+"""
+import posixpath, re, struct, zipfile
+from . import android_scan, ios_scan
+from .symbols import STREAM_CHUNK
+
+# What a truncated or corrupt DEX/AXML/protobuf member raises while it is decoded
+# (AttributeError/TypeError: a protobuf field of an unexpected wire type).
+_MALFORMED = (struct.error, IndexError, ValueError, AttributeError, TypeError)
+
+# android:* attribute resource IDs, for AXML files whose attribute names are stripped.
+_ANDROID_ATTR_IDS = {0x01010003: "name", 0x0101020C: "minSdkVersion", 0x01010270: "targetSdkVersion"}
+
+# Java package prefix of an SDK's classes -> its Maven "group:name" (as in facts["deps"]).
+ANDROID_SDK_PACKAGES = {
+    "com.appsflyer": "com.appsflyer:af-android-sdk",
+    "com.adjust.sdk": "com.adjust.sdk:adjust-android",
+    "com.applovin": "com.applovin:applovin-sdk",
+    "com.ironsource": "com.ironsource.sdk:mediationsdk",
+    "com.unity3d.ads": "com.unity3d.ads:unity-ads",
+    "com.facebook.ads": "com.facebook.android:audience-network-sdk",
+    "com.facebook.login": "com.facebook.android:facebook-login",
+    "com.facebook.appevents": "com.facebook.android:facebook-core",
+    "com.google.android.gms.ads": "com.google.android.gms:play-services-ads",
+    "com.google.android.gms.location": "com.google.android.gms:play-services-location",
+    "com.google.android.gms.auth": "com.google.android.gms:play-services-auth",
+    "com.google.firebase.analytics": "com.google.firebase:firebase-analytics",
+    "com.google.firebase.auth": "com.google.firebase:firebase-auth",
+    "com.google.firebase.crashlytics": "com.google.firebase:firebase-crashlytics",
+    "com.bytedance.sdk.openadsdk": "com.pangle.global:ads-sdk",
+    "com.squareup.okhttp3": "com.squareup.okhttp3:okhttp",
+}
+
+def artifact_platform(path) -> str:
+    ext = posixpath.splitext(str(path).lower())[1]
+    if ext == ".ipa":
+        return "ios"
+    if ext in (".apk", ".aab"):
+        return "android"
+    raise ValueError(f"unsupported artifact {path!r}: expected .ipa, .apk or .aab")
+
+def scan_artifact(path, tokens=ios_scan.SYMBOL_TOKENS):
+    """Facts for an .ipa, .apk or .aab, read directly from the archive."""
+    platform = artifact_platform(path)
+    with zipfile.ZipFile(path) as zf:
+        return scan_ipa(zf, tokens) if platform == "ios" else scan_android_archive(zf)
+
+# --- iOS -------------------------------------------------------------------
+
+_PROFILE_PLIST = re.compile(rb"<\?xml.*?</plist>", re.S)
+
+def scan_ipa(zf: zipfile.ZipFile, tokens=ios_scan.SYMBOL_TOKENS):
+    names = zf.namelist()
+    apps = sorted({m.group(1) for m in map(re.compile(r"^(Payload/[^/]+\.app/)").match, names) if m})
+    if not apps:
+        raise ValueError("not an IPA: no Payload/*.app/")
+    app = apps[0]
+    items = []
+    info = ios_scan.safe_loads_plist(zf.read(app + "Info.plist")) if app + "Info.plist" in names else None
+    items.append(("plist", app + "Info.plist", {"plist_keys": ios_scan.usage_description_keys(info)}))
+
+    frameworks, bundle_ids = set(), []
+    for name in names:
+        rest = name[len(app):] if name.startswith(app) else None
+        if rest is None:
+            continue
+        parts = rest.split("/")
+        if parts[0] == "Frameworks" and len(parts) == 3 and parts[1].endswith(".framework") and parts[2] == "Info.plist":
+            fw = ios_scan.safe_loads_plist(zf.read(name))
+            fw = fw if isinstance(fw, dict) else {}
+            frameworks.add(fw.get("CFBundleName") or parts[1][:-len(".framework")])
+            bundle_ids.append(str(fw.get("CFBundleIdentifier", "")))
+        elif parts[0] == "Frameworks" and len(parts) > 1 and parts[1].endswith(".framework"):
+            frameworks.add(parts[1][:-len(".framework")])
+        # SDK privacy manifests first: the app's own manifest is merged last.
+        if parts[-1] == "PrivacyInfo.xcprivacy" and len(parts) > 1:
+            data = ios_scan.safe_loads_plist(zf.read(name))
+            items.append(("privacy", name, {"privacy": data if isinstance(data, dict) else None}))
+    hints = ios_scan._HINT_MATCHER.present(" ".join([*sorted(frameworks), *bundle_ids]).encode())
+    items.append(("lockfile", app + "Frameworks/", {"sdk_names": sorted(frameworks | {ios_scan._HINT_NAMES[h] for h in hints})}))
+
+    if app + "PrivacyInfo.xcprivacy" in names:
+        data = ios_scan.safe_loads_plist(zf.read(app + "PrivacyInfo.xcprivacy"))
+        items.append(("privacy", app + "PrivacyInfo.xcprivacy", {"privacy": data if isinstance(data, dict) else None}))
+
+    if app + "embedded.mobileprovision" in names:
+        # A CMS-signed blob around an XML plist; its Entitlements are what the build was provisioned with.
+        m = _PROFILE_PLIST.search(zf.read(app + "embedded.mobileprovision"))
+        profile = ios_scan.safe_loads_plist(m.group()) if m else None
+        ents = profile.get("Entitlements") if isinstance(profile, dict) else None
+        items.append(("entitlements", app + "embedded.mobileprovision", {"entitlements": ents if isinstance(ents, dict) else None}))
+
+    exe = info.get("CFBundleExecutable") if isinstance(info, dict) else None
+    if exe and app + exe in names:
+        with zf.open(app + exe) as f:
+            found = ios_scan._matcher(tuple(tokens)).find_stream(f, STREAM_CHUNK)
+        # Binary offsets are not source lines.
+        items.append(("source", app + exe, {"symbols": {t: None for t in found}}))
+    return ios_scan.aggregate(items)
+
+# --- Android ---------------------------------------------------------------
+
+def scan_android_archive(zf: zipfile.ZipFile):
+    names = zf.namelist()
+    manifests, dexes = [], []
+    for name in names:
+        if name == "AndroidManifest.xml":
+            manifests.append((name, axml_elements))
+        elif name.endswith("/manifest/AndroidManifest.xml") and name.count("/") == 2:
+            manifests.append((name, proto_xml_elements))
+        base = name.rsplit("/", 1)[-1]
+        if base.startswith("classes") and base.endswith(".dex") and (name == base or name.endswith("/dex/" + base)):
+            dexes.append(name)
+    if not manifests:
+        raise ValueError("not an APK/AAB: no AndroidManifest.xml")
+
+    items, targetsdk = [], None
+    for name, decode in sorted(manifests):
+        perms = set()
+        what = "binary XML manifest" if decode is axml_elements else "protobuf XML manifest"
+        for tag, attrs in _decode_member(zf, name, what, decode):
+            if tag in ("uses-permission", "uses-permission-sdk-23") and isinstance(attrs.get("name"), str):
+                perms.add(attrs["name"])
+            elif tag == "uses-sdk" and targetsdk is None and attrs.get("targetSdkVersion") is not None:
+                try:
+                    targetsdk = int(attrs["targetSdkVersion"])
+                except (TypeError, ValueError):
+                    pass
+        items.append(("manifest", name, {"permissions": sorted(perms)}))
+
+    facts = android_scan.aggregate(items)
+    facts["targetsdk"] = targetsdk
+    packages = set()
+    for name in sorted(dexes):
+        packages.update(_decode_member(zf, name, "DEX file", dex_packages))
+    facts["deps"] = sorted(sdk_deps(packages))
+    return facts
+
+def _decode_member(zf, name, what, decode):
+    """list(decode(member bytes)); a member the decoder can't walk raises ValueError naming it."""
+    try:
+        return list(decode(zf.read(name)))
+    except _MALFORMED as e:
+        raise ValueError(f"{name}: malformed {what} ({type(e).__name__}: {e})") from None
+
+def sdk_deps(packages):
+    """Map Java packages seen in DEX files to known SDK coordinates."""
+    deps = set()
+    for pkg in packages:
+        parts = pkg.split(".")
+        for n in range(2, min(len(parts), 5) + 1):
+            dep = ANDROID_SDK_PACKAGES.get(".".join(parts[:n]))
+            if dep:
+                deps.add(dep)
+    return deps
+
+def _varint(buf, i):
+    """LEB128 / protobuf varint at buf[i]: (value, next index)."""
+    result = shift = 0
+    while True:
+        b = buf[i]
+        i += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, i
+        shift += 7
+
+def dex_packages(dex: bytes) -> set:
+    """Java packages of every type a DEX file references, from its type_ids table."""
+    if dex[:4] != b"dex\n" or len(dex) < 0x70:
+        return set()
+    string_ids_size, string_ids_off, type_ids_size, type_ids_off = struct.unpack_from("<4I", dex, 0x38)
+    string_offs = struct.unpack_from(f"<{string_ids_size}I", dex, string_ids_off)
+    packages = set()
+    for (sidx,) in struct.iter_unpack("<I", dex[type_ids_off: type_ids_off + 4 * type_ids_size]):
+        _size, start = _varint(dex, string_offs[sidx])
+        end = dex.index(b"\0", start)
+        desc = dex[start:end]
+        # "Lcom/appsflyer/AppsFlyerLib;" -> "com.appsflyer"; arrays and primitives are skipped.
+        if desc[:1] == b"L" and b"/" in desc:
+            packages.add(desc[1:desc.rindex(b"/")].decode("utf-8", "replace").replace("/", "."))
+    return packages
+
+# Binary XML (AXML) chunk types.
+_RES_STRING_POOL, _RES_XML, _RES_XML_RESOURCE_MAP, _RES_XML_START_ELEMENT = 0x0001, 0x0003, 0x0180, 0x0102
+_TYPE_STRING, _TYPE_INT_DEC, _TYPE_INT_HEX, _TYPE_BOOLEAN = 0x03, 0x10, 0x11, 0x12
+
+def _string_pool(buf, start, header_size):
+    count, _styles, flags, strings_start, _styles_start = struct.unpack_from("<5I", buf, start + 8)
+    offsets = struct.unpack_from(f"<{count}I", buf, start + header_size)
+    utf8 = bool(flags & 0x100)
+    base = start + strings_start
+    out = []
+    for off in offsets:
+        i = base + off
+        if utf8:
+            i += 2 if buf[i] & 0x80 else 1          # UTF-16 length, unused
+            n = buf[i]
+            if n & 0x80:
+                n = ((n & 0x7F) << 8) | buf[i + 1]
+                i += 1
+            out.append(buf[i + 1: i + 1 + n].decode("utf-8", "replace"))
+        else:
+            n = struct.unpack_from("<H", buf, i)[0]
+            i += 2
+            if n & 0x8000:
+                n = ((n & 0x7FFF) << 16) | struct.unpack_from("<H", buf, i)[0]
+                i += 2
+            out.append(buf[i: i + 2 * n].decode("utf-16-le", "replace"))
+    return out
+
+def axml_elements(buf: bytes):
+    """Yield (tag, {attr: value}) for each element of a binary AndroidManifest.xml."""
+    if len(buf) < 8 or struct.unpack_from("<H", buf, 0)[0] != _RES_XML:
+        return
+    strings, res_ids = [], []
+    pos = struct.unpack_from("<H", buf, 2)[0]
+    while pos + 8 <= len(buf):
+        ctype, header_size, size = struct.unpack_from("<HHI", buf, pos)
+        if size < 8:
+            break
+        if ctype == _RES_STRING_POOL:
+            strings = _string_pool(buf, pos, header_size)
+        elif ctype == _RES_XML_RESOURCE_MAP:
+            res_ids = struct.unpack_from(f"<{(size - header_size) // 4}I", buf, pos + header_size)
+        elif ctype == _RES_XML_START_ELEMENT:
+            _ns, name, attr_start, attr_size, attr_count = struct.unpack_from("<IIHHH", buf, pos + header_size)
+            attrs = {}
+            a = pos + header_size + attr_start
+            for _ in range(attr_count):
+                _ans, aname, raw, _vsize, _res0, dtype, data = struct.unpack_from("<IIIHBBI", buf, a)
+                key = strings[aname] if aname < len(strings) else ""
+                if not key and aname < len(res_ids):
+                    key = _ANDROID_ATTR_IDS.get(res_ids[aname], "")
+                if raw != 0xFFFFFFFF and raw < len(strings):
+                    value = strings[raw]
+                elif dtype == _TYPE_STRING and data < len(strings):
+                    value = strings[data]
+                elif dtype in (_TYPE_INT_DEC, _TYPE_INT_HEX):
+                    value = data
+                elif dtype == _TYPE_BOOLEAN:
+                    value = data != 0
+                else:
+                    value = None
+                attrs[key] = value
+                a += attr_size
+            yield (strings[name] if name < len(strings) else ""), attrs
+        pos += size
+
+def _pb_fields(buf):
+    """(field number, value) pairs of one protobuf message; nested messages stay bytes."""
+    i = 0
+    while i < len(buf):
+        key, i = _varint(buf, i)
+        field, wire = key >> 3, key & 7
+        if wire == 0:
+            value, i = _varint(buf, i)
+        elif wire == 2:
+            n, i = _varint(buf, i)
+            value, i = buf[i:i + n], i + n
+        elif wire == 5:
+            value, i = buf[i:i + 4], i + 4
+        elif wire == 1:
+            value, i = buf[i:i + 8], i + 8
+        else:
+            raise ValueError(f"unsupported protobuf wire type {wire}")
+        yield field, value
+
+def _pb_attr(buf):
+    # aapt2 XmlAttribute: name=2, value=3, resource_id=5, compiled_item=6 (Item.prim=7 -> Primitive int_decimal=6 / int_hex=7).
+    name, value, res_id = "", None, None
+    for field, v in _pb_fields(buf):
+        if field == 2:
+            name = v.decode("utf-8", "replace")
+        elif field == 3 and v:
+            value = v.decode("utf-8", "replace")
+        elif field == 5:
+            res_id = v
+        elif field == 6 and value is None:
+            for f2, item in _pb_fields(v):
+                if f2 == 7:
+                    for f3, prim in _pb_fields(item):
+                        if f3 in (6, 7):
+                            value = prim
+    return name or _ANDROID_ATTR_IDS.get(res_id, ""), value
+
+def proto_xml_elements(buf: bytes):
+    """Yield (tag, {attr: value}) for each element of an aapt2 proto XmlNode (AAB manifests)."""
+    stack = [buf]
+    while stack:
+        node = stack.pop()
+        for field, element in _pb_fields(node):
+            if field != 1:          # XmlNode.element
+                continue
+            tag, attrs, children = "", {}, []
+            for f, v in _pb_fields(element):
+                if f == 3:
+                    tag = v.decode("utf-8", "replace")
+                elif f == 4:
+                    k, val = _pb_attr(v)
+                    attrs[k] = val
+                elif f == 5:
+                    children.append(v)
+            yield tag, attrs
+            stack.extend(reversed(children))
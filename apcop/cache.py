@@ -0,0 +1,163 @@
+import contextlib, functools, hashlib, json, os, pathlib, sqlite3, sys
+from .pool import map_jobs
+from .timings import timed
+
+def _digest(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _db_name(cache_dir, name, root) -> str:
+    if root is None:
+        return f"{name}.sqlite"
+    root, cache_dir = pathlib.Path(root).resolve(), pathlib.Path(cache_dir).resolve()
+    # A cache inside the project moves with it (CI restores, renamed checkouts).
+    if cache_dir == root or root in cache_dir.parents:
+        return f"{name}.sqlite"
+    return f"{name}-{hashlib.sha256(str(root).encode()).hexdigest()[:16]}.sqlite"
+
+class FactCache:
+    """
+    Per-file extraction results for one scanner, stored in
+    `<cache_dir>/<name>.sqlite` and keyed by relative path + mtime + size.
+    When `root` (the scanned project) is given and `cache_dir` lies outside
+    it, the file is `<name>-<hash of the resolved root>.sqlite` instead, so
+    one shared cache directory keeps a separate database per project.
+
+    With `use_hash=True` a file whose mtime changed (fresh clone, checkout)
+    is still a hit when its size and SHA-256 match the cached entry; files
+    with an unchanged mtime and size are not read.
+    `fingerprint` identifies the extractor version and its inputs (e.g. the
+    symbol token list); opening a cache written under another fingerprint
+    discards every entry.
+    """
+
+    def __init__(self, cache_dir, name: str, fingerprint: str, use_hash: bool = False, root=None):
+        self.use_hash = use_hash
+        self.hits = self.misses = 0
+        pathlib.Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(cache_dir, _db_name(cache_dir, name, root)))
+        try:
+            self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, kind TEXT, mtime_ns INTEGER, size INTEGER, digest TEXT, facts TEXT)")
+            row = self.db.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+            if row is None or row[0] != fingerprint:
+                self.db.execute("DELETE FROM files")
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (fingerprint,))
+        except sqlite3.Error:
+            self.db.close()
+            raise
+        self._pending = []
+        self._stats = {}
+        self._digests = {}
+
+    def get(self, rel: str, kind: str, path):
+        """Return the cached facts for `path`, or None if it must be re-extracted."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.misses += 1
+            return None
+        # Remember the stat taken *before* extraction, so an edit racing the
+        # scan leaves a mismatching entry rather than a stale hit.
+        self._stats[rel] = st
+        row = self.db.execute("SELECT kind, mtime_ns, size, digest, facts FROM files WHERE path = ?", (rel,)).fetchone()
+        if row is None or row[0] != kind:
+            self.misses += 1
+            return None
+        if row[1] == st.st_mtime_ns and row[2] == st.st_size:
+            self.hits += 1
+            return json.loads(row[4])
+        # Only a changed mtime costs a read: same size and content is still a hit.
+        if self.use_hash and row[2] == st.st_size and row[3] and row[3] == self._digest(rel, path):
+            self.hits += 1
+            if row[1] != st.st_mtime_ns:
+                self._pending.append((rel, kind, st.st_mtime_ns, st.st_size, row[3], row[4]))
+            return json.loads(row[4])
+        self.misses += 1
+        return None
+
+    def _digest(self, rel, path):
+        if rel not in self._digests:
+            self._digests[rel] = _digest(path)
+        return self._digests[rel]
+
+    def put(self, rel: str, kind: str, path, facts: dict):
+        try:
+            st = self._stats.pop(rel, None) or os.stat(path)
+            blob = json.dumps(facts)
+        except (OSError, TypeError, ValueError):
+            # Unstatable file or facts JSON can't hold (e.g. plist <data>): just don't cache it.
+            return
+        digest = self._digest(rel, path) if self.use_hash else None
+        self._pending.append((rel, kind, st.st_mtime_ns, st.st_size, digest, blob))
+
+    def retain(self, rels):
+        """Drop entries for files that no longer exist in the scanned tree."""
+        keep = set(rels)
+        stale = [(p,) for (p,) in self.db.execute("SELECT path FROM files") if p not in keep]
+        self.db.executemany("DELETE FROM files WHERE path = ?", stale)
+
+    def close(self):
+        self.db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", self._pending)
+        self._pending = []
+        self.db.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+@contextlib.contextmanager
+def cache_or_none(open_cache, cache_dir, *args, **kwargs):
+    """
+    `with cache_or_none(module.open_cache, cache_dir, ...) as cache:` yields
+    the opened FactCache, or None when `cache_dir` is None or the cache
+    can't be opened (a file in the way, unwritable directory, damaged
+    database); the scan then runs uncached, with a warning on stderr.
+    """
+    if cache_dir is None:
+        yield None
+        return
+    try:
+        cache = open_cache(cache_dir, *args, **kwargs)
+    except (OSError, sqlite3.Error) as e:
+        print(f"warning: not using the cache in {cache_dir}: {e}", file=sys.stderr)
+        yield None
+        return
+    with cache:
+        yield cache
+
+def fingerprint(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+def _map_timed(fn, entries, jobs, timings):
+    if timings is None:
+        return map_jobs(fn, entries, jobs)
+    results = []
+    for (kind, _path, rel), (res, seconds, size) in zip(entries, map_jobs(functools.partial(timed, fn), entries, jobs)):
+        timings.file(rel, kind, seconds, size)
+        results.append(res)
+    return results
+
+def extract_entries(fn, entries, jobs=1, cache=None, timings=None):
+    """
+    map_jobs(fn, entries) over [(kind, abs_path, rel_path)], serving
+    unchanged files from `cache` and storing the fresh results back.
+    With `timings`, each parsed file's time and size is recorded.
+    """
+    if cache is None:
+        return _map_timed(fn, entries, jobs, timings)
+    results = [cache.get(rel, kind, path) for kind, path, rel in entries]
+    todo = [i for i, res in enumerate(results) if res is None]
+    if timings is not None:
+        timings.count("files_cached", len(entries) - len(todo))
+    for i, res in zip(todo, _map_timed(fn, [entries[i] for i in todo], jobs, timings)):
+        results[i] = res
+        kind, path, rel = entries[i]
+        cache.put(rel, kind, path, res)
+    return results
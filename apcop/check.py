@@ -0,0 +1,152 @@
+"""
+`apppolicy check`: scan a project and evaluate it in one step, extracting
+only the facts the rules can read.
+
+The compiled rules say which index keys they read (CompiledRule.reads) and
+which symbols they test for (CompiledRule.tokens). Those keys map to file
+kinds, and only files of those kinds are parsed: without an ios.api.uses
+condition the source pass never runs, without android.deps or
+android.targetsdk no Gradle file is opened. Without a cache, sources are
+searched only for the tokens the plan names. Files are still classified
+during the one walk, so a platform is reported exactly when a full scan
+would have found it.
+
+With `fail_fast`, kinds are extracted cheapest first and evaluation stops
+as soon as a blocking rule has fired on facts that can no longer change.
+"""
+import functools, os
+from . import ios_scan
+from .cache import cache_or_none, extract_entries
+from .rules import compile_rules, evaluate_rules, index_facts
+from .scanners import SCANNERS
+from .timings import phase_of
+from .walk import DEFAULT_PRUNE, walk_files
+
+# Index key -> the file kinds its value is aggregated from.
+KEY_KINDS = {
+    "ios.plist_keys": ("ios", {"plist"}),
+    "ios.entitlements": ("ios", {"entitlements"}),
+    "ios.privacy_manifest": ("ios", {"privacy"}),
+    "ios.privacy.api_types": ("ios", {"privacy"}),
+    "ios.privacy.api_reasons": ("ios", {"privacy"}),
+    "ios.privacy.tracking": ("ios", {"privacy"}),
+    "ios.privacy.tracking_domains": ("ios", {"privacy"}),
+    "ios.privacy.data_types": ("ios", {"privacy"}),
+    "ios.sdk_names": ("ios", {"lockfile"}),
+    "ios.auth_present": ("ios", {"lockfile"}),
+    "ios.symbols": ("ios", {"source"}),
+    "android.permissions": ("android", {"manifest"}),
+    "android.targetsdk": ("android", {"gradle", "catalog"}),
+    "android.deps": ("android", {"gradle", "catalog", "lockfile"}),
+}
+
+# Extraction order with fail_fast: cheap, few files first; source text last.
+STAGES = [
+    ("ios", {"plist", "entitlements", "privacy"}),
+    ("android", {"manifest"}),
+    ("ios", {"lockfile"}),
+    ("android", {"gradle", "catalog", "lockfile"}),
+    ("ios", {"source"}),
+]
+
+def plan_extraction(plan, tokens=ios_scan.SYMBOL_TOKENS):
+    """({platform: kinds to extract}, symbol tokens to look for) for a CompiledRules plan."""
+    kinds = {p: set() for p in SCANNERS}
+    wanted = set()
+    for cr in plan.rules:
+        for key in cr.reads:
+            if key in KEY_KINDS:
+                platform, ks = KEY_KINDS[key]
+                kinds[platform] |= ks
+        wanted |= cr.tokens
+        if "ios.symbols" in cr.reads and not cr.tokens:
+            # Read without naming a token (exists.true: ios.symbols): every token counts.
+            wanted |= set(tokens)
+    return kinds, [t for t in tokens if t in wanted]
+
+def _collect(root, prune, kinds, timings=None):
+    """One walk: {platform: [(kind, path, rel)]} for the wanted kinds, and the platforms that have any files."""
+    entries = {p: [] for p in SCANNERS}
+    present = set()
+    base = len(os.fspath(root).rstrip("/\\")) + 1
+    visited = kept = 0
+    for entry in walk_files(root, prune):
+        visited += 1
+        for platform, module in SCANNERS.items():
+            kind = module.classify(entry.name)
+            if kind is None:
+                continue
+            present.add(platform)
+            if kind in kinds[platform]:
+                entries[platform].append((kind, entry.path, entry.path[base:].replace("\\", "/")))
+                kept += 1
+    if timings is not None:
+        timings.count("files_visited", visited)
+        timings.count("files_skipped", visited - kept)
+    return entries, present
+
+def _extract(platform, root, entries, tokens, jobs, cache_dir, cache_hash, timings):
+    module = SCANNERS[platform]
+    fn = functools.partial(module._extract_entry, tokens=tuple(tokens))
+    # No cache.retain(): entries of the kinds skipped here are still valid for full scans.
+    with cache_or_none(module.open_cache, cache_dir, tokens, cache_hash, root=root) as cache:
+        return extract_entries(fn, entries, jobs, cache, timings)
+
+def _facts(entries, results, present):
+    return [SCANNERS[p].aggregate([(kind, rel, results[p][i]) for i, (kind, _path, rel) in enumerate(entries[p]) if i in results[p]])
+            for p in SCANNERS if p in present]
+
+def _not_extracted(report, done):
+    """Drop the index keys whose files were never parsed from report["facts"] and name them in report["not_extracted"]."""
+    skipped = sorted(k for k, (platform, kinds) in KEY_KINDS.items() if not kinds <= done[platform])
+    facts = report.get("facts")
+    if facts is not None:
+        for k in skipped:
+            facts.pop(k, None)
+    if skipped:
+        report["not_extracted"] = skipped
+    return report
+
+def check_project(project, rules_doc, prune=DEFAULT_PRUNE, evidence="compact", fail_fast=False, tokens=ios_scan.SYMBOL_TOKENS,
+                  jobs=1, cache_dir=None, cache_hash=False, timings=None):
+    """
+    The findings evaluate_rules would give for a full scan of `project`.
+    Facts no rule reads are not extracted: report["facts"] holds only the
+    index keys that were, and the others are listed in
+    report["not_extracted"] rather than shown as empty. With `fail_fast` the
+    report may stop at the first certain blocking finding; it then carries
+    "partial": true and only the rules that were decided.
+    """
+    phase = phase_of(timings)
+    plan = compile_rules(rules_doc)
+    kinds, needed_tokens = plan_extraction(plan, tokens)
+    # Only uncached runs search for the plan's tokens alone. A cache is keyed by the full token list
+    # (shared with scan-ios), and entries for a subset would wipe it and could not serve a later full scan.
+    scan_tokens = list(tokens) if cache_dir is not None else needed_tokens
+    with phase("check.walk"):
+        entries, present = _collect(project, prune, kinds, timings)
+    results = {p: {} for p in SCANNERS}
+
+    stages = STAGES if fail_fast else [(p, kinds[p]) for p in SCANNERS]
+    done = {p: set() for p in SCANNERS}
+    for platform, stage_kinds in stages:
+        todo = [i for i, e in enumerate(entries[platform]) if e[0] in stage_kinds]
+        done[platform] |= stage_kinds
+        if todo:
+            with phase(f"check.extract.{platform}"):
+                res = _extract(platform, project, [entries[platform][i] for i in todo], scan_tokens, jobs, cache_dir, cache_hash, timings)
+            results[platform].update(zip(todo, res))
+        if not fail_fast:
+            continue
+        # A rule is decided once every kind feeding the keys it reads has been extracted.
+        decided = [cr for cr in plan.rules
+                   if all(k not in KEY_KINDS or KEY_KINDS[k][1] <= done[KEY_KINDS[k][0]] for k in cr.reads)]
+        if len(decided) == len(plan.rules):
+            break
+        facts = _facts(entries, results, present)
+        idx = index_facts(facts)
+        if any(cr.severity == "blocking" and cr.test(idx) for cr in decided):
+            report = evaluate_rules(facts, {"version": plan.version, "rules": [cr.rule for cr in decided]}, evidence, timings)
+            report["partial"] = True
+            return _not_extracted(report, done)
+    return _not_extracted(evaluate_rules(_facts(entries, results, present), plan, evidence, timings), done)
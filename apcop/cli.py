@@ -1,9 +1,78 @@
-import argparse, json, pathlib
-from .ios_scan import scan_ios
-from .android_scan import scan_android
-from .rules import evaluate_rules, load_rules
-from .report import render_html
-from .pro_pack import load_rules_pack
+import argparse, functools, json, pathlib, sys
+from .walk import ALWAYS_PRUNE, CACHE_DIRNAME, DEFAULT_PRUNE
+
+FORMATS = ("json", "compact", "msgpack")  # apcop.formats.FORMATS, without importing it for --help
+NO_DEFAULT_PRUNE_HELP = f"Scan {', '.join(sorted(DEFAULT_PRUNE - ALWAYS_PRUNE))} too (only {', '.join(sorted(ALWAYS_PRUNE))} and --prune are skipped)"
+FORMAT_HELP = "Output encoding: pretty JSON (default), compact JSON with a string table, or MessagePack; readers auto-detect"
+
+# Subcommand implementations are imported inside main() so each command
+# only pays for what it uses: PyYAML (rules), Jinja2 (report) and PyNaCl
+# (pro_pack) are never loaded by scan-*. tests/test_cli_startup.py guards this.
+
+def _load_rules_doc(args):
+    if args.rules_pack:
+        from .pro_pack import load_rules_pack
+        pack = load_rules_pack(args.rules_pack, cache_dir=args.pack_cache, use_cache=not args.no_pack_cache, offline=args.offline)
+        return {"version": pack.get("version","pack"), "rules": pack.get("rules",[])}
+    from .rules import load_rules
+    return load_rules(args.rules)
+
+def _prune(args):
+    return (DEFAULT_PRUNE if args.default_prune else ALWAYS_PRUNE) | set(args.prune)
+
+def _evidence(args):
+    return "verbose" if args.verbose_evidence else "compact"
+
+def _positive_int(text):
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {text!r}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+def _batch_apps(apps_dir):
+    """One app per sub-directory (all its *.json) or per top-level *.json file."""
+    apps = []
+    for p in sorted(pathlib.Path(apps_dir).iterdir()):
+        if p.is_dir():
+            files = sorted(str(f) for f in p.iterdir() if f.suffix in (".json", ".msgpack"))
+            if files:
+                apps.append((p.name, files))
+        elif p.suffix in (".json", ".msgpack"):
+            apps.append((p.stem, [str(p)]))
+    return apps
+
+def _manifest_apps(manifest):
+    """(app, facts paths) per manifest line; app names become file names in --out-dir, so they can't hold a path."""
+    base = pathlib.Path(manifest).parent
+    apps = []
+    for n, line in enumerate(pathlib.Path(manifest).read_text(encoding="utf-8").splitlines(), 1):
+        if line.strip():
+            entry = json.loads(line)
+            name = entry["app"]
+            if not isinstance(name, str) or not name or "/" in name or "\\" in name or ".." in name:
+                raise ValueError(f"{manifest}:{n}: app name {name!r} must be a plain file name (no path separator or '..')")
+            apps.append((name, [str(base / f) for f in entry["facts"]]))
+    return apps
+
+def _print_change(args, live, diff, paths, seconds):
+    report = live.report()
+    if args.out:
+        pathlib.Path(args.out).write_text(json.dumps(report, indent=2))
+    if args.json:
+        line = {"paths": paths, "ms": round(seconds * 1000, 2), "summary": report["summary"]}
+        if diff is not None:
+            line.update({k: [f["id"] for f in v] for k, v in diff.items()})
+        print(json.dumps(line), flush=True)
+    elif diff is None:
+        print(f"Watching {args.project} ({', '.join(live.states)}): {len(report['findings'])} findings", flush=True)
+    else:
+        print(f"[{seconds * 1000:.1f} ms] {', '.join(paths)}", flush=True)
+        for mark, key in (("+", "added"), ("-", "removed"), ("~", "changed")):
+            for f in diff[key]:
+                print(f"  {mark} {f['status'].upper():4} {f['id']}", flush=True)
 
 def main():
     parser = argparse.ArgumentParser(prog="apppolicy", description="AppPolicy scanner & evaluator")
@@ -17,42 +86,246 @@ def main():
     scana.add_argument("--project", required=True)
     scana.add_argument("--out", required=True)
 
+    for scan in (scani, scana):
+        scan.add_argument("--git-rev", metavar="REV",
+                          help="Scan this revision of the git repository --project is in, from the object database "
+                               "(no checkout; not with --jobs or the cache options)")
+        scan.add_argument("--baseline", metavar="FACTS",
+                          help="With --git-rev: facts from an earlier --git-rev scan; only paths changed since its commit are read")
+
+    chk = sub.add_parser("check", help="Scan and evaluate in one step, extracting only the facts the rules read")
+    chk.add_argument("--project", required=True)
+    group = chk.add_mutually_exclusive_group(required=True)
+    group.add_argument("--rules", help="Path to YAML rules (community)")
+    group.add_argument("--rules-pack", help="Path/URL to signed rules pack (.tar.gz)")
+    chk.add_argument("--out", help="Also write the report here")
+    chk.add_argument("--fail-fast", action="store_true",
+                     help="Stop at the first certain blocking finding (cheap files are read first); the report is then partial")
+    chk.add_argument("--verbose-evidence", action="store_true", help="Legacy evidence layout (see evaluate)")
+    chk.add_argument("--pack-cache", help="Rules pack cache directory")
+    chk.add_argument("--no-pack-cache", action="store_true", help="Always download and verify the rules pack")
+    chk.add_argument("--offline", action="store_true", help="Use the cached rules pack only")
+
+    for scan in (scani, scana, chk):
+        scan.add_argument("--prune", action="append", default=[], metavar="DIR",
+                          help=f"Extra directory name to skip (repeatable; by default also skips {', '.join(sorted(DEFAULT_PRUNE))})")
+        scan.add_argument("--no-default-prune", dest="default_prune", action="store_false", help=NO_DEFAULT_PRUNE_HELP)
+        scan.add_argument("--jobs", type=int, default=1, metavar="N",
+                          help="Parse files in N worker processes (0 = one per CPU)")
+        scan.add_argument("--cache-dir", help=f"Per-file fact cache location (default: <project>/{CACHE_DIRNAME}); a shared directory keeps one database per project")
+        scan.add_argument("--cache-hash", action="store_true",
+                          help="Also reuse cache entries whose mtime changed but content (SHA-256) did not")
+        scan.add_argument("--no-cache", action="store_true", help="Re-parse every file and leave the cache untouched")
+        scan.add_argument("--format", choices=FORMATS, default="json", help=FORMAT_HELP)
+
+    scanx = sub.add_parser("scan-artifact", help="Scan a built .ipa, .apk or .aab without unpacking it")
+    scanx.add_argument("--artifact", required=True)
+    scanx.add_argument("--out", required=True)
+    scanx.add_argument("--format", choices=FORMATS, default="json", help=FORMAT_HELP)
+
     eva = sub.add_parser("evaluate", help="Evaluate facts against rules")
     eva.add_argument("--facts", nargs="+", required=True)
     group = eva.add_mutually_exclusive_group(required=True)
     group.add_argument("--rules", help="Path to YAML rules (community)")
     group.add_argument("--rules-pack", help="Path/URL to signed rules pack (.tar.gz)")
     eva.add_argument("--out", required=True)
+    eva.add_argument("--verbose-evidence", action="store_true",
+                     help="Legacy layout: full facts snapshot in every finding instead of top-level report['facts']")
+
+    evb = sub.add_parser("evaluate-batch", help="Evaluate many apps' facts against one rules set")
+    src = evb.add_mutually_exclusive_group(required=True)
+    src.add_argument("--apps-dir", help="Directory with one sub-directory of facts *.json per app (or one facts file per app)")
+    src.add_argument("--manifest", help='JSON lines file: {"app": NAME, "facts": [PATH, ...]} per line')
+    group = evb.add_mutually_exclusive_group(required=True)
+    group.add_argument("--rules", help="Path to YAML rules (community)")
+    group.add_argument("--rules-pack", help="Path/URL to signed rules pack (.tar.gz)")
+    evb.add_argument("--out-dir", required=True, help="Writes <app>.report.json per app")
+    evb.add_argument("--jsonl", help="Also stream one summary line per app to this file")
+    evb.add_argument("--jobs", type=int, default=1, metavar="N", help="Evaluate in N worker processes (0 = one per CPU)")
+    evb.add_argument("--verbose-evidence", action="store_true", help="Legacy evidence layout (see evaluate)")
+    evb.add_argument("--engine", choices=["python", "numpy"], default="python",
+                     help="numpy: evaluate every app at once as boolean matrices (same reports; needs NumPy; ignores --jobs)")
+
+    for ev in (eva, evb):
+        ev.add_argument("--format", choices=FORMATS, default="json", help=FORMAT_HELP)
+        ev.add_argument("--pack-cache", help="Rules pack cache directory (default: $APPPOLICY_PACK_CACHE or ~/.cache/apppolicy/packs)")
+        ev.add_argument("--no-pack-cache", action="store_true", help="Always download and verify the rules pack")
+        ev.add_argument("--offline", action="store_true", help="Use the cached rules pack only; never touch the network")
 
     html = sub.add_parser("html", help="Render report.json to HTML")
     html.add_argument("--report", required=True)
     html.add_argument("--out", required=True)
+    html.add_argument("--template-cache", metavar="DIR", help="Keep Jinja's compiled template bytecode here between runs")
+
+    agg = sub.add_parser("aggregate", help="Fleet dashboard over many apps' reports")
+    src = agg.add_mutually_exclusive_group(required=True)
+    src.add_argument("--reports", nargs="+", help="report.json files and/or directories of <app>.report.json")
+    src.add_argument("--jsonl", help="Summary stream written by evaluate-batch --jsonl")
+    agg.add_argument("--out-dir", required=True, help="Writes index.html, apps-NNNN.html and summary.json")
+    agg.add_argument("--previous", help="Earlier summary.json to compute the trend against (default: the one in --out-dir)")
+    agg.add_argument("--page-size", type=_positive_int, default=200, help="Apps per HTML page")
+    agg.add_argument("--template-cache", metavar="DIR", help="Keep Jinja's compiled template bytecode here between runs")
+
+    wat = sub.add_parser("watch", help="Re-scan and re-evaluate incrementally as project files change")
+    wat.add_argument("--project", required=True)
+    group = wat.add_mutually_exclusive_group(required=True)
+    group.add_argument("--rules", help="Path to YAML rules (community)")
+    group.add_argument("--rules-pack", help="Path/URL to signed rules pack (.tar.gz)")
+    wat.add_argument("--platform", action="append", choices=["ios", "android"],
+                     help="Platform to track (repeatable; default: whichever the project has files for)")
+    wat.add_argument("--prune", action="append", default=[], metavar="DIR", help="Extra directory name to skip (repeatable)")
+    wat.add_argument("--no-default-prune", dest="default_prune", action="store_false", help=NO_DEFAULT_PRUNE_HELP)
+    wat.add_argument("--poll", type=float, metavar="SECONDS", help="Poll file stats at this interval instead of using inotify")
+    wat.add_argument("--out", help="Rewrite this report.json after every change")
+    wat.add_argument("--json", action="store_true", help="Print one JSON line per change instead of a summary")
+    wat.add_argument("--verbose-evidence", action="store_true", help="Legacy evidence layout (see evaluate)")
+    wat.add_argument("--pack-cache", help="Rules pack cache directory")
+    wat.add_argument("--no-pack-cache", action="store_true", help="Always download and verify the rules pack")
+    wat.add_argument("--offline", action="store_true", help="Use the cached rules pack only")
+
+    srv = sub.add_parser("serve", help="Run a local JSON API that keeps rules and templates warm")
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=8765)
+    srv.add_argument("--socket", help="Listen on this Unix socket instead of TCP")
+    srv.add_argument("--workers", type=int, default=0, metavar="N", help="Scan worker processes (0 = one per CPU)")
+    srv.add_argument("--rules", help="Default YAML rules for /evaluate (preloaded)")
+    srv.add_argument("--rules-pack", help="Default signed rules pack for /evaluate (preloaded)")
+    srv.add_argument("--pack-cache", help="Rules pack cache directory")
+    srv.add_argument("--no-pack-cache", action="store_true", help="Always download and verify the rules pack")
+    srv.add_argument("--offline", action="store_true", help="Use the cached rules pack only")
+
+    for cmd in (scani, scana, chk, eva, html):
+        cmd.add_argument("--timings", metavar="PATH", help="Write per-phase, per-file and per-rule timings to PATH as JSON")
+        cmd.add_argument("--slowest", type=int, default=20, metavar="N", help="Slowest files listed in --timings (default: 20)")
+        cmd.add_argument("--profile", metavar="PATH", help="Also write a cProfile dump (pstats format) to PATH")
 
     args = parser.parse_args()
+    timings = profiler = None
+    if getattr(args, "timings", None):
+        from .timings import Timings
+        timings = Timings(args.slowest)
+    if getattr(args, "profile", None):
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        _run(parser, args, timings)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if timings is not None:
+            timings.dump(args.timings)
 
-    if args.cmd == "scan-ios":
-        facts = scan_ios(args.project)
-        pathlib.Path(args.out).write_text(json.dumps(facts, indent=2))
+def _run(parser, args, timings):
+    if args.cmd in ("scan-ios", "scan-android", "scan-artifact", "check", "evaluate", "evaluate-batch"):
+        from .formats import EXTENSIONS, dump
+    if args.cmd in ("scan-ios", "scan-android", "check"):
+        cache_dir = None if args.no_cache else (args.cache_dir or str(pathlib.Path(args.project) / CACHE_DIRNAME))
+        scan_opts = {"prune": _prune(args), "jobs": args.jobs, "cache_dir": cache_dir, "cache_hash": args.cache_hash,
+                     "timings": timings}
+
+    if args.cmd in ("scan-ios", "scan-android") and args.baseline and not args.git_rev:
+        parser.error("--baseline needs --git-rev")
+    if args.cmd in ("scan-ios", "scan-android") and args.git_rev:
+        # Blobs are read in-process from one cat-file pipe and reused through --baseline, not the file cache.
+        unsupported = [flag for flag, used in (("--jobs", args.jobs != 1), ("--cache-dir", args.cache_dir),
+                                               ("--cache-hash", args.cache_hash), ("--no-cache", args.no_cache)) if used]
+        if unsupported:
+            parser.error(f"--git-rev does not take {', '.join(unsupported)} (use --baseline to reuse an earlier scan)")
+
+    if args.cmd in ("scan-ios", "scan-android") and args.git_rev:
+        from .formats import load
+        from .gitrev import scan_rev
+        platform = "ios" if args.cmd == "scan-ios" else "android"
+        baseline = load(args.baseline) if args.baseline else None
+        facts = scan_rev(platform, args.project, args.git_rev, scan_opts["prune"], baseline=baseline, timings=timings)
+        dump(facts, args.out, "facts", args.format)
+        print(f"Wrote {platform} facts for {args.git_rev} ({facts['git']['commit'][:12]}) to {args.out}")
+    elif args.cmd == "scan-ios":
+        from .ios_scan import scan_ios
+        facts = scan_ios(args.project, **scan_opts)
+        dump(facts, args.out, "facts", args.format)
         print(f"Wrote iOS facts to {args.out}")
     elif args.cmd == "scan-android":
-        facts = scan_android(args.project)
-        pathlib.Path(args.out).write_text(json.dumps(facts, indent=2))
+        from .android_scan import scan_android
+        facts = scan_android(args.project, **scan_opts)
+        dump(facts, args.out, "facts", args.format)
         print(f"Wrote Android facts to {args.out}")
+    elif args.cmd == "scan-artifact":
+        import zipfile
+        from .artifact import scan_artifact
+        try:
+            facts = scan_artifact(args.artifact)
+        except zipfile.BadZipFile as e:
+            parser.error(f"{args.artifact}: not a zip archive ({e})")
+        except ValueError as e:
+            parser.error(f"{args.artifact}: {e}")
+        dump(facts, args.out, "facts", args.format)
+        print(f"Wrote {facts['platform']} facts for {args.artifact} to {args.out}")
+    elif args.cmd == "check":
+        from .check import check_project
+        report = check_project(args.project, _load_rules_doc(args), evidence=_evidence(args), fail_fast=args.fail_fast, **scan_opts)
+        if args.out:
+            dump(report, args.out, "report", args.format)
+        s = report["summary"]
+        print(f"{'Partial: ' if report.get('partial') else ''}{s['blocking']} blocking, {s['advisory']} advisory, {s['fyi']} fyi")
+        for f in report["findings"]:
+            if f["severity"] == "blocking":
+                print(f"  {f['status'].upper():4} {f['id']}")
+        if s["blocking"]:
+            sys.exit(1)
     elif args.cmd == "evaluate":
-        facts = [json.loads(pathlib.Path(f).read_text()) for f in args.facts]
-        if args.rules_pack:
-            pack = load_rules_pack(args.rules_pack)
-            rules_doc = {"version": pack.get("version","pack"), "rules": pack.get("rules",[])}
-        else:
-            rules_doc = load_rules(args.rules)
-        report = evaluate_rules(facts, rules_doc)
-        pathlib.Path(args.out).write_text(json.dumps(report, indent=2))
+        from .rules import evaluate_rules, load_facts
+        facts = [load_facts(f) for f in args.facts]
+        report = evaluate_rules(facts, _load_rules_doc(args), evidence=_evidence(args), timings=timings)
+        dump(report, args.out, "report", args.format)
         print(f"Wrote report to {args.out}")
+    elif args.cmd == "evaluate-batch":
+        from .rules import evaluate_batch
+        try:
+            apps = _batch_apps(args.apps_dir) if args.apps_dir else _manifest_apps(args.manifest)
+        except ValueError as e:
+            parser.error(str(e))
+        out_dir = pathlib.Path(args.out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stream = open(args.jsonl, "w", encoding="utf-8") if args.jsonl else None
+        try:
+            for name, report in evaluate_batch(apps, _load_rules_doc(args), jobs=args.jobs, evidence=_evidence(args), engine=args.engine):
+                path = out_dir / f"{name}.report{EXTENSIONS[args.format]}"
+                dump(report, path, "report", args.format)
+                if stream:
+                    line = {"app": name, "report": str(path), "version": report["version"], "summary": report["summary"],
+                            "findings": [{k: f[k] for k in ("id", "severity", "status")} for f in report["findings"]]}
+                    stream.write(json.dumps(line) + "\n")
+        finally:
+            if stream:
+                stream.close()
+        print(f"Wrote {len(apps)} reports to {out_dir}")
     elif args.cmd == "html":
-        report = json.loads(pathlib.Path(args.report).read_text())
-        html = render_html(report)
-        pathlib.Path(args.out).write_text(html)
+        from .formats import load
+        from .report import HtmlRenderer
+        report = load(args.report)
+        HtmlRenderer(args.template_cache).write(report, args.out, timings)
         print(f"Wrote HTML report to {args.out}")
+    elif args.cmd == "aggregate":
+        from .fleet import build_index, iter_jsonl, iter_reports, write_dashboard
+        prev_path = pathlib.Path(args.previous or pathlib.Path(args.out_dir) / "summary.json")
+        previous = json.loads(prev_path.read_text()) if prev_path.is_file() else None
+        idx = build_index(iter_jsonl(args.jsonl) if args.jsonl else iter_reports(args.reports))
+        summary = write_dashboard(idx, args.out_dir, previous, args.page_size, args.template_cache)
+        print(f"Aggregated {summary['apps']} apps ({summary['blocked_apps']} blocked) into {args.out_dir}")
+    elif args.cmd == "watch":
+        from .watch import watch
+        try:
+            watch(args.project, _load_rules_doc(args), functools.partial(_print_change, args), args.platform,
+                  _prune(args), _evidence(args), args.poll)
+        except KeyboardInterrupt:
+            pass
+    elif args.cmd == "serve":
+        from .server import serve
+        serve(args.host, args.port, args.socket, args.workers, args.rules, args.rules_pack,
+              {"cache_dir": args.pack_cache, "use_cache": not args.no_pack_cache, "offline": args.offline})
     else:
         parser.print_help()
 
@@ -0,0 +1,159 @@
+"""
+Fleet view over many apps' reports: per-rule counts across apps, blocked
+apps, and the trend against the previous run's summary.json.
+
+Reports are read one at a time and reduced to a few integers each, so
+memory grows with the number of apps and rules, not with report size.
+"""
+import json, os, pathlib
+from array import array
+from .formats import load
+
+SEVERITIES = ("blocking", "advisory", "fyi")
+
+def report_paths(paths):
+    """Expand files and directories (their *.report.{json,msgpack}, else *.json) in sorted order."""
+    for p in map(pathlib.Path, paths):
+        if p.is_dir():
+            found = sorted([*p.glob("*.report.json"), *p.glob("*.report.msgpack")]) or sorted(p.glob("*.json"))
+            yield from found
+        else:
+            yield p
+
+def _app_name(path: pathlib.Path):
+    name = path.name
+    for suffix in (".report.json", ".report.msgpack", ".json"):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+def iter_reports(paths):
+    """Yield (app, findings) per report file (any --format), loading one file at a time."""
+    for path in report_paths(paths):
+        report = load(path)
+        yield _app_name(path), report.get("findings") or []
+
+def iter_jsonl(path):
+    """Yield (app, findings) from an `evaluate-batch --jsonl` summary stream."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                yield entry["app"], entry.get("findings") or []
+
+class FleetIndex:
+    """
+    Compact per-rule / per-app indexes. Rules and apps are numbered; each
+    rule keeps arrays of the app numbers it failed/warned for, each app its
+    severity counts and the rule numbers it hit.
+    """
+
+    def __init__(self):
+        self.apps = []
+        self.app_counts = array("I")        # 3 per app: blocking, advisory, fyi
+        self.app_rules = []                 # per app: array of rule numbers
+        self.rule_no = {}
+        self.rule_ids = []
+        self.rule_severity = []
+        self.rule_fail = []                 # per rule: array of app numbers
+        self.rule_warn = []
+
+    def add(self, app, findings):
+        a = len(self.apps)
+        self.apps.append(app)
+        counts = [0, 0, 0]
+        hits = array("I")
+        for f in findings:
+            rid = f.get("id")
+            r = self.rule_no.get(rid)
+            if r is None:
+                r = self.rule_no[rid] = len(self.rule_ids)
+                self.rule_ids.append(rid)
+                self.rule_severity.append(f.get("severity", "advisory"))
+                self.rule_fail.append(array("I"))
+                self.rule_warn.append(array("I"))
+            sev = f.get("severity", "advisory")
+            if sev in SEVERITIES:
+                counts[SEVERITIES.index(sev)] += 1
+            (self.rule_fail if f.get("status") == "fail" else self.rule_warn)[r].append(a)
+            hits.append(r)
+        self.app_counts.extend(counts)
+        self.app_rules.append(hits)
+
+    def counts(self, a):
+        return dict(zip(SEVERITIES, self.app_counts[3 * a: 3 * a + 3]))
+
+    def blocked(self, a):
+        return self.app_counts[3 * a] > 0
+
+    def rule_rows(self):
+        """Per-rule rows, most widespread first."""
+        rows = [{"id": rid, "severity": self.rule_severity[r], "fail": len(self.rule_fail[r]),
+                 "warn": len(self.rule_warn[r]), "apps": len(self.rule_fail[r]) + len(self.rule_warn[r])}
+                for r, rid in enumerate(self.rule_ids)]
+        rows.sort(key=lambda row: (SEVERITIES.index(row["severity"]) if row["severity"] in SEVERITIES else 3, -row["apps"], row["id"]))
+        return rows
+
+    def summary(self, previous=None):
+        """Machine-readable fleet summary; with `previous` (an earlier summary), adds the trend."""
+        totals = dict.fromkeys(SEVERITIES, 0)
+        for i, sev in enumerate(SEVERITIES):
+            totals[sev] = sum(self.app_counts[i::3])
+        blocked = sorted(self.apps[a] for a in range(len(self.apps)) if self.blocked(a))
+        rules = {row["id"]: {k: row[k] for k in ("severity", "apps", "fail", "warn")} for row in self.rule_rows()}
+        out = {"apps": len(self.apps), "blocked_apps": len(blocked), "totals": totals, "rules": rules, "blocked": blocked}
+        if previous:
+            before = set(previous.get("blocked", []))
+            prev_rules = previous.get("rules", {})
+            out["trend"] = {
+                "previous_apps": previous.get("apps", 0),
+                "blocked_delta": len(blocked) - previous.get("blocked_apps", len(before)),
+                "newly_blocked": sorted(set(blocked) - before),
+                "unblocked": sorted(before - set(blocked)),
+                "rules": {rid: rules.get(rid, {}).get("apps", 0) - prev_rules.get(rid, {}).get("apps", 0)
+                          for rid in sorted(rules.keys() | prev_rules.keys())
+                          if rules.get(rid, {}).get("apps", 0) != prev_rules.get(rid, {}).get("apps", 0)},
+            }
+        return out
+
+def build_index(records) -> FleetIndex:
+    idx = FleetIndex()
+    for app, findings in records:
+        idx.add(app, findings)
+    return idx
+
+def write_dashboard(idx: FleetIndex, out_dir, previous=None, page_size=200, bytecode_cache=None):
+    """
+    Write summary.json, index.html (totals, trend, per-rule table) and
+    apps-NNNN.html pages of `page_size` apps each; returns the summary.
+    """
+    from .report import _load_text, template_environment
+    out = pathlib.Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    summary = idx.summary(previous)
+    env = template_environment(bytecode_cache)
+    css = _load_text("apcop.assets", "report.css")
+    n = len(idx.apps)
+    pages = max(1, -(-n // page_size))
+    page_name = "apps-{:04d}.html".format
+
+    stream = env.get_template("fleet_index.html").stream(
+        summary=summary, rules=idx.rule_rows(), trend=summary.get("trend"), css=css,
+        pages=[page_name(p + 1) for p in range(pages)])
+    stream.enable_buffering(256)
+    stream.dump(str(out / "index.html"), encoding="utf-8")
+
+    apps_tmpl = env.get_template("fleet_apps.html")
+    for p in range(pages):
+        rows = ({"app": idx.apps[a], "blocked": idx.blocked(a), "counts": idx.counts(a),
+                 "rules": [idx.rule_ids[r] for r in idx.app_rules[a]]}
+                for a in range(p * page_size, min(n, (p + 1) * page_size)))
+        stream = apps_tmpl.stream(rows=rows, page=p + 1, pages=pages, css=css,
+                                  prev=page_name(p) if p else None, next=page_name(p + 2) if p + 1 < pages else None)
+        stream.enable_buffering(256)
+        stream.dump(str(out / page_name(p + 1)), encoding="utf-8")
+
+    tmp = out / "summary.json.tmp"
+    tmp.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    os.replace(tmp, out / "summary.json")
+    return summary
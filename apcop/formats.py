@@ -0,0 +1,123 @@
+"""
+On-disk encodings for facts and reports, selected with `--format`:
+
+    json     pretty-printed JSON, as always (the default)
+    compact  minified JSON in a schema-versioned envelope; the facts'
+             string lists (permissions, SDK names, symbols, symbol-hit
+             files) become indices into one interned string table
+    msgpack  the compact envelope as MessagePack (optional `msgpack` package)
+
+`load`/`loads` detect all three, so readers never need to be told.
+"""
+import json, pathlib
+
+FORMATS = ("json", "compact", "msgpack")
+EXTENSIONS = {"json": ".json", "compact": ".json", "msgpack": ".msgpack"}
+
+# Bump when the envelope layout changes; readers reject newer schemas.
+SCHEMA = 1
+
+# Per-platform facts fields holding lists of strings, stored as string-table indices.
+INTERNED = {
+    "ios": ("plist_keys", "signals.sdk_names", "signals.symbols"),
+    "android": ("permissions", "deps"),
+}
+
+class _Strings:
+    def __init__(self):
+        self.table = []
+        self.index = {}
+
+    def ref(self, s):
+        i = self.index.get(s)
+        if i is None:
+            i = self.index[s] = len(self.table)
+            self.table.append(s)
+        return i
+
+def _parent(d, dotted, copy=False):
+    """The dict holding the last component of `dotted` (copied on the way down when `copy`)."""
+    *path, last = dotted.split(".")
+    for k in path:
+        child = d.get(k)
+        if not isinstance(child, dict):
+            return None, last
+        if copy:
+            child = d[k] = dict(child)
+        d = child
+    return d, last
+
+def pack_facts(facts: dict) -> dict:
+    strings = _Strings()
+    out = dict(facts)
+    lists = []
+    for dotted in INTERNED.get(facts.get("platform"), ()):
+        parent, key = _parent(out, dotted, copy=True)
+        vals = parent.get(key) if parent is not None else None
+        if isinstance(vals, list) and all(isinstance(v, str) for v in vals):
+            parent[key] = [strings.ref(v) for v in vals]
+            lists.append(dotted)
+    env = {"apppolicy": "facts", "schema": SCHEMA, "lists": lists}
+    hits = (out.get("signals") or {}).get("symbol_hits")
+    if isinstance(hits, dict) and all(isinstance(h, dict) and isinstance(h.get("file"), str) and set(h) == {"file", "line"}
+                                      for locs in hits.values() for h in locs):
+        # {token: [{"file", "line"}, ...]} -> [[token, file, line, file, line, ...], ...]
+        out["signals"]["symbol_hits"] = [[strings.ref(t)] + [x for h in locs for x in (strings.ref(h["file"]), h["line"])]
+                                         for t, locs in hits.items()]
+        env["hits"] = True
+    env["strings"] = strings.table
+    env["facts"] = out
+    return env
+
+def unpack_facts(env: dict) -> dict:
+    table = env["strings"]
+    facts = env["facts"]
+    for dotted in env.get("lists", ()):
+        parent, key = _parent(facts, dotted)
+        parent[key] = [table[i] for i in parent[key]]
+    if env.get("hits"):
+        signals = facts["signals"]
+        signals["symbol_hits"] = {table[row[0]]: [{"file": table[row[i]], "line": row[i + 1]} for i in range(1, len(row), 2)]
+                                  for row in signals["symbol_hits"]}
+    return facts
+
+def dumps(obj: dict, kind="facts", fmt="json") -> bytes:
+    """Encode a facts dict (kind="facts") or a report (kind="report")."""
+    if fmt == "json":
+        return json.dumps(obj, indent=2).encode("utf-8")
+    env = pack_facts(obj) if kind == "facts" else {"apppolicy": "report", "schema": SCHEMA, "report": obj}
+    if fmt == "compact":
+        return json.dumps(env, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if fmt == "msgpack":
+        import msgpack  # optional: pip install 'apppolicy-scanner[msgpack]'
+        return msgpack.packb(env, use_bin_type=True)
+    raise ValueError(f"unknown format {fmt!r} (expected one of {', '.join(FORMATS)})")
+
+def _unwrap(obj):
+    if not (isinstance(obj, dict) and obj.get("apppolicy") in ("facts", "report") and "schema" in obj):
+        return obj
+    if obj["schema"] > SCHEMA:
+        raise ValueError(f"{obj['apppolicy']} file uses schema {obj['schema']}; this apppolicy reads up to {SCHEMA}")
+    return unpack_facts(obj) if obj["apppolicy"] == "facts" else obj["report"]
+
+def _is_msgpack(data: bytes) -> bool:
+    # Every MessagePack file here is an envelope map: fixmap (0x80-0x8f), map16 (0xde) or map32 (0xdf).
+    # None of those bytes can start a JSON text.
+    return bool(data) and (0x80 <= data[0] <= 0x8F or data[0] in (0xDE, 0xDF))
+
+def loads(data: bytes, name="input"):
+    """Decode any supported format (plain JSON, compact envelope, MessagePack); `name` labels errors."""
+    if _is_msgpack(data):
+        import msgpack
+        return _unwrap(msgpack.unpackb(data, raw=False, strict_map_key=False))
+    try:
+        obj = json.loads(data)
+    except ValueError as e:
+        raise ValueError(f"{name}: not a JSON, compact JSON or MessagePack file ({e})") from None
+    return _unwrap(obj)
+
+def load(path):
+    return loads(pathlib.Path(path).read_bytes(), str(path))
+
+def dump(obj: dict, path, kind="facts", fmt="json"):
+    pathlib.Path(path).write_bytes(dumps(obj, kind, fmt))
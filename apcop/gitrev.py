@@ -0,0 +1,142 @@
+"""
+Scan a git revision straight from the object database, without a checkout.
+
+`git ls-tree -r` lists the revision's tree under the project directory;
+the blobs the scanner classifies are read through one long-lived
+`git cat-file --batch` process and handed, as bytes, to the scanner's own
+extract_file, then merged by its aggregate() in walk order. The facts are
+those a scan of a checkout of that revision would give.
+
+Such facts carry a "git" block: the commit scanned and, for every file
+that was extracted, its blob id and result. With one of them as the
+`baseline`, a scan of another revision asks `git diff-tree` which paths
+changed between the two, extracts only those and reuses the rest.
+Local repositories only.
+"""
+import os, subprocess, time
+from .ios_scan import SYMBOL_TOKENS
+from .scanners import SCANNERS
+from .timings import phase_of
+from .walk import DEFAULT_PRUNE, walk_key
+
+# Regular and executable files; symlinks (120000) and submodules (160000) are not scanned.
+BLOB_MODES = {"100644", "100755"}
+
+def _git(cwd, *args) -> bytes:
+    proc = subprocess.run(["git", *args], cwd=cwd, capture_output=True)
+    if proc.returncode:
+        raise RuntimeError(f"git {args[0]} failed: {proc.stderr.decode(errors='replace').strip()}")
+    return proc.stdout
+
+def resolve_commit(project, rev) -> str:
+    return _git(project, "rev-parse", "--verify", "--end-of-options", f"{rev}^{{commit}}").decode().strip()
+
+class BlobReader:
+    """One `git cat-file --batch` process for the whole scan; read(oid) -> the blob's bytes."""
+
+    def __init__(self, cwd):
+        self.proc = subprocess.Popen(["git", "cat-file", "--batch"], cwd=cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def read(self, oid: str) -> bytes:
+        self.proc.stdin.write(oid.encode() + b"\n")
+        self.proc.stdin.flush()
+        header = self.proc.stdout.readline().split()
+        if len(header) != 3:
+            raise KeyError(f"git object {oid} is missing")
+        size = int(header[2])
+        data = self.proc.stdout.read(size + 1)  # contents, then a newline
+        return data[:size]
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.stdout.close()
+        self.proc.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _wanted(rel, mode, classify, prune):
+    """The kind of a tree entry, or None when the scanner skips it."""
+    parts = rel.split("/")
+    if mode not in BLOB_MODES or any(p in prune for p in parts[:-1]):
+        return None
+    return classify(parts[-1])
+
+def list_tree(project, commit, classify, prune=DEFAULT_PRUNE, timings=None):
+    """[(kind, blob oid, rel)] for the files under `project` at `commit`, in walk_files order."""
+    out = []
+    records = _git(project, "ls-tree", "-r", "-z", commit).split(b"\0")
+    for rec in records:
+        if not rec:
+            continue
+        meta, path = rec.split(b"\t", 1)
+        mode, _type, oid = meta.decode().split()
+        rel = os.fsdecode(path)
+        kind = _wanted(rel, mode, classify, prune)
+        if kind is not None:
+            out.append((kind, oid, rel))
+    if timings is not None:
+        visited = sum(1 for rec in records if rec)
+        timings.count("files_visited", visited)
+        timings.count("files_skipped", visited - len(out))
+    return sorted(out, key=lambda e: walk_key(e[2]))
+
+def changed_paths(project, base, commit):
+    """[(rel, new mode, new blob oid)] under `project` that differ between two commits; deletions have mode "000000"."""
+    fields = _git(project, "diff-tree", "-r", "-z", "--no-renames", "--relative", base, commit).split(b"\0")
+    out = []
+    for i in range(0, len(fields) - 1, 2):
+        # ":<old mode> <new mode> <old oid> <new oid> <status>", then the path.
+        _old_mode, mode, _old_oid, oid, _status = fields[i].decode().lstrip(":").split()
+        out.append((os.fsdecode(fields[i + 1]), mode, oid))
+    return out
+
+def scan_rev(platform, project, rev, prune=DEFAULT_PRUNE, tokens=SYMBOL_TOKENS, baseline=None, timings=None):
+    """
+    Facts for `project` (a directory inside a git work tree) at revision
+    `rev`. `baseline` is facts from an earlier scan_rev of the same
+    project: only paths changed since its commit are read.
+    """
+    module = SCANNERS[platform]
+    phase = phase_of(timings)
+    commit = resolve_commit(project, rev)
+    fp = module.cache_fingerprint(tokens)
+    prune = frozenset(prune)
+
+    with phase(f"{platform}.walk"):
+        if baseline is None:
+            files = {}
+            todo = list_tree(project, commit, module.classify, prune, timings)
+        else:
+            git = baseline.get("git") if isinstance(baseline, dict) else None
+            if not git or baseline.get("platform") != platform:
+                raise ValueError(f"baseline is not {platform} facts from a --git-rev scan")
+            if git.get("fingerprint") != fp or git.get("prune") != sorted(prune):
+                raise ValueError("baseline was scanned with another scanner version, token list or --prune; scan it again")
+            files = {rel: tuple(v) for rel, v in git["files"].items()}
+            todo = []
+            for rel, mode, oid in changed_paths(project, git["commit"], commit):
+                kind = _wanted(rel, mode, module.classify, prune)
+                if kind is None:
+                    files.pop(rel, None)
+                elif files.get(rel, (None, None))[:2] != (kind, oid):
+                    todo.append((kind, oid, rel))
+
+    with phase(f"{platform}.extract"), BlobReader(project) as blobs:
+        for kind, oid, rel in todo:
+            data = blobs.read(oid)
+            t0 = time.perf_counter()
+            files[rel] = (kind, oid, module.extract_file(kind, rel, tuple(tokens), data=data))
+            if timings is not None:
+                timings.file(rel, kind, time.perf_counter() - t0, len(data))
+    if timings is not None and baseline is not None:
+        timings.count("files_cached", len(files) - len(todo))
+
+    with phase(f"{platform}.aggregate"):
+        order = sorted(files, key=walk_key)
+        facts = module.aggregate([(files[rel][0], rel, files[rel][2]) for rel in order])
+    facts["git"] = {"commit": commit, "fingerprint": fp, "prune": sorted(prune), "files": {rel: list(files[rel]) for rel in order}}
+    return facts
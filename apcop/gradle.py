@@ -0,0 +1,332 @@
+"""
+Single-pass extractors for Gradle build scripts (Groovy and Kotlin DSL),
+version catalogs (`gradle/*.versions.toml`) and `gradle.lockfile`.
+
+Each file is tokenized once with one compiled pattern; a small state
+machine over the tokens tracks block nesting and picks out targetSdk /
+minSdk, applied plugins and declared dependencies. Catalog accessors
+(`libs.androidx.core.ktx`, `libs.bundles.x`, `libs.versions.y`) are kept
+as references and resolved later against a CatalogIndex, because the
+catalog is a different file (possibly extracted in another process).
+"""
+import re
+
+_GRADLE_TOKEN = re.compile(r'''
+    (?P<skip>\s+|//[^\n]*|/\*.*?\*/)
+  | (?P<str>"""(?:.|\n)*?"""|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+  | (?P<num>\d+)
+  | (?P<id>[A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)*)
+  | (?P<op>[{}()=:,])
+  | (?P<other>.)
+''', re.X | re.S)
+
+_TOML_TOKEN = re.compile(r'''
+    (?P<skip>[ \t\r\n]+|\#[^\n]*)
+  | (?P<str>"(?:\\.|[^"\\\n])*"|'[^'\n]*')
+  | (?P<key>[A-Za-z0-9_+-]+)
+  | (?P<op>[\[\]{}=,.])
+  | (?P<other>.)
+''', re.X)
+
+SDK_KEYS = {"targetSdk": "targetsdk", "targetSdkVersion": "targetsdk", "minSdk": "minsdk", "minSdkVersion": "minsdk"}
+# Call names inside `dependencies {}` that wrap a dependency rather than name a configuration.
+_WRAPPERS = {"platform", "enforcedPlatform", "project", "kotlin", "files", "fileTree", "testFixtures", "variantOf",
+             "group", "name", "version", "exclude", "because", "transitive", "isTransitive", "force", "isForce"}
+# Kotlin/Groovy keywords that can start a statement in a `dependencies {}` block; never configurations.
+_KEYWORDS = {"val", "var", "def", "final", "const", "private", "if", "else", "for", "while", "when", "return", "fun", "new"}
+# Blocks whose targetSdk/minSdk are not the module's own (AGP's lint/test targets).
+_SDK_SKIP_BLOCKS = {"dependencies", "lint", "lintOptions", "testOptions"}
+APPLICATION_PLUGINS = {"com.android.application"}
+
+def _tokens(pattern, text):
+    for m in pattern.finditer(text):
+        kind = m.lastgroup
+        if kind != "skip":
+            yield kind, m.group()
+
+def _unquote(s):
+    if s.startswith('"""'):
+        return s[3:-3]
+    return s[1:-1]
+
+def is_test_configuration(name: str) -> bool:
+    return "test" in name.lower()
+
+def _flush_map(out, conf, dep_map):
+    """Emit a finished `group: ..., name: ..., version: ...` dependency."""
+    if conf and "group" in dep_map and "name" in dep_map:
+        version = dep_map.get("version")
+        out["deps"].append([conf, f"{dep_map['group']}:{dep_map['name']}" + (f":{version}" if version else "")])
+    dep_map.clear()
+
+def parse_build_file(text: str) -> dict:
+    """
+    Facts one build.gradle(.kts) declares: {"targetsdk", "minsdk", "plugins",
+    "deps"}. SDK values are ints, or catalog references ("libs.versions.x")
+    still to be resolved. `deps` holds [configuration, coordinate] pairs,
+    where a coordinate is "group:name[:version]", a catalog reference
+    "@libs.alias" or a module dependency "project:" + ":path".
+    """
+    toks = list(_tokens(_GRADLE_TOKEN, text))
+    out = {"targetsdk": None, "minsdk": None, "plugins": [], "deps": []}
+    stack = []            # open block names
+    sdk_in_default = set()
+    conf = None           # configuration of the dependency being read
+    dep_map = {}          # group/name/version map notation
+    n = len(toks)
+    i = 0
+    while i < n:
+        kind, tok = toks[i]
+        nxt = toks[i + 1] if i + 1 < n else (None, None)
+        if tok == "{" and kind == "op":
+            name = None
+            j = i - 1
+            if j >= 0 and toks[j][1] == ")":
+                # `create("release") {` / `getByName("x") {`: name the block after the call.
+                depth = 0
+                while j >= 0:
+                    if toks[j][1] == ")":
+                        depth += 1
+                    elif toks[j][1] == "(":
+                        depth -= 1
+                        if depth == 0:
+                            break
+                    j -= 1
+                j -= 1
+            if j >= 0 and toks[j][0] == "id":
+                name = toks[j][1]
+            stack.append(name)
+            conf = None
+        elif tok == "}" and kind == "op":
+            if stack and stack[-1] == "dependencies":
+                _flush_map(out, conf, dep_map)
+            if stack:
+                stack.pop()
+            conf = None
+        elif kind == "id":
+            block = stack[-1] if stack else None
+            if tok in SDK_KEYS and _SDK_SKIP_BLOCKS.isdisjoint(stack):
+                field = SDK_KEYS[tok]
+                j = i + 1
+                while j < n and toks[j][1] in ("=", "("):
+                    j += 1
+                if j < n:
+                    vk, v = toks[j]
+                    value = None
+                    if vk == "num":
+                        value = int(v)
+                    elif vk == "id" and ".versions." in v:
+                        # libs.versions.targetSdk.get().toInt()
+                        value = v.split(".get", 1)[0]
+                    in_default = "defaultConfig" in stack
+                    if value is not None and (out[field] is None or (in_default and field not in sdk_in_default)):
+                        out[field] = value
+                        if in_default:
+                            sdk_in_default.add(field)
+                i = j
+            elif block == "plugins" or tok == "apply":
+                if tok in ("id", "plugin") or (tok == "apply" and nxt[1] == "plugin"):
+                    j = i + 1
+                    while j < n and toks[j][1] in ("(", ":", "plugin", "="):
+                        j += 1
+                    if j < n and toks[j][0] == "str":
+                        out["plugins"].append(_unquote(toks[j][1]))
+                        i = j
+                elif tok == "alias" and nxt[1] == "(" and i + 2 < n and toks[i + 2][0] == "id":
+                    out["plugins"].append("@" + toks[i + 2][1])
+                    i += 2
+                elif tok == "kotlin" and nxt[1] == "(" and i + 2 < n and toks[i + 2][0] == "str":
+                    out["plugins"].append("org.jetbrains.kotlin." + _unquote(toks[i + 2][1]))
+                    i += 2
+            elif block == "dependencies" and "buildscript" not in stack:
+                if tok in ("group", "name", "version") and nxt[1] in (":", "=") and i + 2 < n and toks[i + 2][0] == "str":
+                    if tok in dep_map:
+                        _flush_map(out, conf, dep_map)
+                    dep_map[tok] = _unquote(toks[i + 2][1])
+                    i += 2
+                elif tok == "project" and nxt[1] == "(" and conf:
+                    j = i + 2
+                    while j < n and toks[j][0] != "str" and toks[j][1] != ")":
+                        j += 1
+                    if j < n and toks[j][0] == "str":
+                        out["deps"].append([conf, "project:" + _unquote(toks[j][1])])
+                    i = j
+                elif tok == "kotlin" and nxt[1] == "(" and conf and i + 2 < n and toks[i + 2][0] == "str":
+                    out["deps"].append([conf, "org.jetbrains.kotlin:kotlin-" + _unquote(toks[i + 2][1])])
+                    i += 2
+                elif "." in tok:
+                    # Catalog accessor (libs.x.y, libs.bundles.z); resolved in aggregate.
+                    if conf:
+                        out["deps"].append([conf, "@" + tok])
+                elif tok in _KEYWORDS or nxt[1] == "=":
+                    # `val x = "a:b:c"` / `x = ...`: a declaration or assignment, not a dependency.
+                    _flush_map(out, conf, dep_map)
+                    conf = None
+                elif tok not in _WRAPPERS and (nxt[0] == "str" or nxt[1] == "("
+                                               or (nxt[0] == "id" and ("." in nxt[1] or nxt[1] in _WRAPPERS))):
+                    # A configuration call: `implementation("...")`, `api "..."`, `api libs.x`, `api project(...)`.
+                    _flush_map(out, conf, dep_map)
+                    conf = tok
+        elif kind == "str" and conf and stack and stack[-1] == "dependencies" and "buildscript" not in stack:
+            value = _unquote(tok)
+            if value.count(":") >= 1 and " " not in value and not value.startswith(":"):
+                out["deps"].append([conf, value])
+        i += 1
+    return out
+
+_TOML_ESCAPE = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))', re.S)
+_TOML_SIMPLE_ESCAPES = {'"': '"', "\\": "\\", "n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+def _toml_unescape(s: str) -> str:
+    """A basic string's escapes (\\" \\\\ \\n \\t \\uXXXX \\UXXXXXXXX ...); other text, non-ASCII included, is kept as is."""
+    def sub(m):
+        if m.group(3) is None:
+            return chr(int(m.group(1) or m.group(2), 16))
+        return _TOML_SIMPLE_ESCAPES.get(m.group(3), m.group())
+    return _TOML_ESCAPE.sub(sub, s)
+
+def _toml_value(toks, i):
+    kind, tok = toks[i]
+    if kind == "str":
+        return (tok[1:-1] if tok.startswith("'") else _toml_unescape(tok[1:-1])), i + 1
+    if tok == "[":
+        items, i = [], i + 1
+        while i < len(toks) and toks[i][1] != "]":
+            if toks[i][1] == ",":
+                i += 1
+                continue
+            v, i = _toml_value(toks, i)
+            items.append(v)
+        return items, i + 1
+    if tok == "{":
+        table, i = {}, i + 1
+        while i < len(toks) and toks[i][1] != "}":
+            if toks[i][1] == ",":
+                i += 1
+                continue
+            key, i = _toml_key(toks, i)
+            v, i = _toml_value(toks, i + 1)  # skip "="
+            _set_path(table, key, v)
+        return table, i + 1
+    return tok, i + 1
+
+def _toml_key(toks, i):
+    parts = []
+    while i < len(toks):
+        kind, tok = toks[i]
+        if kind in ("key", "str"):
+            parts.append(tok[1:-1] if kind == "str" else tok)
+        elif tok != ".":
+            break
+        i += 1
+    return parts, i
+
+def _set_path(table, parts, value):
+    for p in parts[:-1]:
+        table = table.setdefault(p, {})
+    table[parts[-1]] = value
+
+def parse_toml(text: str) -> dict:
+    """The subset of TOML version catalogs use: [tables], dotted keys, strings, inline tables, arrays."""
+    toks = list(_tokens(_TOML_TOKEN, text))
+    root = {}
+    table = root
+    i = 0
+    while i < len(toks):
+        if toks[i][1] == "[":
+            parts, i = _toml_key(toks, i + 1)
+            table = root
+            for p in parts:
+                table = table.setdefault(p, {})
+            i += 1  # "]"
+            continue
+        parts, i = _toml_key(toks, i)
+        if not parts or i >= len(toks) or toks[i][1] != "=":
+            i += 1
+            continue
+        value, i = _toml_value(toks, i + 1)
+        _set_path(table, parts, value)
+    return root
+
+def accessor(alias: str) -> str:
+    """Normalise a catalog alias the way Gradle builds accessors: `androidx-core_ktx` -> `androidx.core.ktx`."""
+    return alias.replace("-", ".").replace("_", ".").lower()
+
+def _version(v, versions):
+    if isinstance(v, dict):
+        if "ref" in v:
+            return versions.get(accessor(v["ref"]))
+        for k in ("strictly", "require", "prefer"):
+            if k in v:
+                return v[k]
+        return None
+    return v
+
+def parse_catalog(text: str) -> dict:
+    """A catalog file as plain accessor -> value maps: versions, libraries (coordinates), bundles, plugins."""
+    doc = parse_toml(text)
+    versions = {accessor(k): _version(v, {}) for k, v in (doc.get("versions") or {}).items()}
+    libraries = {}
+    for alias, spec in (doc.get("libraries") or {}).items():
+        if isinstance(spec, str):
+            coord = spec
+        elif isinstance(spec, dict):
+            module = spec.get("module") or (f"{spec['group']}:{spec['name']}" if "group" in spec and "name" in spec else None)
+            if module is None:
+                continue
+            version = _version(spec.get("version"), versions)
+            coord = f"{module}:{version}" if version else module
+        else:
+            continue
+        libraries[accessor(alias)] = coord
+    bundles = {accessor(k): [accessor(a) for a in v] for k, v in (doc.get("bundles") or {}).items() if isinstance(v, list)}
+    plugins = {}
+    for alias, spec in (doc.get("plugins") or {}).items():
+        pid = spec.split(":", 1)[0] if isinstance(spec, str) else (spec.get("id") if isinstance(spec, dict) else None)
+        if pid:
+            plugins[accessor(alias)] = pid
+    return {"versions": versions, "libraries": libraries, "bundles": bundles, "plugins": plugins}
+
+def parse_lockfile(text: str) -> list:
+    """[[configurations, "group:name:version"], ...] from a gradle.lockfile."""
+    out = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#") or line.startswith("empty="):
+            continue
+        coord, _, confs = line.partition("=")
+        out.append([confs.split(",") if confs else [], coord])
+    return out
+
+class CatalogIndex:
+    """Accessor lookups across every catalog in the project, keyed by catalog name (`libs` for libs.versions.toml)."""
+
+    def __init__(self, catalogs):
+        self.libraries, self.bundles, self.versions, self.plugins = {}, {}, {}, {}
+        for name, cat in catalogs.items():
+            for k, v in cat["libraries"].items():
+                self.libraries[f"{name}.{k}"] = v
+            for k, v in cat["bundles"].items():
+                self.bundles[f"{name}.bundles.{k}"] = [f"{name}.{a}" for a in v]
+            for k, v in cat["versions"].items():
+                self.versions[f"{name}.versions.{k}"] = v
+            for k, v in cat["plugins"].items():
+                self.plugins[f"{name}.plugins.{k}"] = v
+
+    def dependency(self, ref: str):
+        """Coordinates for an `@libs.x` / `@libs.bundles.x` reference (empty if unknown)."""
+        ref = ref.lstrip("@").lower()
+        if ref in self.bundles:
+            return [self.libraries[a] for a in self.bundles[ref] if a in self.libraries]
+        coord = self.libraries.get(ref)
+        return [coord] if coord else []
+
+    def version(self, ref: str):
+        v = self.versions.get(ref.lower())
+        try:
+            return int(v)
+        except (TypeError, ValueError):
+            return None
+
+    def plugin(self, ref: str):
+        return self.plugins.get(ref.lstrip("@").lower())
@@ -1,4 +1,11 @@
-import json, pathlib, plistlib
+import functools, io, json, pathlib, plistlib
+from .cache import FactCache, cache_or_none, extract_entries, fingerprint
+from .symbols import TokenMatcher
+from .timings import phase_of
+from .walk import DEFAULT_PRUNE, collect_files
+
+# Bump whenever extract_file's output changes, to invalidate on-disk caches.
+EXTRACTOR_VERSION = 2
 
 SWIFT_EXTS = {".swift", ".m", ".mm", ".h"}
 LOCKFILE_NAMES = {"Podfile.lock", "Package.resolved", "Cartfile", "Cartfile.resolved"}
@@ -6,91 +13,231 @@ LOCKFILE_NAMES = {"Podfile.lock", "Package.resolved", "Cartfile", "Cartfile.reso
 COMMON_IOS_SDK_HINTS = [
     "AdSupport", "AppsFlyer", "Adjust", "FBSDK", "AppLovin", "UnityAds", "IronSource", "TikTok", "GoogleMobileAds"
 ]
+# Lockfiles are matched case-insensitively, streamed in bounded chunks.
+_HINT_MATCHER = TokenMatcher(COMMON_IOS_SDK_HINTS, ignore_case=True)
+_HINT_NAMES = {hint.lower(): hint for hint in COMMON_IOS_SDK_HINTS}
+
+# Required-reason APIs (Apple "Describing use of required reason API"). Only
+# identifiers distinctive enough for a substring match are listed; bare C
+# names such as stat() would match almost every file.
+REQUIRED_REASON_TOKENS = [
+    # File timestamp
+    "creationDate", "modificationDate", "fileModificationDate", "contentModificationDateKey",
+    "creationDateKey", "NSFileCreationDate", "NSFileModificationDate", "NSURLContentModificationDateKey",
+    "NSURLCreationDateKey", "getattrlist", "getattrlistbulk", "fgetattrlist", "getattrlistat",
+    # System boot time
+    "systemUptime", "mach_absolute_time",
+    # Disk space
+    "volumeAvailableCapacityKey", "volumeAvailableCapacityForImportantUsageKey",
+    "volumeAvailableCapacityForOpportunisticUsageKey", "volumeTotalCapacityKey", "systemFreeSize",
+    "systemSize", "NSFileSystemFreeSize", "NSFileSystemSize", "NSURLVolumeAvailableCapacityKey",
+    "NSURLVolumeAvailableCapacityForImportantUsageKey", "NSURLVolumeAvailableCapacityForOpportunisticUsageKey",
+    "NSURLVolumeTotalCapacityKey", "statfs", "statvfs", "fstatfs", "fstatvfs",
+    # Active keyboards
+    "activeInputModes",
+    # User defaults
+    "UserDefaults", "NSUserDefaults",
+]
+
+SYMBOL_TOKENS = ["UIPasteboard", "ASIdentifierManager", "AVCaptureDevice", "UIImagePickerController"] + REQUIRED_REASON_TOKENS
+
+# Evidence locations kept per symbol in facts["signals"]["symbol_hits"].
+MAX_SYMBOL_HITS = 20
 
 def safe_load_plist(path: pathlib.Path):
     try:
-        with path.open("rb") as f:
-            return plistlib.load(f)
+        raw = path.read_bytes()
+    except Exception:
+        return None
+    return safe_loads_plist(raw)
+
+def safe_loads_plist(raw: bytes):
+    """XML/binary plist bytes (or JSON) -> object, None if unreadable."""
+    try:
+        return plistlib.loads(raw)
     except Exception:
         try:
-            return json.loads(path.read_text(encoding="utf-8"))
+            return json.loads(raw.decode("utf-8"))
         except Exception:
             return None
 
-def scan_for_symbols(root: pathlib.Path, tokens):
-    symbols = set()
-    for p in root.rglob("*"):
-        if p.is_file() and p.suffix in SWIFT_EXTS:
-            try:
-                txt = p.read_text(encoding="utf-8", errors="ignore")
-                for t in tokens:
-                    if t in txt:
-                        symbols.add(t)
-            except Exception:
-                pass
-    return sorted(symbols)
+def usage_description_keys(data) -> list:
+    keys = set()
+    if isinstance(data, dict):
+        keys = {k for k in data if isinstance(k, str) and k.startswith("NS") and k.endswith("UsageDescription")}
+    return sorted(keys)
 
-def read_lockfiles(root: pathlib.Path):
-    text_blobs = []
-    for name in LOCKFILE_NAMES:
-        for p in root.rglob(name):
-            try:
-                text_blobs.append(p.read_text(encoding="utf-8", errors="ignore"))
-            except Exception:
-                pass
-    joined = "\n".join(text_blobs)
-    sdk_names = set()
-    for hint in COMMON_IOS_SDK_HINTS:
-        if hint.lower() in joined.lower():
-            sdk_names.add(hint)
-    for p in root.rglob("Package.resolved"):
+def classify(name: str):
+    """Return the handler kind for a file name, or None if scan_ios ignores it."""
+    if name == "Info.plist":
+        return "plist"
+    if name == "PrivacyInfo.xcprivacy":
+        return "privacy"
+    if name in LOCKFILE_NAMES:
+        return "lockfile"
+    suffix = pathlib.PurePath(name).suffix
+    if suffix == ".entitlements":
+        return "entitlements"
+    if suffix in SWIFT_EXTS:
+        return "source"
+    return None
+
+@functools.lru_cache(maxsize=8)
+def _matcher(tokens: tuple) -> TokenMatcher:
+    return TokenMatcher(tokens)
+
+def _collect_pkgs(obj, sdk_names: set):
+    if isinstance(obj, dict):
+        for k,v in obj.items():
+            if k == "identity" and isinstance(v, str):
+                sdk_names.add(v)
+            _collect_pkgs(v, sdk_names)
+    elif isinstance(obj, list):
+        for it in obj: _collect_pkgs(it, sdk_names)
+
+def _open(path, data):
+    return io.BytesIO(data) if data is not None else open(path, "rb")
+
+def extract_file(kind: str, path, tokens=tuple(SYMBOL_TOKENS), data=None) -> dict:
+    """
+    Extract the facts a single file contributes. Pure function of the file
+    contents (and `tokens` for sources), so results can be computed in any
+    process and merged later by `aggregate`. With `data` (the contents as
+    bytes, e.g. a git blob) nothing is read from disk; `path` only names it.
+    """
+    path = pathlib.Path(path)
+    if kind == "plist":
+        return {"plist_keys": usage_description_keys(safe_load_plist(path) if data is None else safe_loads_plist(data))}
+    if kind in ("entitlements", "privacy"):
+        plist = safe_load_plist(path) if data is None else safe_loads_plist(data)
+        return {kind: plist if isinstance(plist, dict) else None}
+    if kind == "lockfile":
         try:
-            data = json.loads(p.read_text(encoding="utf-8", errors="ignore"))
-            def collect_pkgs(obj):
-                if isinstance(obj, dict):
-                    for k,v in obj.items():
-                        if k == "identity" and isinstance(v, str):
-                            sdk_names.add(v)
-                        collect_pkgs(v)
-                elif isinstance(obj, list):
-                    for it in obj: collect_pkgs(it)
-            collect_pkgs(data)
+            with _open(path, data) as f:
+                sdk_names = {_HINT_NAMES[h] for h in _HINT_MATCHER.find_stream(f)}
+                if path.name == "Package.resolved":
+                    # JSON has to be parsed whole; Package.resolved stays small in practice.
+                    f.seek(0)
+                    try:
+                        _collect_pkgs(json.loads(f.read().decode("utf-8", errors="ignore")), sdk_names)
+                    except Exception:
+                        pass
         except Exception:
-            pass
-    return sorted(sdk_names)
+            return {"sdk_names": []}
+        return {"sdk_names": sorted(sdk_names)}
+    if kind == "source":
+        try:
+            with _open(path, data) as f:
+                return {"symbols": _matcher(tuple(tokens)).find_stream(f)}
+        except Exception:
+            return {"symbols": {}}
+    return {}
 
-def scan_ios(project_path: str):
-    root = pathlib.Path(project_path)
-    facts = {"platform":"ios","plist_keys":[],"entitlements":{},"privacy_manifest":{},"signals":{"auth_present":False,"sdk_names":[],"symbols":[]}}
-
-    for plist in root.rglob("Info.plist"):
-        data = safe_load_plist(plist)
-        if isinstance(data, dict):
-            for k in data.keys():
-                if isinstance(k, str) and (k.startswith("NS") and k.endswith("UsageDescription")):
-                    if k not in facts["plist_keys"]:
-                        facts["plist_keys"].append(k)
-
-    for ent in root.rglob("*.entitlements"):
-        data = safe_load_plist(ent)
-        if isinstance(data, dict):
-            for k, v in data.items():
-                facts["entitlements"][k] = v
-
-    for man in root.rglob("PrivacyInfo.xcprivacy"):
-        data = safe_load_plist(man)
-        if isinstance(data, dict):
-            facts["privacy_manifest"] = data
-
-    sdk_names = read_lockfiles(root)
-    facts["signals"]["sdk_names"] = sdk_names
-    joined = " ".join(sdk_names).lower()
+def _extract_entry(entry, tokens=tuple(SYMBOL_TOKENS)):
+    kind, path, _rel = entry
+    return extract_file(kind, path, tokens)
+
+def _strings(v):
+    return [x for x in v if isinstance(x, str)] if isinstance(v, list) else []
+
+def _dicts(v):
+    return [x for x in v if isinstance(x, dict)] if isinstance(v, list) else []
+
+def privacy_summary(manifests) -> dict:
+    """
+    Merge PrivacyInfo.xcprivacy dicts (the app's and every SDK's) into the
+    declarations rules test: accessed API category -> declared reason codes,
+    tracking flag and domains, collected data types.
+    """
+    reasons, domains, data_types, tracking = {}, set(), set(), False
+    for m in manifests:
+        if not isinstance(m, dict):
+            continue
+        for api in _dicts(m.get("NSPrivacyAccessedAPITypes")):
+            category = api.get("NSPrivacyAccessedAPIType")
+            if isinstance(category, str):
+                reasons.setdefault(category, set()).update(_strings(api.get("NSPrivacyAccessedAPITypeReasons")))
+        tracking = tracking or m.get("NSPrivacyTracking") is True
+        domains.update(_strings(m.get("NSPrivacyTrackingDomains")))
+        data_types.update(d["NSPrivacyCollectedDataType"] for d in _dicts(m.get("NSPrivacyCollectedDataTypes"))
+                          if isinstance(d.get("NSPrivacyCollectedDataType"), str))
+    return {"api_reasons": {c: sorted(reasons[c]) for c in sorted(reasons)}, "tracking": tracking,
+            "tracking_domains": sorted(domains), "collected_data_types": sorted(data_types)}
+
+def aggregate(items) -> dict:
+    """Merge [(kind, rel_path, extracted)] in walk order into the iOS facts schema."""
+    facts = {"platform":"ios","plist_keys":[],"entitlements":{},"privacy_manifest":{},"signals":{"auth_present":False,"sdk_names":[],"symbols":[],"symbol_hits":{}}}
+    plist_keys = set()
+    sdk_names = set()
+    manifests = []
+    hits = {}
+    for kind, rel, res in items:
+        if kind == "plist":
+            plist_keys.update(res["plist_keys"])
+        elif kind == "entitlements":
+            if res["entitlements"] is not None:
+                for k, v in res["entitlements"].items():
+                    facts["entitlements"][k] = v
+        elif kind == "privacy":
+            if res["privacy"] is not None:
+                # privacy_manifest stays the last one found; "privacy" merges them all.
+                facts["privacy_manifest"] = res["privacy"]
+                manifests.append(res["privacy"])
+        elif kind == "lockfile":
+            sdk_names.update(res["sdk_names"])
+        elif kind == "source":
+            for t, line in res["symbols"].items():
+                locs = hits.setdefault(t, [])
+                if len(locs) < MAX_SYMBOL_HITS:
+                    locs.append({"file": rel, "line": line})
+
+    facts["signals"]["sdk_names"] = sorted(sdk_names)
+    joined = " ".join(facts["signals"]["sdk_names"]).lower()
     auth_hints = ["firebaseauth", "appauth", "awsmobileclient", "auth0", "okta", "msal"]
     facts["signals"]["auth_present"] = any(h in joined for h in auth_hints)
 
-    tokens = ["UIPasteboard", "ASIdentifierManager", "AVCaptureDevice", "UIImagePickerController"]
-    symbols = scan_for_symbols(root, tokens)
-    facts["signals"]["symbols"] = symbols
+    facts["signals"]["symbols"] = sorted(hits)
+    facts["signals"]["symbol_hits"] = {t: hits[t] for t in sorted(hits)}
 
-    facts["plist_keys"] = sorted(set(facts["plist_keys"]))
+    facts["plist_keys"] = sorted(plist_keys)
+    facts["privacy"] = privacy_summary(manifests)
     return facts
+
+def scan_for_symbols(root: pathlib.Path, tokens, prune=DEFAULT_PRUNE):
+    symbols = set()
+    for _kind, path, _rel in collect_files(root, classify, prune, kinds={"source"}):
+        symbols.update(extract_file("source", path, tuple(tokens))["symbols"])
+    return sorted(symbols)
+
+def read_lockfiles(root: pathlib.Path, prune=DEFAULT_PRUNE):
+    sdk_names = set()
+    for _kind, path, _rel in collect_files(root, classify, prune, kinds={"lockfile"}):
+        sdk_names.update(extract_file("lockfile", path)["sdk_names"])
+    return sorted(sdk_names)
+
+def cache_fingerprint(tokens=SYMBOL_TOKENS) -> str:
+    return fingerprint("ios", EXTRACTOR_VERSION, sorted(set(tokens)))
+
+def open_cache(cache_dir, tokens=SYMBOL_TOKENS, use_hash=False, root=None) -> FactCache:
+    return FactCache(cache_dir, "ios", cache_fingerprint(tokens), use_hash, root)
+
+def scan_ios(project_path: str, prune=DEFAULT_PRUNE, tokens=SYMBOL_TOKENS, jobs=1, cache_dir=None, cache_hash=False, timings=None):
+    """
+    Scan an iOS project tree into facts. With `cache_dir`, per-file results
+    are reused from (and saved to) an on-disk FactCache, so only files that
+    changed since the last scan are parsed again. `timings` (a
+    timings.Timings) collects per-phase and per-file measurements.
+    """
+    root = pathlib.Path(project_path)
+    phase = phase_of(timings)
+    # One walk over the tree; each file is classified once, extracted (in
+    # parallel when jobs != 1) and merged back in walk order.
+    with phase("ios.walk"):
+        entries = collect_files(root, classify, prune, timings=timings)
+    fn = functools.partial(_extract_entry, tokens=tuple(tokens))
+    with phase("ios.extract"), cache_or_none(open_cache, cache_dir, tokens, cache_hash, root=root) as cache:
+        results = extract_entries(fn, entries, jobs, cache, timings)
+        if cache is not None:
+            cache.retain(rel for _kind, _path, rel in entries)
+    with phase("ios.aggregate"):
+        return aggregate([(kind, rel, res) for (kind, _path, rel), res in zip(entries, results)])
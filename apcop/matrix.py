@@ -0,0 +1,151 @@
+"""
+Rule evaluation for many apps at once, as NumPy boolean matrices.
+
+Every distinct leaf condition of a rules document becomes a column. Set
+lookups (ios.api.uses, ios.plist.has, android.permission.present, exact
+SDK/dependency names...) are interned as a (fact key, value) vocabulary,
+and an app's row is filled from its own fact values. The few other leaves
+(target SDK thresholds, substring and prefix tests, exists.true) are
+evaluated once per distinct leaf and app. Each `any`/`all` node is a
+column computed from its children's columns, one depth level at a time,
+with np.logical_or/and.reduceat over index masks. The same is done for
+every `require` entry.
+
+The result is the app x rule "when matched" matrix and the app x require
+"satisfied" matrix. Reports are then built only for the matched pairs,
+with the same finding code as evaluate_rules, so they are identical.
+
+Needs NumPy: pip install 'apppolicy-scanner[numpy]'.
+"""
+import json
+import numpy as np
+from .rules import CONDITIONS, _finding, _report, _require_condition, compile_rules, index_facts
+
+FALSE, TRUE = 0, 1
+
+def _canon(value):
+    return json.dumps(value, sort_keys=True, default=repr)
+
+class MatrixPlan:
+    """
+    A rules document compiled into columns: `when[r]` is rule r's column,
+    `requires[req_start[r]:req_start[r + 1]]` its require entries' columns.
+    """
+
+    def __init__(self, rules_doc):
+        self.plan = compile_rules(rules_doc)
+        self.ncols = 2              # FALSE and TRUE constants
+        self.vocab = {}             # (fact key, value) -> column
+        self.generic = []           # (column, test) evaluated per app
+        self.levels = []            # per depth: {"any"/"all": [(column, child columns)]}
+        self._nodes = {}
+        self._depth = [0, 0]
+        self.when = np.array([self._column(cr.when) for cr in self.plan.rules], dtype=np.intp)
+        reqs, starts = [], [0]
+        for cr in self.plan.rules:
+            for req, _test in cr.requires:
+                cond = _require_condition(req)
+                reqs.append(FALSE if cond is None else self._column(cond))
+            starts.append(len(reqs))
+        self.requires = np.array(reqs, dtype=np.intp)
+        self.req_start = starts
+
+    def _new(self, key, depth):
+        col = self._nodes[key] = self.ncols
+        self.ncols += 1
+        self._depth.append(depth)
+        return col
+
+    def _column(self, cond):
+        """The column holding `cond`'s value, created on first use (mirrors rules.compile_condition)."""
+        for op in ("any", "all"):
+            if op in cond:
+                children = tuple(self._column(c) for c in cond[op])
+                if not children:
+                    return FALSE if op == "any" else TRUE
+                if len(children) == 1:
+                    return children[0]
+                key = (op, children)
+                if key in self._nodes:
+                    return self._nodes[key]
+                depth = 1 + max(self._depth[c] for c in children)
+                col = self._new(key, depth)
+                while len(self.levels) < depth:
+                    self.levels.append({"any": [], "all": []})
+                self.levels[depth - 1][op].append((col, children))
+                return col
+        if len(cond) != 1:
+            return FALSE
+        key, value = next(iter(cond.items()))
+        compiler = CONDITIONS.get(key)
+        if compiler is None:
+            return FALSE
+        test, _needs = compiler(value)
+        member = getattr(test, "member", None)
+        try:
+            if member is not None:
+                if member not in self.vocab:
+                    self.vocab[member] = self._new(("member", member), 0)
+                return self.vocab[member]
+        except TypeError:
+            pass  # unhashable value: evaluate it like any other leaf
+        node = ("leaf", key, _canon(value))
+        if node not in self._nodes:
+            self.generic.append((self._new(node, 0), test))
+        return self._nodes[node]
+
+    def columns(self, idxs):
+        """The apps x columns boolean matrix for a list of fact indexes."""
+        x = np.zeros((len(idxs), self.ncols), dtype=bool)
+        x[:, TRUE] = True
+        by_key = {}
+        for (fact_key, value), col in self.vocab.items():
+            by_key.setdefault(fact_key, {})[value] = col
+        for a, idx in enumerate(idxs):
+            for fact_key, cols in by_key.items():
+                values = idx.get(fact_key)
+                if values:
+                    hits = [cols[v] for v in values if v in cols] if len(values) < len(cols) else \
+                        [col for v, col in cols.items() if v in values]
+                    x[a, hits] = True
+            for col, test in self.generic:
+                x[a, col] = test(idx)
+        for level in self.levels:
+            for op, reduce in (("any", np.logical_or), ("all", np.logical_and)):
+                nodes = level[op]
+                if not nodes:
+                    continue
+                gather = np.fromiter((c for _col, children in nodes for c in children), dtype=np.intp)
+                offsets = np.cumsum([0] + [len(children) for _col, children in nodes[:-1]])
+                x[:, [col for col, _children in nodes]] = reduce.reduceat(x[:, gather], offsets, axis=1)
+        return x
+
+    def evaluate(self, idxs):
+        """(matched, satisfied): apps x rules `when` results and apps x require-entries results."""
+        x = self.columns(idxs)
+        return x[:, self.when], x[:, self.requires]
+
+def evaluate_matrix(facts_lists, rules_doc, evidence="compact"):
+    """
+    [evaluate_rules(facts, rules_doc, evidence) for facts in facts_lists],
+    computed with one matrix evaluation for all apps.
+    """
+    mp = rules_doc if isinstance(rules_doc, MatrixPlan) else MatrixPlan(rules_doc)
+    rules, starts = mp.plan.rules, mp.req_start
+    compact = evidence == "compact"
+    idxs = [index_facts(facts) for facts in facts_lists]
+    matched, satisfied = mp.evaluate(idxs)
+    reports = []
+    for a, idx in enumerate(idxs):
+        findings = []
+        for r in np.flatnonzero(matched[a]):
+            cr = rules[r]
+            ok = satisfied[a, starts[r]:starts[r + 1]]
+            missing = [req for (req, _test), hit in zip(cr.requires, ok) if not hit]
+            used = None
+            if compact:
+                used = {}
+                cr.test(idx, used)
+            findings.append(_finding(cr, idx, used, compact, missing))
+        reports.append(_report(mp.plan.version, findings, idx, compact))
+    return reports
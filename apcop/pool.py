@@ -0,0 +1,34 @@
+import os
+
+def resolve_jobs(jobs):
+    """Normalise a --jobs value: None/0/negative means one worker per CPU."""
+    if not jobs or jobs < 0:
+        return os.cpu_count() or 1
+    return jobs
+
+def imap_jobs(fn, items, jobs=1, chunksize=None, initializer=None, initargs=()):
+    """
+    Like map(fn, items), fanned out over `jobs` worker processes in chunks.
+    Results are yielded in input order, so callers can merge them exactly
+    as they would the sequential result. `fn` must be picklable (a
+    module-level function or a functools.partial of one). `initializer`
+    runs once per worker, or once in-process when running sequentially.
+    """
+    items = list(items)
+    jobs = resolve_jobs(jobs)
+    if jobs == 1 or len(items) < 2:
+        if initializer is not None:
+            initializer(*initargs)
+        yield from map(fn, items)
+        return
+    # Imported here: concurrent.futures.process drags in multiprocessing,
+    # which sequential scans never need.
+    from concurrent.futures import ProcessPoolExecutor
+    jobs = min(jobs, len(items))
+    chunksize = chunksize or max(1, len(items) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=initializer, initargs=initargs) as ex:
+        yield from ex.map(fn, items, chunksize=chunksize)
+
+def map_jobs(fn, items, jobs=1, chunksize=None, initializer=None, initargs=()):
+    """list(imap_jobs(...))."""
+    return list(imap_jobs(fn, items, jobs, chunksize, initializer, initargs))
@@ -1,27 +1,302 @@
-import io, os, json, tarfile, urllib.request
-from nacl import signing, encoding
+import codecs, os, re, json, hashlib, tarfile, tempfile, urllib.error, urllib.request
 
 TRUSTED_PUBKEY_HEX = os.getenv("APPPOLICY_PUBKEY_HEX", "").strip()
 
-def _load_bytes(path_or_url: str) -> bytes:
-    if path_or_url.startswith("http://") or path_or_url.startswith("https://"):
-        with urllib.request.urlopen(path_or_url) as r:
-            return r.read()
-    return open(path_or_url, "rb").read()
-
-def load_rules_pack(path_or_url: str) -> dict:
-    raw = _load_bytes(path_or_url)
-    with tarfile.open(fileobj=io.BytesIO(raw), mode="r:gz") as tar:
-        rules_bytes = tar.extractfile("rules.json").read()
-        sig_hex     = tar.extractfile("SIGNATURE.hex").read().decode().strip()
-        pack_pub    = tar.extractfile("PUBLIC_KEY.hex").read().decode().strip()
-
-    # Prefer trusted root pubkey if provided, else fall back to pack-embedded pubkey.
-    pub_hex = TRUSTED_PUBKEY_HEX or pack_pub
-    vk = signing.VerifyKey(pub_hex, encoder=encoding.HexEncoder)
+CHUNK = 1 << 16
+# Decompressed size limits, checked against tar headers before the data is read.
+MAX_RULES_BYTES = 256 << 20
+MAX_PACK_BYTES = 512 << 20
+MAX_HEX_BYTES = 1024
+# A non-cached pack's rules.json stays in memory up to this size, then spills to a temporary file.
+SPOOL_BYTES = 1 << 20
+
+def default_cache_dir() -> str:
+    return os.getenv("APPPOLICY_PACK_CACHE") or os.path.join(os.path.expanduser("~"), ".cache", "apppolicy", "packs")
+
+def _is_url(path_or_url: str) -> bool:
+    return path_or_url.startswith("http://") or path_or_url.startswith("https://")
+
+def _open_source(path_or_url: str):
+    return urllib.request.urlopen(path_or_url) if _is_url(path_or_url) else open(path_or_url, "rb")
+
+def _chunks(f):
+    f.seek(0)
+    return iter(lambda: f.read(CHUNK), b"")
 
+def _read_pack(fileobj, spool, max_rules_bytes=MAX_RULES_BYTES):
+    """
+    Stream a .tar.gz pack (`r|gz`: one forward pass, nothing seeks back).
+    rules.json is hashed and copied to the binary file `spool` as it
+    decompresses. Returns (rules.json SHA-256 hex, signature hex, public key hex).
+    """
+    digest = hashlib.sha256()
+    small = {}
+    have_rules = False
+    total = 0
+    with tarfile.open(fileobj=fileobj, mode="r|gz") as tar:
+        for member in tar:
+            total += member.size
+            if total > MAX_PACK_BYTES:
+                raise ValueError(f"rules pack expands to more than {MAX_PACK_BYTES} bytes")
+            if not member.isfile():
+                continue
+            if member.name == "rules.json":
+                if member.size > max_rules_bytes:
+                    raise ValueError(f"rules.json is {member.size} bytes; the limit is {max_rules_bytes}")
+                f = tar.extractfile(member)
+                for chunk in iter(lambda: f.read(CHUNK), b""):
+                    digest.update(chunk)
+                    spool.write(chunk)
+                have_rules = True
+            elif member.name in ("SIGNATURE.hex", "PUBLIC_KEY.hex"):
+                if member.size > MAX_HEX_BYTES:
+                    raise ValueError(f"{member.name} is {member.size} bytes; the limit is {MAX_HEX_BYTES}")
+                small[member.name] = tar.extractfile(member).read().decode().strip()
+    missing = [n for n, ok in (("rules.json", have_rules), ("SIGNATURE.hex", "SIGNATURE.hex" in small),
+                               ("PUBLIC_KEY.hex", "PUBLIC_KEY.hex" in small)) if not ok]
+    if missing:
+        raise ValueError(f"rules pack is missing {', '.join(missing)}")
+    spool.flush()
+    return digest.hexdigest(), small["SIGNATURE.hex"], small["PUBLIC_KEY.hex"]
+
+def _verify(message, sig_hex: str, pub_hex: str):
+    """
+    Check the Ed25519 signature over `message`: the exact signed bytes, or a
+    binary file holding them. libsodium verifies one buffer, so a file is
+    read whole; rules.json is capped at MAX_RULES_BYTES before it gets here.
+    """
+    # PyNaCl is the optional [pro] extra and is only needed when a pack is actually verified.
+    from nacl import signing, encoding
+    if not isinstance(message, bytes):
+        message = b"".join(_chunks(message))
+    vk = signing.VerifyKey(pub_hex, encoder=encoding.HexEncoder)
     # VERIFY EXACT BYTES THAT WERE SIGNED
-    vk.verify(rules_bytes, bytes.fromhex(sig_hex))
+    vk.verify(message, bytes.fromhex(sig_hex))
+
+class _JsonStream:
+    """
+    json.load for rules.json that decodes the top-level object's arrays one
+    item at a time: the text held at once is a chunk or one item, never the
+    whole document.
+    """
+
+    _WS = re.compile(r"[ \t\n\r]*")
+
+    def __init__(self, f):
+        self.f = f
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.decoder = json.JSONDecoder()
+        self.buf, self.pos, self.eof = "", 0, False
+
+    def _fill(self, size=CHUNK):
+        data = self.f.read(size)
+        self.eof = not data
+        self.buf = self.buf[self.pos:] + self.utf8.decode(data, final=self.eof)
+        self.pos = 0
+
+    def _peek(self):
+        """The next non-whitespace character, or None at the end."""
+        while True:
+            self.pos = self._WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return None
+            self._fill()
+
+    def _error(self, msg):
+        return json.JSONDecodeError(msg, self.buf, self.pos)
+
+    def _expect(self, ch):
+        if self._peek() != ch:
+            raise self._error(f"Expecting {ch!r}")
+        self.pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number running into the end of the buffer may continue in the next chunk.
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill(max(CHUNK, len(self.buf)))
+
+    def _items(self, close):
+        """Yield once per item of the open array/object, consuming the delimiters in between."""
+        if self._peek() == close:
+            self.pos += 1
+            return
+        while True:
+            yield
+            c = self._peek()
+            self.pos += 1
+            if c == close:
+                return
+            if c != ",":
+                raise self._error("Expecting ',' delimiter")
+
+    def document(self):
+        if self._peek() != "{":
+            return self._value()
+        self.pos += 1
+        out = {}
+        for _ in self._items("}"):
+            key = self._value()
+            if not isinstance(key, str):
+                raise self._error("Expecting property name")
+            self._expect(":")
+            if self._peek() == "[":
+                self.pos += 1
+                out[key] = [self._value() for _ in self._items("]")]
+            else:
+                out[key] = self._value()
+        if self._peek() is not None:
+            raise self._error("Extra data")
+        return out
+
+def _load_json(f):
+    f.seek(0)
+    return _JsonStream(f).document()
+
+def _sha256_file(f) -> str:
+    h = hashlib.sha256()
+    for chunk in _chunks(f):
+        h.update(chunk)
+    return h.hexdigest()
+
+class PackCache:
+    """
+    On-disk cache entry for one pack URL: `meta.json` (ETag/Last-Modified,
+    SHA-256 of rules.json, signature, and the key it was verified with) next
+    to the verified `rules.json` bytes themselves.
+    """
+
+    def __init__(self, cache_dir, url: str):
+        self.dir = os.path.join(cache_dir, hashlib.sha256(url.encode()).hexdigest()[:32])
+        self.url = url
+
+    def meta(self):
+        try:
+            with open(os.path.join(self.dir, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            return meta if meta.get("url") == self.url else None
+        except (OSError, ValueError):
+            return None
+
+    def open_rules(self, meta):
+        """The cached rules.json opened for reading, or None if missing or not matching its recorded digest."""
+        try:
+            f = open(os.path.join(self.dir, "rules.json"), "rb")
+        except OSError:
+            return None
+        if _sha256_file(f) != meta.get("sha256"):
+            f.close()
+            return None
+        return f
+
+    def spool(self):
+        """A scratch file next to the entry that a download streams into; store() moves it into place."""
+        os.makedirs(self.dir, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=self.dir, prefix="rules.json.", suffix=".tmp", delete=False)
+
+    def store(self, meta, spool=None):
+        os.makedirs(self.dir, exist_ok=True)
+        if spool is not None:
+            spool.close()
+            os.replace(spool.name, os.path.join(self.dir, "rules.json"))
+        tmp = os.path.join(self.dir, "meta.json.tmp")
+        with open(tmp, "wb") as f:
+            f.write(json.dumps(meta, indent=2).encode())
+        os.replace(tmp, os.path.join(self.dir, "meta.json"))
+
+def _from_cache(cache: PackCache, meta):
+    """Parsed rules from a cache entry, re-verifying only if the trusted key changed."""
+    f = cache.open_rules(meta)
+    if f is None:
+        return None
+    with f:
+        pub_hex = TRUSTED_PUBKEY_HEX or meta["pack_pubkey"]
+        if pub_hex != meta["verified_with"]:
+            _verify(f, meta["signature"], pub_hex)
+            meta["verified_with"] = pub_hex
+            cache.store(meta)
+        return _load_json(f)
+
+def _download(req, spool):
+    with urllib.request.urlopen(req) as r:
+        return (*_read_pack(r, spool), r.headers.get("ETag"), r.headers.get("Last-Modified"))
+
+def _fetch_cached(url: str, cache: PackCache, offline: bool) -> dict:
+    meta = cache.meta()
+    if offline:
+        rules = _from_cache(cache, meta) if meta else None
+        if rules is None:
+            raise RuntimeError(f"Offline mode: no cached rules pack for {url}")
+        return rules
+
+    req = urllib.request.Request(url)
+    if meta:
+        if meta.get("etag"):
+            req.add_header("If-None-Match", meta["etag"])
+        if meta.get("last_modified"):
+            req.add_header("If-Modified-Since", meta["last_modified"])
+    spool = cache.spool()
+    try:
+        try:
+            digest, sig_hex, pack_pub, etag, last_modified = _download(req, spool)
+        except urllib.error.HTTPError as e:
+            if e.code != 304 or not meta:
+                raise
+            rules = _from_cache(cache, meta)
+            if rules is not None:
+                return rules
+            # Cache entry damaged: fetch unconditionally.
+            spool.seek(0)
+            spool.truncate()
+            digest, sig_hex, pack_pub, etag, last_modified = _download(url, spool)
+
+        pub_hex = TRUSTED_PUBKEY_HEX or pack_pub
+        already_verified = bool(meta) and meta.get("sha256") == digest and meta.get("signature") == sig_hex \
+            and meta.get("verified_with") == pub_hex
+        if not already_verified:
+            _verify(spool, sig_hex, pub_hex)
+        rules = _load_json(spool)
+        cache.store({"url": url, "etag": etag, "last_modified": last_modified, "sha256": digest,
+                     "signature": sig_hex, "pack_pubkey": pack_pub, "verified_with": pub_hex}, spool)
+        return rules
+    finally:
+        spool.close()
+        if os.path.exists(spool.name):
+            os.unlink(spool.name)
+
+def load_rules_pack(path_or_url: str, cache_dir=None, use_cache=True, offline=False) -> dict:
+    """
+    Load and Ed25519-verify a signed rules pack from a path or URL.
+
+    The archive is streamed: rules.json is hashed while it decompresses,
+    spooled (memory up to SPOOL_BYTES, then disk), verified with PyNaCl and
+    parsed incrementally. Verification holds rules.json in memory once,
+    bounded by MAX_RULES_BYTES; oversized members are refused.
+
+    URLs go through a local cache (`cache_dir`, default
+    $APPPOLICY_PACK_CACHE or ~/.cache/apppolicy/packs): requests are
+    conditional on the cached ETag/Last-Modified, a 304 or an unchanged
+    rules.json digest + signature reuses the already-verified rules, and
+    `offline=True` serves from the cache without touching the network.
+    """
+    if _is_url(path_or_url) and use_cache:
+        return _fetch_cached(path_or_url, PackCache(cache_dir or default_cache_dir(), path_or_url), offline)
+    if _is_url(path_or_url) and offline:
+        # Without the cache there is nothing to serve offline.
+        raise RuntimeError(f"Offline mode: no cached rules pack for {path_or_url} (the pack cache is disabled)")
 
-    # Return the parsed rules
-    return json.loads(rules_bytes)
+    with _open_source(path_or_url) as src, tempfile.SpooledTemporaryFile(SPOOL_BYTES) as spool:
+        _digest, sig_hex, pack_pub = _read_pack(src, spool)
+        # Prefer trusted root pubkey if provided, else fall back to pack-embedded pubkey.
+        _verify(spool, sig_hex, TRUSTED_PUBKEY_HEX or pack_pub)
+        return _load_json(spool)
@@ -1,10 +1,11 @@
 from __future__ import annotations
+import functools
 import html
 import json
 from collections import defaultdict
 from importlib import resources
 from typing import Dict, List
-from jinja2 import Environment, BaseLoader
+from .timings import phase_of
 
 
 # NOTE: We keep rendering logic here but structure & CSS live in /templates and /assets.
@@ -128,29 +129,70 @@ def _render_card(f: Dict) -> str:
         '</div>'
     )
 
-def render_html(report: Dict) -> str:
-    # Load raw template & CSS
-    template_src = _load_text("apcop.templates", "report.html")
-    css = _load_text("apcop.assets", "report.css")
-
-    # Group findings
-    grouped: Dict[str, List[Dict]] = defaultdict(list)
-    for f in report.get("findings", []) or []:
-        # enrich why/how in place for convenience
-        why, how = _why_how_for(f)
-        f["why"], f["how"] = why, how
-        grouped[(f.get("platform") or "other").lower()].append(f)
-
-    summary = report.get("summary") or {}
-    env = Environment(loader=BaseLoader(), autoescape=True)
-    tmpl = env.from_string(template_src)
-    html_out = tmpl.render(
-        summary={
-            "blocking": int(summary.get("blocking") or 0),
-            "advisory": int(summary.get("advisory") or 0),
-            "fyi": int(summary.get("fyi") or 0),
-        },
-        findings=report.get("findings") or [],
-        css=css,
-    )
-    return html_out
+def template_environment(bytecode_cache: str | None = None):
+    """
+    Jinja environment over the package templates. Templates come through a
+    loader (not from_string) so that a FileSystemBytecodeCache in
+    `bytecode_cache` is consulted.
+    """
+    from jinja2 import Environment, FileSystemBytecodeCache, FunctionLoader
+    cache = None
+    if bytecode_cache:
+        import os
+        os.makedirs(bytecode_cache, exist_ok=True)
+        cache = FileSystemBytecodeCache(bytecode_cache)
+    loader = FunctionLoader(lambda name: (_load_text("apcop.templates", name), None, lambda: True))
+    return Environment(loader=loader, autoescape=True, bytecode_cache=cache)
+
+class HtmlRenderer:
+    """
+    The report template and CSS, loaded and compiled once and reused for any
+    number of reports. With `bytecode_cache` (a directory) Jinja also keeps
+    the compiled template on disk, so later processes skip compilation.
+    """
+
+    def __init__(self, bytecode_cache: str | None = None):
+        self.template = template_environment(bytecode_cache).get_template("report.html")
+        self.css = _load_text("apcop.assets", "report.css")
+
+    def _context(self, report: Dict) -> Dict:
+        grouped: Dict[str, List[Dict]] = defaultdict(list)
+        for f in report.get("findings", []) or []:
+            grouped[(f.get("platform") or "other").lower()].append(f)
+        summary = report.get("summary") or {}
+        return {
+            "summary": {
+                "blocking": int(summary.get("blocking") or 0),
+                "advisory": int(summary.get("advisory") or 0),
+                "fyi": int(summary.get("fyi") or 0),
+            },
+            # Lazily enriched copies: the report's findings are left untouched.
+            "sections": {p: (_with_why_how(f) for f in grouped.get(p, ())) for p in ("ios", "android")},
+            "css": self.css,
+        }
+
+    def render(self, report: Dict) -> str:
+        return self.template.render(self._context(report))
+
+    def generate(self, report: Dict):
+        """Yield the HTML in pieces, never holding the whole page in memory."""
+        return self.template.generate(self._context(report))
+
+    def write(self, report: Dict, out, timings=None) -> None:
+        """Stream the HTML to a path or binary file object."""
+        with phase_of(timings)("render"):
+            stream = self.template.stream(self._context(report))
+            stream.enable_buffering(256)
+            stream.dump(out, encoding="utf-8")
+
+def _with_why_how(f: Dict) -> Dict:
+    why, how = _why_how_for(f)
+    return {**f, "why": why, "how": how}
+
+@functools.lru_cache(maxsize=None)
+def default_renderer() -> HtmlRenderer:
+    return HtmlRenderer()
+
+def render_html(report: Dict, timings=None) -> str:
+    with phase_of(timings)("render"):
+        return default_renderer().render(report)
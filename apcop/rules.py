@@ -1,8 +1,15 @@
-import yaml, json
+import functools, json, time
+from .pool import imap_jobs, resolve_jobs
+from .timings import phase_of
 
 def load_rules(path):
+    import yaml  # only YAML rule files need PyYAML; facts/packs are JSON
     return yaml.safe_load(open(path, "r", encoding="utf-8"))
 
+def load_facts(path):
+    from .formats import load  # any --format; detected from the content
+    return load(path)
+
 def index_facts(facts_list):
     idx = {}
     for f in facts_list:
@@ -10,8 +17,24 @@ def index_facts(facts_list):
         if plat == "ios":
             idx["ios.plist_keys"] = set(f.get("plist_keys", []))
             idx["ios.entitlements"] = f.get("entitlements", {})
-            idx["ios.privacy_manifest"] = f.get("privacy_manifest", {})
+            manifest = f.get("privacy_manifest", {})
+            idx["ios.privacy_manifest"] = manifest
+            idx["_ios.privacy_manifest.lower"] = json.dumps(manifest or {}).lower()
+            privacy = f.get("privacy")
+            if privacy is None:
+                # Facts written before scans merged every manifest: index the one recorded.
+                from .ios_scan import privacy_summary
+                privacy = privacy_summary([manifest])
+            api = privacy.get("api_reasons", {})
+            idx["ios.privacy.api_types"] = set(api)
+            idx["ios.privacy.api_reasons"] = {f"{c}:{r}" for c, reasons in api.items() for r in reasons}
+            idx["ios.privacy.tracking"] = bool(privacy.get("tracking", False))
+            idx["ios.privacy.tracking_domains"] = set(privacy.get("tracking_domains", []))
+            idx["ios.privacy.data_types"] = set(privacy.get("collected_data_types", []))
             idx["ios.sdk_names"] = set(f.get("signals", {}).get("sdk_names", []))
+            # Derived, lowercased-once view for substring conditions. Keys
+            # starting with "_" are lookup aids, never reported as facts.
+            idx["_ios.sdk_names.lower"] = ",".join(sorted(idx["ios.sdk_names"])).lower()
             idx["ios.symbols"] = set(f.get("signals", {}).get("symbols", []))
             idx["ios.auth_present"] = bool(f.get("signals", {}).get("auth_present", False))
         elif plat == "android":
@@ -21,107 +44,443 @@ def index_facts(facts_list):
     return idx
 
 def has_privacy_manifest_reason(idx, reason_keyword: str):
-    d = idx.get("ios.privacy_manifest") or {}
-    s = json.dumps(d).lower()
+    s = idx.get("_ios.privacy_manifest.lower")
+    if s is None:
+        s = json.dumps(idx.get("ios.privacy_manifest") or {}).lower()
     return reason_keyword.lower() in s
 
-def match_condition(cond, idx):
-    if "any" in cond:
-        return any(match_condition(c, idx) for c in cond["any"])
-    if "all" in cond:
-        return all(match_condition(c, idx) for c in cond["all"])
+_NEVER = frozenset()
 
-    if len(cond.keys()) != 1:
+def _false(idx, used=None):
+    return False
+
+def _present(v):
+    """Could a condition reading this index value be true? (superset test)"""
+    if v is None or v is False:
         return False
-    key, value = next(iter(cond.items()))
+    try:
+        return len(v) > 0
+    except TypeError:
+        return True
+
+def _touch(used, key, value, hit):
+    # Record a set-membership lookup: the key is listed even when nothing matched.
+    vals = used.setdefault(key, [])
+    if hit and value not in vals:
+        vals.append(value)
+
+def _member(fact_key):
+    def compile_(value):
+        def test(idx, used=None):
+            hit = value in idx.get(fact_key, set())
+            if used is not None:
+                _touch(used, fact_key, value, hit)
+            return hit
+        # Lets other engines (matrix.py) see the test as one vocabulary lookup.
+        test.member = (fact_key, value)
+        return test, frozenset({fact_key})
+    return compile_
+
+def _sdk_present(value):
+    v = str(value).lower()
+    if v == "any_ads_or_clipboard_sdk":
+        hints = ["adsupport","googlemobileads","appsflyer","adjust","applovin","ironsource","unityads","tiktok"]
+        def test(idx, used=None):
+            names = idx.get("_ios.sdk_names.lower")
+            if names is None:
+                names = ",".join(idx.get("ios.sdk_names", set())).lower()
+            hit = any(h in names for h in hints)
+            if used is not None:
+                vals = used.setdefault("ios.sdk_names", [])
+                vals.extend(n for n in sorted(idx.get("ios.sdk_names", set())) if n not in vals and any(h in n.lower() for h in hints))
+            return hit
+    else:
+        return _member("ios.sdk_names")(value)
+    return test, frozenset({"ios.sdk_names"})
+
+def _dep_present(value):
+    """Exact "group:name", or every dependency starting with a prefix ending in "*" ("com.appsflyer:*")."""
+    v = str(value)
+    if not v.endswith("*"):
+        return _member("android.deps")(v)
+    prefix = v[:-1]
+    def test(idx, used=None):
+        hits = sorted(d for d in idx.get("android.deps", set()) if d.startswith(prefix))
+        if used is not None:
+            vals = used.setdefault("android.deps", [])
+            vals.extend(h for h in hits if h not in vals)
+        return bool(hits)
+    return test, frozenset({"android.deps"})
+
+def _signin_present(value):
+    def test(idx, used=None):
+        hit = bool(idx.get("ios.auth_present", False))
+        if used is not None:
+            used["ios.auth_present"] = hit
+        return hit
+    return test, frozenset({"ios.auth_present"})
+
+def _privacy_reason(value):
+    keyword = str(value).lower()
+    def test(idx, used=None):
+        hit = has_privacy_manifest_reason(idx, keyword)
+        if used is not None:
+            _touch(used, "ios.privacy_manifest", keyword, hit)
+        return hit
+    # An absent manifest serialises as "{}", which still contains "", "{", "}".
+    return test, (None if keyword in "{}" else frozenset({"ios.privacy_manifest"}))
+
+def _privacy_api_reason(value):
+    """"<API category>: <reason code>", declared together in any of the app's or SDKs' privacy manifests."""
+    category, sep, reason = str(value).partition(":")
+    if not sep:
+        return _false, _NEVER
+    return _member("ios.privacy.api_reasons")(f"{category.strip()}:{reason.strip()}")
 
-    if key == "ios.api.uses":
-        return value in idx.get("ios.symbols", set())
-    if key == "ios.sdk.present":
-        v = str(value).lower()
-        if v == "any_ads_or_clipboard_sdk":
-            names = ",".join(idx.get("ios.sdk_names", set())).lower()
-            hints = ["adsupport","googlemobileads","appsflyer","adjust","applovin","ironsource","unityads","tiktok"]
-            return any(h in names for h in hints)
-        return value in idx.get("ios.sdk_names", set())
-    if key == "ios.signin.present":
-        return bool(idx.get("ios.auth_present", False))
-    if key == "ios.plist.has":
-        return value in idx.get("ios.plist_keys", set())
-    if key == "ios.privacy.reason":
-        return has_privacy_manifest_reason(idx, str(value))
-
-    if key == "android.permission.present":
-        return value in idx.get("android.permissions", set())
-    if key == "android.targetsdk.lt_policy_min":
+def _targetsdk_lt(value):
+    try:
+        limit = int(value)
+    except Exception:
+        return _false, _NEVER
+    def test(idx, used=None):
         tsdk = idx.get("android.targetsdk")
+        if used is not None:
+            used["android.targetsdk"] = tsdk
         try:
-            return tsdk is not None and int(tsdk) < int(value)
+            return tsdk is not None and int(tsdk) < limit
         except Exception:
             return False
+    return test, frozenset({"android.targetsdk"})
 
+def _exists(value):
+    def test(idx, used=None):
+        v = idx.get(value, False)
+        if used is not None:
+            used[value] = sorted(v) if isinstance(v, set) else v
+        return bool(v)
+    return test, frozenset({value})
+
+# Condition key -> compiler(value) returning (test(idx, used=None) -> bool, needs).
+# `needs` is the set of index keys of which at least one must be present for
+# the test to possibly pass (None: could pass on any facts). When `used` is a
+# dict, the test also records the fact keys/values it looked at.
+CONDITIONS = {
+    "ios.api.uses": _member("ios.symbols"),
+    "ios.sdk.present": _sdk_present,
+    "ios.signin.present": _signin_present,
+    "ios.plist.has": _member("ios.plist_keys"),
+    "ios.privacy.reason": _privacy_reason,
+    "ios.privacy.api_declared": _member("ios.privacy.api_types"),
+    "ios.privacy.api_reason": _privacy_api_reason,
+    "ios.privacy.tracking_domain": _member("ios.privacy.tracking_domains"),
+    "ios.privacy.data_type": _member("ios.privacy.data_types"),
+    "android.permission.present": _member("android.permissions"),
+    "android.targetsdk.lt_policy_min": _targetsdk_lt,
+    "android.dep.present": _dep_present,
+    "exists.true": _exists,
+}
+
+def compile_condition(cond):
+    """Compile a `when`/`require` condition into (test(idx, used=None) -> bool, needs)."""
+    if "any" in cond:
+        parts = [compile_condition(c) for c in cond["any"]]
+        tests = [t for t, _ in parts]
+        needs = None if any(n is None for _, n in parts) else frozenset().union(*(n for _, n in parts))
+        return (lambda idx, used=None: any(t(idx, used) for t in tests)), needs
+    if "all" in cond:
+        parts = [compile_condition(c) for c in cond["all"]]
+        tests = [t for t, _ in parts]
+        # Any single failing child fails the whole: keep the narrowest one.
+        bounded = [n for _, n in parts if n is not None]
+        needs = min(bounded, key=len) if bounded else None
+        return (lambda idx, used=None: all(t(idx, used) for t in tests)), needs
+
+    if len(cond.keys()) != 1:
+        return _false, _NEVER
+    key, value = next(iter(cond.items()))
+    compiler = CONDITIONS.get(key)
+    if compiler is None:
+        return _false, _NEVER
+    return compiler(value)
+
+def match_condition(cond, idx):
+    return compile_condition(cond)[0](idx)
+
+def _require_condition(req):
+    """A `require` entry ("key: value", a bare fact key, or a condition) as a condition dict."""
+    if isinstance(req, str):
+        if ":" in req:
+            k, v = [s.strip() for s in req.split(":", 1)]
+            return {k: v}
+        return {"exists.true": req}
+    return req if isinstance(req, dict) else None
+
+def _compile_require(req):
+    cond = _require_condition(req)
+    return _false if cond is None else compile_condition(cond)[0]
+
+# Condition key -> the index keys its test reads (keep in step with CONDITIONS;
+# "exists.true" reads the key it names).
+CONDITION_READS = {
+    "ios.api.uses": ("ios.symbols",),
+    "ios.sdk.present": ("ios.sdk_names",),
+    "ios.signin.present": ("ios.auth_present",),
+    "ios.plist.has": ("ios.plist_keys",),
+    "ios.privacy.reason": ("ios.privacy_manifest",),
+    "ios.privacy.api_declared": ("ios.privacy.api_types",),
+    "ios.privacy.api_reason": ("ios.privacy.api_reasons",),
+    "ios.privacy.tracking_domain": ("ios.privacy.tracking_domains",),
+    "ios.privacy.data_type": ("ios.privacy.data_types",),
+    "android.permission.present": ("android.permissions",),
+    "android.targetsdk.lt_policy_min": ("android.targetsdk",),
+    "android.dep.present": ("android.deps",),
+}
+
+def condition_reads(cond, tokens=None) -> set:
+    """Index keys a condition may read; the symbols it tests with ios.api.uses are added to `tokens`."""
+    if not isinstance(cond, dict):
+        return set()
+    if "any" in cond or "all" in cond:
+        return set().union(*(condition_reads(c, tokens) for c in cond.get("any", cond.get("all"))))
+    if len(cond) != 1:
+        return set()
+    key, value = next(iter(cond.items()))
     if key == "exists.true":
-        return bool(idx.get(value, False))
+        return {value} if isinstance(value, str) else set()
+    if key == "ios.api.uses" and tokens is not None:
+        tokens.add(value)
+    return set(CONDITION_READS.get(key, ()))
 
-    return False
+class CompiledRule:
+    __slots__ = ("rule", "id", "severity", "platform", "because", "when", "test", "needs", "requires", "policy_min",
+                 "show_policy_min", "reads", "tokens")
 
-def evaluate_rules(facts_list, rules_doc):
-    idx = index_facts(facts_list)
-    version = rules_doc.get("version", "0")
-    rules = rules_doc.get("rules", [])
-    findings = []
+    def __init__(self, r):
+        self.rule = r
+        self.id = r.get("id")
+        self.severity = r.get("severity", "advisory")
+        self.platform = r.get("platform")
+        self.because = r.get("because", {})
+        then = r.get("then") or {}
+        self.policy_min = then.get("policy_min")
+        self.when = r.get("when") or {}
+        self.test, self.needs = compile_condition(self.when)
+        self.requires = [(req, _compile_require(req)) for req in then.get("require", [])]
+        # Everything the rule can look at, when and require alike: what a lazy scan must extract.
+        tokens = set()
+        reads = condition_reads(self.when, tokens)
+        for req in then.get("require", []):
+            reads |= condition_reads(_require_condition(req), tokens)
+        self.reads, self.tokens = frozenset(reads), frozenset(tokens)
+        self.show_policy_min = any(k in self.when for k in ["android.targetsdk.lt_policy_min"]) or bool(self.policy_min)
 
-    for r in rules:
-        rid = r.get("id")
-        severity = r.get("severity", "advisory")
-        platform = r.get("platform")
-        because = r.get("because", {})
-        require = (r.get("then") or {}).get("require", [])
-        policy_min = (r.get("then") or {}).get("policy_min")
-        when = r.get("when") or {}
-        condition = match_condition(when, idx)
-        if not condition:
-            continue
-
-        missing = []
-        for req in require:
-            if isinstance(req, str):
-                if ":" in req:
-                    k, v = [s.strip() for s in req.split(":", 1)]
-                    ok = match_condition({k: v}, idx)
-                else:
-                    ok = match_condition({"exists.true": req}, idx)
-            elif isinstance(req, dict):
-                ok = match_condition(req, idx)
-            else:
-                ok = False
-            if not ok:
-                missing.append(req)
-
-        extra = {}
-        if any(k in when for k in ["android.targetsdk.lt_policy_min"]) or policy_min:
-            extra["policy_minimum"] = policy_min
-
-        finding = {
-            "id": rid,
-            "platform": platform,
-            "severity": severity,
-            "status": "fail" if (missing or severity == "blocking") else "warn",
-            "missing": missing,
-            "because": because,
-            "evidence": {
-                "matched_when": when,
-                "facts_used": {k: list(v) if isinstance(v, set) else v for k,v in idx.items() if k.startswith(platform)}
-            }
-        }
-        if extra:
-            finding["evidence"].update(extra)
+class CompiledRules:
+    """
+    A rules document compiled once into predicate closures, reusable across
+    any number of evaluate_rules calls. `by_key` is an inverted index from
+    fact-index keys to the rules whose `when` needs them, so rules that
+    cannot match the available facts are never looked at.
+    """
+
+    def __init__(self, rules_doc):
+        self.source = rules_doc
+        self.version = rules_doc.get("version", "0")
+        self.rules = [CompiledRule(r) for r in rules_doc.get("rules", [])]
+        self.always = []
+        self.by_key = {}
+        for pos, cr in enumerate(self.rules):
+            if cr.needs is None:
+                self.always.append(pos)
+            for k in cr.needs or ():
+                self.by_key.setdefault(k, []).append(pos)
+
+    def candidates(self, idx):
+        """Rules that could match `idx`, in document order."""
+        pos = set(self.always)
+        for k, v in idx.items():
+            if k in self.by_key and _present(v):
+                pos.update(self.by_key[k])
+        return [self.rules[p] for p in sorted(pos)]
+
+def compile_rules(rules_doc) -> CompiledRules:
+    return rules_doc if isinstance(rules_doc, CompiledRules) else CompiledRules(rules_doc)
+
+# Index keys derived from other facts (the structured privacy manifest view). The legacy
+# verbose evidence predates them and lists only the facts a scan records directly.
+_DERIVED_PREFIXES = ("_", "ios.privacy.")
 
-        findings.append(finding)
+def _legacy_facts(idx, platform):
+    return {k: list(v) if isinstance(v, set) else v for k, v in idx.items() if k.startswith(platform) and not k.startswith(_DERIVED_PREFIXES)}
 
+def _fact_values(idx):
+    return {k: sorted(v) if isinstance(v, set) else v for k, v in idx.items() if not k.startswith("_")}
+
+def _finding(cr, idx, used=None, compact=True, missing=None):
+    """The finding for a rule whose `when` matched; `used` already holds the when's reads."""
+    if missing is None:
+        missing = [req for req, test in cr.requires if not test(idx, used)]
+    elif used is not None:
+        # Outcomes known (matrix.py); run the tests only to record their reads.
+        for _req, test in cr.requires:
+            test(idx, used)
+
+    extra = {}
+    if cr.show_policy_min:
+        extra["policy_minimum"] = cr.policy_min
+
+    platform = cr.platform
+    severity = cr.severity
+    finding = {
+        "id": cr.id,
+        "platform": platform,
+        "severity": severity,
+        "status": "fail" if (missing or severity == "blocking") else "warn",
+        "missing": missing,
+        "because": cr.because,
+        "evidence": {
+            "matched_when": cr.when,
+            "facts_used": used if compact else _legacy_facts(idx, platform)
+        }
+    }
+    if extra:
+        finding["evidence"].update(extra)
+    return finding
+
+def _report(version, findings, idx, compact):
     summary = {"blocking": 0, "advisory": 0, "fyi": 0}
     for f in findings:
         sev = f.get("severity", "advisory")
         summary[sev] = summary.get(sev, 0) + 1
 
-    return {"version": version, "findings": findings, "summary": summary}
+    report = {"version": version, "findings": findings, "summary": summary}
+    if compact:
+        report["facts"] = _fact_values(idx)
+    return report
+
+def evaluate_rules(facts_list, rules_doc, evidence="compact", timings=None):
+    """
+    Evaluate facts against a rules document or a CompiledRules plan.
+
+    With evidence="compact" the indexed facts are emitted once as
+    report["facts"] and each finding's evidence.facts_used lists only the
+    fact keys/values its when/require conditions looked at. "verbose" keeps
+    the legacy layout: a full per-platform facts snapshot in every finding.
+    `timings` (a timings.Timings) also gets per-rule evaluation times.
+    """
+    phase = phase_of(timings)
+    with phase("evaluate.compile"):
+        plan = compile_rules(rules_doc)
+    with phase("evaluate.index"):
+        idx = index_facts(facts_list)
+    findings = []
+    compact = evidence == "compact"
+    clock = time.perf_counter if timings is not None else None
+
+    with phase("evaluate.rules"):
+        candidates = plan.candidates(idx)
+        for cr in candidates:
+            t0 = clock() if clock else 0.0
+            if cr.test(idx):
+                # Re-run the (cheap) tests with tracking only for rules that fired.
+                used = {} if compact else None
+                if compact:
+                    cr.test(idx, used)
+                findings.append(_finding(cr, idx, used, compact))
+            if clock:
+                timings.rule(cr.id, clock() - t0)
+    if timings is not None:
+        timings.count("rules_evaluated", len(candidates))
+        timings.count("rules_skipped", len(plan.rules) - len(candidates))
+        timings.count("findings", len(findings))
+
+    with phase("evaluate.report"):
+        return _report(plan.version, findings, idx, compact)
+
+_MISSING = object()
+
+class LiveEvaluation:
+    """
+    evaluate_rules kept current while the facts change. Every rule remembers
+    the index keys its last evaluation read (its `needs` if it was skipped);
+    `update` re-runs only the rules that read a key whose value changed and
+    returns the findings that were added, removed or changed.
+    """
+
+    def __init__(self, facts_list, rules_doc, evidence="compact"):
+        self.plan = compile_rules(rules_doc)
+        self.compact = evidence == "compact"
+        self.idx = index_facts(facts_list)
+        n = len(self.plan.rules)
+        self.deps = [None] * n
+        self.findings = [None] * n
+        for pos in range(n):
+            self._run(pos)
+
+    def _run(self, pos):
+        cr = self.plan.rules[pos]
+        idx = self.idx
+        if cr.needs is not None and not any(_present(idx.get(k)) for k in cr.needs):
+            self.deps[pos], self.findings[pos] = cr.needs, None
+            return
+        used = {}
+        finding = _finding(cr, idx, used, self.compact) if cr.test(idx, used) else None
+        # Verbose evidence snapshots every platform fact, so it depends on all of them.
+        self.deps[pos] = frozenset(used) if self.compact or finding is None else None
+        self.findings[pos] = finding
+
+    def update(self, facts_list):
+        old, new = self.idx, index_facts(facts_list)
+        changed = {k for k in old.keys() | new.keys() if old.get(k, _MISSING) != new.get(k, _MISSING)}
+        self.idx = new
+        diff = {"added": [], "removed": [], "changed": []}
+        if not changed:
+            return diff
+        for pos, deps in enumerate(self.deps):
+            if deps is not None and deps.isdisjoint(changed):
+                continue
+            before = self.findings[pos]
+            self._run(pos)
+            after = self.findings[pos]
+            if before is None and after is not None:
+                diff["added"].append(after)
+            elif after is None and before is not None:
+                diff["removed"].append(before)
+            elif before != after:
+                diff["changed"].append(after)
+        return diff
+
+    def report(self):
+        return _report(self.plan.version, [f for f in self.findings if f is not None], self.idx, self.compact)
+
+# Per-worker compiled plan for evaluate_batch.
+_BATCH_PLAN = None
+
+def _batch_init(rules_doc):
+    global _BATCH_PLAN
+    _BATCH_PLAN = compile_rules(rules_doc)
+
+def _batch_one(app, evidence="compact"):
+    name, facts = app
+    facts = [f if isinstance(f, dict) else load_facts(f) for f in facts]
+    return name, evaluate_rules(facts, _BATCH_PLAN, evidence)
+
+def evaluate_batch(apps, rules_doc, jobs=1, evidence="compact", engine="python"):
+    """
+    Evaluate many apps against one rules set. `apps` is an iterable of
+    (name, facts) where facts is a list of facts dicts and/or paths to facts
+    JSON files (loaded in the worker). The rules are compiled once per
+    worker process; yields (name, report) in input order.
+
+    engine="numpy" loads every app's facts here and evaluates them all at
+    once with matrix.evaluate_matrix (same reports; `jobs` is unused).
+    """
+    if engine == "numpy":
+        from .matrix import evaluate_matrix  # optional: pip install 'apppolicy-scanner[numpy]'
+        apps = [(name, [f if isinstance(f, dict) else load_facts(f) for f in facts]) for name, facts in apps]
+        yield from zip([name for name, _facts in apps], evaluate_matrix([facts for _name, facts in apps], rules_doc, evidence))
+        return
+    plan = compile_rules(rules_doc)
+    # Workers get the plain document (closures don't pickle) and compile it themselves.
+    seed = plan if resolve_jobs(jobs) == 1 else plan.source
+    fn = functools.partial(_batch_one, evidence=evidence)
+    yield from imap_jobs(fn, apps, jobs, initializer=_batch_init, initargs=(seed,))
@@ -0,0 +1,10 @@
+"""
+The per-platform scanners, by platform name. Each module provides the same
+interface: classify(name), extract_file(kind, path, tokens, data=None),
+aggregate(items), _extract_entry(entry, tokens) for worker pools,
+cache_fingerprint(tokens) and open_cache(cache_dir, tokens, use_hash, root).
+Android reads no symbols and ignores `tokens`.
+"""
+from . import android_scan, ios_scan
+
+SCANNERS = {"ios": ios_scan, "android": android_scan}
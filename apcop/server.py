@@ -0,0 +1,223 @@
+"""
+`apppolicy serve`: a long-running local JSON API over HTTP/1.1 (TCP or a
+Unix socket) that keeps compiled rules, verified Pro packs and the compiled
+report template warm between requests.
+
+    GET  /health
+    POST /scan      {"platform": "ios"|"android", "project": PATH, "jobs": N, "cache": true}
+    POST /evaluate  {"facts": [FACTS | PATH, ...], "rules": PATH | "rules_pack": URL, "evidence": "compact"}
+    POST /render    {"report": REPORT}                      -> text/html
+
+Scans run in a process pool, and rules loading, evaluate and render in
+threads, so the event loop keeps answering while a large tree is walked or
+a Pro pack is downloaded and verified. The server reads any path it is
+given: bind it to localhost or a private socket only. Over TCP it answers
+only requests whose Host is a local name (or the address it is bound to),
+and it refuses any request carrying an Origin header, so a web page cannot
+reach it from a browser.
+"""
+import asyncio, functools, json, os, pathlib, threading
+from concurrent.futures import ProcessPoolExecutor
+from .pool import resolve_jobs
+from .walk import CACHE_DIRNAME
+
+MAX_BODY = 64 << 20
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _host_name(host):
+    """The name part of a Host header: "[::1]:8765" -> "::1", "localhost:8765" -> "localhost"."""
+    host = host.strip().lower()
+    if host.startswith("["):
+        return host[1:].partition("]")[0]
+    return host.rpartition(":")[0] if ":" in host else host
+
+def _scan(platform, project, jobs, use_cache):
+    cache_dir = str(pathlib.Path(project) / CACHE_DIRNAME) if use_cache else None
+    if platform == "ios":
+        from .ios_scan import scan_ios
+        return scan_ios(project, jobs=jobs, cache_dir=cache_dir)
+    from .android_scan import scan_android
+    return scan_android(project, jobs=jobs, cache_dir=cache_dir)
+
+class PolicyServer:
+    def __init__(self, workers=None, rules=None, rules_pack=None, pack_opts=None):
+        self.pool = ProcessPoolExecutor(max_workers=resolve_jobs(workers))
+        self.default_rules = rules
+        self.default_pack = rules_pack
+        self.pack_opts = pack_opts or {}
+        # ("rules", path) -> (mtime_ns, plan); ("pack", url) -> (None, plan)
+        self._plans = {}
+        self._plans_lock = threading.Lock()
+        # Host names accepted over TCP; None on a Unix socket, where only local processes connect.
+        self.hosts = set(LOCAL_HOSTS)
+
+    def plan(self, rules=None, rules_pack=None):
+        """
+        Compiled rules for a YAML path (recompiled when the file changes) or a
+        Pro pack URL/path. Blocking (a pack may be downloaded and verified):
+        called from worker threads. Two requests for the same cold plan may
+        both load it; the last one stored wins.
+        """
+        from .rules import compile_rules, load_rules
+        rules_pack = rules_pack or (None if rules else self.default_pack)
+        rules = rules or (None if rules_pack else self.default_rules)
+        if rules_pack:
+            key, stamp = ("pack", rules_pack), None
+        elif rules:
+            key = ("rules", rules)
+            try:
+                stamp = os.stat(rules).st_mtime_ns
+            except OSError as e:
+                raise HTTPError(400, f"cannot read rules: {e}")
+        else:
+            raise HTTPError(400, "no rules: pass 'rules' or 'rules_pack' (or start the server with --rules)")
+        with self._plans_lock:
+            cached = self._plans.get(key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        # Load outside the lock: a cold pack download must not hold up requests for plans already built.
+        if rules_pack:
+            from .pro_pack import load_rules_pack
+            pack = load_rules_pack(rules_pack, **self.pack_opts)
+            doc = {"version": pack.get("version","pack"), "rules": pack.get("rules",[])}
+        else:
+            doc = load_rules(rules)
+        plan = compile_rules(doc)
+        with self._plans_lock:
+            self._plans[key] = (stamp, plan)
+        return plan
+
+    async def scan(self, req):
+        platform = req.get("platform")
+        if platform not in ("ios", "android") or not req.get("project"):
+            raise HTTPError(400, "scan needs 'platform' (ios|android) and 'project'")
+        fn = functools.partial(_scan, platform, req["project"], req.get("jobs", 1), req.get("cache", True))
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fn)
+
+    def evaluate(self, req):
+        from .rules import evaluate_rules, load_facts
+        facts = req.get("facts")
+        if not isinstance(facts, list):
+            raise HTTPError(400, "evaluate needs 'facts': a list of facts objects or paths")
+        facts = [f if isinstance(f, dict) else load_facts(f) for f in facts]
+        plan = self.plan(req.get("rules"), req.get("rules_pack"))
+        return evaluate_rules(facts, plan, req.get("evidence", "compact"))
+
+    def render(self, req):
+        from .report import render_html
+        if not isinstance(req.get("report"), dict):
+            raise HTTPError(400, "render needs 'report'")
+        return render_html(req["report"])
+
+    def check_origin(self, headers):
+        """Refuse browser requests: any Origin header, and (over TCP) a Host that is not this machine."""
+        if "origin" in headers:
+            raise HTTPError(403, "cross-origin requests are not accepted")
+        if self.hosts is not None and _host_name(headers.get("host", "")) not in self.hosts:
+            raise HTTPError(403, f"Host {headers.get('host', '')!r} is not a local name")
+
+    async def dispatch(self, method, path, body):
+        if path == "/health":
+            return 200, "application/json", {"status": "ok", "plans": len(self._plans)}
+        if path not in ("/scan", "/evaluate", "/render"):
+            raise HTTPError(404, f"no route {path}")
+        if method != "POST":
+            raise HTTPError(405, "use POST")
+        try:
+            req = json.loads(body or b"{}")
+        except ValueError as e:
+            raise HTTPError(400, f"invalid JSON: {e}")
+        if not isinstance(req, dict):
+            raise HTTPError(400, "request body must be a JSON object")
+        if path == "/scan":
+            return 200, "application/json", await self.scan(req)
+        # Plan loading (maybe a pack download), evaluation and rendering block: keep them off the loop.
+        loop = asyncio.get_running_loop()
+        if path == "/render":
+            return 200, "text/html; charset=utf-8", await loop.run_in_executor(None, self.render, req)
+        return 200, "application/json", await loop.run_in_executor(None, self.evaluate, req)
+
+    async def handle(self, reader, writer):
+        """One connection; HTTP/1.1 keep-alive until the client closes or asks to."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                try:
+                    method, target, _version = line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                # Until the body has been read the next request's start is unknown: errors before that close.
+                body = None
+                try:
+                    try:
+                        length = int(headers.get("content-length") or 0)
+                    except ValueError:
+                        length = -1
+                    if length < 0:
+                        raise HTTPError(400, f"invalid Content-Length: {headers['content-length']!r}")
+                    if length > MAX_BODY:
+                        raise HTTPError(413, f"body larger than {MAX_BODY} bytes")
+                    body = await reader.readexactly(length)
+                    self.check_origin(headers)
+                    status, ctype, payload = await self.dispatch(method, target.split("?", 1)[0], body)
+                except HTTPError as e:
+                    status, ctype, payload = e.status, "application/json", {"error": str(e)}
+                except Exception as e:
+                    status, ctype, payload = 500, "application/json", {"error": f"{type(e).__name__}: {e}"}
+                data = payload.encode("utf-8") if isinstance(payload, str) else json.dumps(payload).encode("utf-8")
+                close = headers.get("connection", "").lower() == "close" or body is None
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: {ctype}\r\n"
+                    f"Content-Length: {len(data)}\r\nConnection: {'close' if close else 'keep-alive'}\r\n\r\n".encode("latin-1") + data)
+                await writer.drain()
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8765, socket_path=None):
+        if socket_path:
+            self.hosts = None
+            return await asyncio.start_unix_server(self.handle, path=socket_path)
+        self.hosts.add(host.strip("[]").lower())
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+def serve(host="127.0.0.1", port=8765, socket_path=None, workers=None, rules=None, rules_pack=None, pack_opts=None):
+    """Run the server until interrupted."""
+    app = PolicyServer(workers, rules, rules_pack, pack_opts)
+
+    async def main():
+        if rules or rules_pack:
+            await asyncio.get_running_loop().run_in_executor(None, app.plan)  # fail fast on bad rules, and warm the plan
+        server = await app.start(host, port, socket_path)
+        where = socket_path or "http://%s:%d" % server.sockets[0].getsockname()[:2]
+        print(f"apppolicy serving on {where}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        app.close()
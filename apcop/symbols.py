@@ -0,0 +1,125 @@
+import re
+
+# Bytes read per step by find_file / find_stream; peak memory stays around
+# a few times this no matter how large the file is.
+STREAM_CHUNK = 1 << 20
+
+_IDENT = set(b"0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz")
+# bytes.translate table mapping every non-identifier byte to a space.
+_WORDS = bytes(b if b in _IDENT else 0x20 for b in range(256))
+
+def _trie_pattern(words):
+    """
+    Build a regex for a set of byte strings shaped like a trie, e.g.
+    UI(?:Pasteboard|ImagePickerController). sre can then reject a position
+    after one byte compare instead of trying every token in turn, and the
+    greedy optional groups make it prefer the longest token at a position.
+    """
+    trie = {}
+    for w in words:
+        node = trie
+        for b in w:
+            node = node.setdefault(b, {})
+        node[None] = True
+
+    def emit(node):
+        alts = [re.escape(bytes([b])) + emit(child) for b, child in sorted((k, v) for k, v in node.items() if k is not None)]
+        if not alts:
+            return b""
+        if len(alts) == 1 and None not in node:
+            return alts[0]
+        body = b"(?:" + b"|".join(alts) + b")"
+        return body + b"?" if None in node else body
+
+    return emit(trie)
+
+class TokenMatcher:
+    """
+    Literal multi-token matcher compiled once and reused across files.
+
+    `find(data)` returns {token: first 1-based line} with plain substring
+    semantics (same as `token in text`). Identifier-shaped tokens can only
+    occur inside a run of identifier bytes, so the file is first reduced to
+    its set of distinct identifiers (a couple of C-level passes) and the
+    compiled trie only runs over those; the search stops as soon as every
+    token has been seen. Short token lists skip all that, since a handful
+    of `bytes.__contains__` calls is cheaper than building the word set.
+
+    With `ignore_case=True` tokens and data are compared ASCII-lowercased
+    and the returned tokens are the lowercased forms.
+    """
+
+    # Up to this many tokens, per-token substring search is faster.
+    linear_max = 32
+
+    def __init__(self, tokens, ignore_case=False):
+        self.ignore_case = ignore_case
+        self.tokens = sorted({t.lower() if ignore_case else t for t in tokens if t})
+        self._encoded = encoded = [t.encode("utf-8") for t in self.tokens]
+        self._pattern = re.compile(_trie_pattern(encoded)) if encoded else None
+        self._words_only = all(set(w) <= _IDENT for w in encoded)
+        # Overlap kept between chunks so a token straddling a boundary is still seen whole.
+        self._overlap = max((len(w) for w in encoded), default=1) - 1
+        # A match of one token also proves every token it contains.
+        self._implied = {w: [o.decode("utf-8") for o in encoded if o in w] for w in encoded}
+
+    def present(self, data: bytes) -> set:
+        """Return the set of tokens that occur anywhere in `data`."""
+        found = set()
+        if self._pattern is None:
+            return found
+        if self.ignore_case:
+            data = data.lower()
+        if len(self.tokens) <= self.linear_max:
+            return {t for t, w in zip(self.tokens, self._encoded) if w in data}
+        if self._words_only:
+            data = b" ".join(set(data.translate(_WORDS).split()))
+        want = len(self.tokens)
+        search = self._pattern.search
+        m = search(data)
+        while m:
+            found.update(self._implied[m.group()])
+            if len(found) == want:
+                break
+            # Restart one byte further on so overlapping tokens are not skipped.
+            m = search(data, m.start() + 1)
+        return found
+
+    def find(self, data: bytes) -> dict:
+        present = self.present(data)
+        if self.ignore_case and present:
+            data = data.lower()
+        firsts = sorted((data.find(t.encode("utf-8")), t) for t in present)
+        found, line, last = {}, 1, 0
+        for pos, t in firsts:
+            line += data.count(b"\n", last, pos)
+            last = pos
+            found[t] = line
+        return found
+
+    def find_stream(self, f, chunk_size=STREAM_CHUNK) -> dict:
+        """
+        `find` over a binary file object read in `chunk_size` pieces. Each
+        window is the previous window's last len(longest token) - 1 bytes
+        plus the next chunk, so matches across chunk boundaries are kept and
+        memory stays bounded regardless of file size.
+        """
+        found = {}
+        want = len(self.tokens)
+        tail = b""
+        lines_before_tail = 0
+        while len(found) < want:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            window = tail + chunk
+            for t, line in self.find(window).items():
+                found.setdefault(t, lines_before_tail + line)
+            keep = min(self._overlap, len(window))
+            lines_before_tail += window.count(b"\n", 0, len(window) - keep)
+            tail = window[len(window) - keep:]
+        return found
+
+    def find_file(self, path, chunk_size=STREAM_CHUNK) -> dict:
+        with open(path, "rb") as f:
+            return self.find_stream(f, chunk_size)
@@ -0,0 +1,81 @@
+"""
+Opt-in instrumentation for scans, evaluation and rendering (`--timings`).
+
+A Timings object is passed down explicitly; every instrumented function
+takes `timings=None` and does no extra work without one. It records:
+
+  phases  wall and CPU seconds per named phase (CPU is this process only;
+          with --jobs the workers' time shows up in the per-file wall times)
+  counts  files visited/skipped/cached/parsed, bytes read, rules evaluated...
+  files   the N slowest files to extract
+  rules   evaluation seconds per rule id
+"""
+import contextlib, heapq, json, os, pathlib, time
+
+class Timings:
+    def __init__(self, slowest=20):
+        self.slowest = slowest
+        self.phases = {}            # name -> [wall, cpu, calls]
+        self.counts = {}
+        self.rules = {}             # rule id -> [seconds, calls]
+        self._files = []            # min-heap of (seconds, rel, kind, bytes)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            p = self.phases.setdefault(name, [0.0, 0.0, 0])
+            p[0] += time.perf_counter() - wall
+            p[1] += time.process_time() - cpu
+            p[2] += 1
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def file(self, rel, kind, seconds, size):
+        self.count("files_parsed")
+        self.count("bytes_read", size)
+        item = (seconds, rel, kind, size)
+        if len(self._files) < self.slowest:
+            heapq.heappush(self._files, item)
+        elif item > self._files[0]:
+            heapq.heapreplace(self._files, item)
+
+    def rule(self, rid, seconds):
+        r = self.rules.setdefault(rid, [0.0, 0])
+        r[0] += seconds
+        r[1] += 1
+
+    def as_dict(self):
+        ms = lambda s: round(s * 1000, 3)
+        return {
+            "phases": {name: {"wall_ms": ms(w), "cpu_ms": ms(c), "calls": n} for name, (w, c, n) in self.phases.items()},
+            "counts": dict(sorted(self.counts.items())),
+            "slowest_files": [{"file": rel, "kind": kind, "ms": ms(s), "bytes": size}
+                              for s, rel, kind, size in sorted(self._files, reverse=True)],
+            "rules": [{"id": rid, "ms": ms(s), "calls": n}
+                      for rid, (s, n) in sorted(self.rules.items(), key=lambda kv: (-kv[1][0], kv[0]))],
+        }
+
+    def dump(self, path):
+        pathlib.Path(path).write_text(json.dumps(self.as_dict(), indent=2), encoding="utf-8")
+
+def phase_of(timings):
+    """timings.phase, or a no-op stand-in when not collecting."""
+    return timings.phase if timings is not None else _no_phase
+
+def _no_phase(_name):
+    return contextlib.nullcontext()
+
+def timed(fn, entry):
+    """fn(entry) for a (kind, abs_path, rel) entry, as (result, seconds, file size). Picklable via partial."""
+    t0 = time.perf_counter()
+    res = fn(entry)
+    seconds = time.perf_counter() - t0
+    try:
+        size = os.path.getsize(entry[1])
+    except OSError:
+        size = 0
+    return res, seconds, size
@@ -0,0 +1,61 @@
+import os
+
+CACHE_DIRNAME = ".apppolicy-cache"
+
+# Directory names skipped entirely while walking a project tree. ALWAYS_PRUNE
+# stays skipped even when the defaults are turned off (--no-default-prune).
+ALWAYS_PRUNE = frozenset({".git", CACHE_DIRNAME})
+DEFAULT_PRUNE = ALWAYS_PRUNE | {"DerivedData", "build", "node_modules"}
+
+def walk_files(root, prune=DEFAULT_PRUNE):
+    """
+    Yield every regular file under `root` as an `os.DirEntry`, in a single
+    os.scandir pass. Directories whose name is in `prune` are not descended
+    into, and symlinked directories are not followed. Entries are visited in
+    sorted name order so results are stable across filesystems.
+    """
+    prune = frozenset(prune or ())
+    stack = [os.fspath(root)]
+    while stack:
+        top = stack.pop()
+        try:
+            with os.scandir(top) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in prune:
+                        subdirs.append(entry.path)
+                elif entry.is_file():
+                    yield entry
+            except OSError:
+                pass
+        stack.extend(reversed(subdirs))
+
+def walk_key(rel):
+    """Sort key reproducing walk_files order: a directory's files first, then its sub-directories."""
+    parts = rel.split("/")
+    return tuple((1, p) for p in parts[:-1]) + ((0, parts[-1]),)
+
+def collect_files(root, classify, prune=DEFAULT_PRUNE, kinds=None, timings=None):
+    """
+    Walk `root` once and return [(kind, abs_path, rel_posix_path)] in walk
+    order for every file `classify(name)` maps to a kind (optionally only
+    the kinds listed in `kinds`).
+    """
+    out = []
+    base = len(os.fspath(root).rstrip("/\\")) + 1
+    visited = 0
+    for entry in walk_files(root, prune):
+        visited += 1
+        kind = classify(entry.name)
+        if kind is None or (kinds is not None and kind not in kinds):
+            continue
+        out.append((kind, entry.path, entry.path[base:].replace("\\", "/")))
+    if timings is not None:
+        timings.count("files_visited", visited)
+        timings.count("files_skipped", visited - len(out))
+    return out
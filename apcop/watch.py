@@ -0,0 +1,256 @@
+"""
+`apppolicy watch`: scan a project once, then on every change re-extract only
+the changed files, re-aggregate the facts and re-evaluate only the rules
+that read a fact whose value changed (rules.LiveEvaluation).
+
+Change notification uses inotify on Linux (through libc, no extra
+dependency) and falls back to polling file stats everywhere else.
+"""
+import ctypes, ctypes.util, os, select, struct, sys, time
+from .cache import cache_or_none, extract_entries
+from .rules import LiveEvaluation
+from .scanners import SCANNERS
+from .walk import DEFAULT_PRUNE, collect_files, walk_files, walk_key
+
+# Quiet period that ends one burst of events (an editor save is several).
+DEBOUNCE = 0.02
+
+class ProjectFacts:
+    """One platform's per-file extraction results, kept in walk order and re-aggregated on change."""
+
+    def __init__(self, platform, root, prune=DEFAULT_PRUNE, jobs=1, cache_dir=None):
+        self.platform = platform
+        self.module = SCANNERS[platform]
+        self.root = os.fspath(root)
+        self.prune = frozenset(prune)
+        self.files = {}
+        self.order = []
+        self.rescan(jobs, cache_dir)
+
+    def rescan(self, jobs=1, cache_dir=None):
+        entries = collect_files(self.root, self.module.classify, self.prune)
+        with cache_or_none(self.module.open_cache, cache_dir, root=self.root) as cache:
+            results = extract_entries(self.module._extract_entry, entries, jobs, cache)
+            if cache is not None:
+                cache.retain(rel for _kind, _path, rel in entries)
+        self.files = {rel: (kind, res) for (kind, _path, rel), res in zip(entries, results)}
+        self.order = [rel for _kind, _path, rel in entries]
+
+    def update(self, rels):
+        """Re-extract the given relative paths (files or directories); True if any result changed."""
+        changed = reorder = False
+        for rel in rels:
+            path = os.path.join(self.root, rel)
+            if os.path.isdir(path):
+                for kind, sub, sub_rel in collect_files(path, self.module.classify, self.prune):
+                    changed |= self._put(f"{rel}/{sub_rel}", kind, sub)
+                    reorder = True
+                continue
+            kind = self.module.classify(rel.rsplit("/", 1)[-1])
+            if kind is not None and os.path.isfile(path):
+                reorder |= rel not in self.files
+                changed |= self._put(rel, kind, path)
+            else:
+                # Deleted file, or a directory that was removed or moved away.
+                gone = [r for r in self.files if r == rel or r.startswith(rel + "/")]
+                for r in gone:
+                    del self.files[r]
+                changed |= bool(gone)
+                reorder |= bool(gone)
+        if reorder:
+            self.order = sorted(self.files, key=walk_key)
+        return changed
+
+    def _put(self, rel, kind, path):
+        entry = (kind, self.module.extract_file(kind, path))
+        if self.files.get(rel) == entry:
+            return False
+        self.files[rel] = entry
+        return True
+
+    def facts(self):
+        return self.module.aggregate([(self.files[rel][0], rel, self.files[rel][1]) for rel in self.order])
+
+class LiveProject:
+    """
+    Facts and findings for a project tree, patched incrementally. With
+    `platforms=None` every platform the first scan found files for is
+    tracked (both when the tree is still empty).
+    """
+
+    def __init__(self, project, rules_doc, platforms=None, prune=DEFAULT_PRUNE, evidence="compact", jobs=1, cache_dir=None):
+        self.root = os.fspath(project)
+        states = {p: ProjectFacts(p, project, prune, jobs, cache_dir) for p in platforms or SCANNERS}
+        if not platforms:
+            states = {p: s for p, s in states.items() if s.files} or states
+        self.states = states
+        self.live = LiveEvaluation(self.facts(), rules_doc, evidence)
+
+    def facts(self):
+        return [s.facts() for s in self.states.values()]
+
+    def apply(self, rels):
+        """Patch facts for changed paths; the findings diff, or None when no facts changed."""
+        changed = False
+        for state in self.states.values():
+            changed |= state.update(rels)
+        return self.live.update(self.facts()) if changed else None
+
+    def rescan(self):
+        for state in self.states.values():
+            state.rescan()
+        return self.live.update(self.facts())
+
+    def report(self):
+        return self.live.report()
+
+class PollWatcher:
+    """Detect changes by comparing (mtime, size) of the files `interesting(name)` selects."""
+
+    def __init__(self, root, prune=DEFAULT_PRUNE, interesting=None, interval=0.5):
+        self.root = os.fspath(root)
+        self.prune = prune
+        self.interesting = interesting or (lambda name: True)
+        self.interval = interval
+        self.snapshot = self._stat_all()
+
+    def _stat_all(self):
+        out = {}
+        base = len(self.root.rstrip("/\\")) + 1
+        for entry in walk_files(self.root, self.prune):
+            if self.interesting(entry.name):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                out[entry.path[base:].replace("\\", "/")] = (st.st_mtime_ns, st.st_size)
+        return out
+
+    def wait(self, timeout=None):
+        """Block until something changed (or `timeout` elapsed); the changed relative paths."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self.interval if deadline is None else max(0, min(self.interval, deadline - time.monotonic())))
+            snap = self._stat_all()
+            changed = {rel for rel in snap.keys() | self.snapshot.keys() if snap.get(rel) != self.snapshot.get(rel)}
+            self.snapshot = snap
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x8, 0x40, 0x80, 0x100, 0x200
+IN_Q_OVERFLOW, IN_IGNORED, IN_ISDIR = 0x4000, 0x8000, 0x40000000
+_EVENT = struct.Struct("iIII")
+
+class InotifyWatcher:
+    """
+    Linux inotify on every (non-pruned) directory of the tree. `wait`
+    returns None when the kernel queue overflowed and events were lost:
+    the caller must rescan.
+    """
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self, root, prune=DEFAULT_PRUNE):
+        self.root = os.fspath(root)
+        self.prune = frozenset(prune)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}  # watch descriptor -> directory path relative to root ("" for root)
+        self._add_tree("")
+
+    def _add_tree(self, rel):
+        top = os.path.join(self.root, rel) if rel else self.root
+        for dirpath, dirnames, _files in os.walk(top):
+            dirnames[:] = sorted(d for d in dirnames if d not in self.prune)
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dirpath), self.MASK)
+            if wd >= 0:
+                sub = os.path.relpath(dirpath, self.root).replace("\\", "/")
+                self.dirs[wd] = "" if sub == "." else sub
+
+    def _drop_tree(self, rel):
+        for wd, d in list(self.dirs.items()):
+            if d == rel or d.startswith(rel + "/"):
+                self._libc.inotify_rm_watch(self.fd, wd)
+                del self.dirs[wd]
+
+    def wait(self, timeout=None):
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        changed = set()
+        while True:
+            try:
+                buf = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                if not select.select([self.fd], [], [], DEBOUNCE)[0]:
+                    return changed
+                continue
+            off = 0
+            while off < len(buf):
+                wd, mask, _cookie, length = _EVENT.unpack_from(buf, off)
+                name = buf[off + _EVENT.size: off + _EVENT.size + length].rstrip(b"\0").decode("utf-8", "surrogateescape")
+                off += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                d = self.dirs.get(wd)
+                if mask & IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+                if d is None or not name:
+                    continue
+                rel = f"{d}/{name}" if d else name
+                if mask & IN_ISDIR:
+                    if name in self.prune:
+                        continue
+                    if mask & IN_MOVED_FROM:
+                        self._drop_tree(rel)
+                    elif mask & (IN_CREATE | IN_MOVED_TO):
+                        self._add_tree(rel)
+                changed.add(rel)
+
+    def close(self):
+        os.close(self.fd)
+
+def open_watcher(root, prune=DEFAULT_PRUNE, interesting=None, poll=None):
+    """inotify where available, unless a polling interval (seconds) is requested."""
+    if poll is None and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, prune)
+        except (OSError, AttributeError):
+            pass
+    return PollWatcher(root, prune, interesting, poll or 0.5)
+
+def watch(project, rules_doc, on_change, platforms=None, prune=DEFAULT_PRUNE, evidence="compact", poll=None,
+          jobs=1, cache_dir=None, stop=None):
+    """
+    Scan `project`, then call `on_change(live, diff, paths, seconds)` after
+    every change that altered the facts (and once up front with diff=None).
+    Runs until interrupted, or until `stop()` returns true.
+    """
+    live = LiveProject(project, rules_doc, platforms, prune, evidence, jobs, cache_dir)
+    classifiers = [SCANNERS[p].classify for p in live.states]
+    interesting = lambda name: any(c(name) for c in classifiers)
+    watcher = open_watcher(project, prune, interesting, poll)
+    on_change(live, None, [], 0.0)
+    try:
+        while not (stop and stop()):
+            paths = watcher.wait(0.5)
+            if paths is None:
+                t0 = time.perf_counter()
+                diff, paths = live.rescan(), ["*"]
+            elif not paths:
+                continue
+            else:
+                t0 = time.perf_counter()
+                diff = live.apply(paths)
+            if diff is not None:
+                seconds = time.perf_counter() - t0
+                # Editors' temp files show up too; name only the tracked ones when there are any.
+                shown = sorted(p for p in paths if interesting(p.rsplit("/", 1)[-1])) or sorted(paths)
+                on_change(live, diff, shown, seconds)
+    finally:
+        watcher.close()
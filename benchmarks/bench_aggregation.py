@@ -0,0 +1,71 @@
+"""
+Micro-benchmarks for the scanner aggregation paths on synthetic large
+projects: many manifests/Info.plists, one huge lockfile, and the
+any_ads_or_clipboard_sdk condition against a long SDK list.
+
+    python benchmarks/bench_aggregation.py [--manifests 10000] [--lock-mb 50]
+"""
+import argparse, pathlib, plistlib, tempfile, time
+from apcop import android_scan, ios_scan
+from apcop.rules import compile_condition, index_facts
+
+def timed(label, fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    print(f"{label:<48} {time.perf_counter() - t0:8.3f} s")
+    return out
+
+def legacy_dedup(items):
+    # The pre-set aggregation: a list scan per insert.
+    perms = []
+    for _kind, _rel, res in items:
+        for name in res["permissions"]:
+            if name not in perms:
+                perms.append(name)
+    return sorted(set(perms))
+
+def make_android(root: pathlib.Path, n):
+    for i in range(n):
+        d = root / f"feature{i:05d}" / "src" / "main"
+        d.mkdir(parents=True)
+        perms = "".join(f'<uses-permission android:name="com.example.p{(i * 7 + j) % (n // 2 + 1)}"/>' for j in range(5))
+        (d / "AndroidManifest.xml").write_text(
+            f'<manifest xmlns:android="http://schemas.android.com/apk/res/android">{perms}</manifest>')
+
+def make_ios(root: pathlib.Path, n, lock_mb):
+    for i in range(n):
+        d = root / f"Target{i:05d}"
+        d.mkdir(parents=True)
+        (d / "Info.plist").write_bytes(plistlib.dumps({f"NS{i % 500}UsageDescription": "x", "CFBundleName": str(i)}))
+    line = "  - SomeVendoredPod/Subspec (1.2.3):\n    - Dependency (~> 4.0)\n"
+    with open(root / "Podfile.lock", "w") as f:
+        f.write("PODS:\n")
+        f.write(line * (lock_mb * 1024 * 1024 // len(line)))
+        f.write("  - AppsFlyerFramework (6.12.0)\n")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--manifests", type=int, default=10000)
+    ap.add_argument("--lock-mb", type=int, default=50)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = pathlib.Path(tmp)
+        make_android(tmp / "android", args.manifests)
+        make_ios(tmp / "ios", args.manifests, args.lock_mb)
+
+        entries = android_scan.collect_files(tmp / "android", android_scan.classify)
+        items = [(k, rel, android_scan.extract_file(k, p)) for k, p, rel in entries]
+        timed(f"android aggregate, {len(items)} manifests", android_scan.aggregate, items)
+        timed(f"android legacy list dedup, {len(items)} manifests", legacy_dedup, items)
+        timed("scan_android end to end", android_scan.scan_android, str(tmp / "android"))
+
+        timed(f"lockfile extract, {args.lock_mb} MB Podfile.lock", ios_scan.extract_file, "lockfile", tmp / "ios" / "Podfile.lock")
+        timed("scan_ios end to end", ios_scan.scan_ios, str(tmp / "ios"))
+
+    sdks = [f"vendor-sdk-{i}" for i in range(5000)] + ["AppLovinSDK"]
+    idx = index_facts([{"platform": "ios", "signals": {"sdk_names": sdks}}])
+    test, _ = compile_condition({"ios.sdk.present": "any_ads_or_clipboard_sdk"})
+    timed("any_ads_or_clipboard_sdk x 1000, 5001 SDKs", lambda: [test(idx) for _ in range(1000)])
+
+if __name__ == "__main__":
+    main()
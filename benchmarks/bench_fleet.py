@@ -0,0 +1,48 @@
+"""
+Fleet aggregation over many synthetic report.json files: time to stream
+and index them, time to render the paginated dashboard, and peak traced
+memory (which should track apps x rules, not total report size).
+
+    python benchmarks/bench_fleet.py [--reports 10000] [--rules 60]
+"""
+import argparse, json, pathlib, random, tempfile, time, tracemalloc
+from apcop.fleet import build_index, iter_reports, write_dashboard
+
+def make_reports(root: pathlib.Path, n, n_rules, seed=1):
+    rnd = random.Random(seed)
+    rules = [(f"rule.{i:03d}", rnd.choice(["blocking", "advisory", "advisory", "fyi"])) for i in range(n_rules)]
+    for a in range(n):
+        findings = []
+        for rid, sev in rnd.sample(rules, rnd.randint(0, 12)):
+            findings.append({"id": rid, "platform": "ios", "severity": sev, "status": rnd.choice(["fail", "warn"]),
+                             "missing": [], "because": {"url": "https://example.com/policy"},
+                             "evidence": {"matched_when": {"ios.api.uses": "X"}, "facts_used": {"ios.symbols": ["X"] * 20}}})
+        (root / f"app{a:05d}.report.json").write_text(json.dumps({"version": "bench", "findings": findings, "summary": {}}))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reports", type=int, default=10000)
+    ap.add_argument("--rules", type=int, default=60)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as d:
+        root = pathlib.Path(d)
+        (root / "reports").mkdir()
+        make_reports(root / "reports", args.reports, args.rules)
+        size = sum(p.stat().st_size for p in (root / "reports").iterdir())
+        print(f"{args.reports} reports, {size / 1e6:.1f} MB on disk")
+
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        idx = build_index(iter_reports([root / "reports"]))
+        t1 = time.perf_counter()
+        summary = write_dashboard(idx, root / "dash")
+        t2 = time.perf_counter()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{'stream + index':<28} {t1 - t0:8.3f} s")
+        print(f"{'render dashboard':<28} {t2 - t1:8.3f} s   ({len(list((root / 'dash').glob('apps-*.html')))} app pages)")
+        print(f"{'peak traced memory':<28} {peak / 1e6:8.1f} MB")
+        print(f"blocked apps: {summary['blocked_apps']}")
+
+if __name__ == "__main__":
+    main()
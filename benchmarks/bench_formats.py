@@ -0,0 +1,69 @@
+"""
+Size and load time of big facts files in each --format: pretty JSON (the
+original), compact JSON with a string table, and MessagePack (if
+installed). Also times loading a batch of many small facts files.
+
+    python benchmarks/bench_formats.py [--sdks 5000] [--files 2000]
+"""
+import argparse, importlib.util, pathlib, random, tempfile, time
+from apcop.formats import FORMATS, dump, load
+
+def big_ios_facts(n_sdks, n_files, seed=3):
+    rnd = random.Random(seed)
+    files = [f"Sources/Module{i // 50}/File{i}.swift" for i in range(n_files)]
+    tokens = [f"Token{i}" for i in range(60)]
+    return {
+        "platform": "ios",
+        "plist_keys": [f"NS{i}UsageDescription" for i in range(40)],
+        "entitlements": {f"com.apple.developer.key{i}": True for i in range(30)},
+        "privacy_manifest": {"NSPrivacyAccessedAPITypes": [
+            {"NSPrivacyAccessedAPIType": f"NSPrivacyAccessedAPICategory{i}", "NSPrivacyAccessedAPITypeReasons": ["CA92.1", "1C8F.1"]}
+            for i in range(200)]},
+        "signals": {"auth_present": True, "sdk_names": sorted(f"com.vendor{i % 97}.sdk-{i}" for i in range(n_sdks)),
+                    "symbols": tokens,
+                    "symbol_hits": {t: [{"file": rnd.choice(files), "line": rnd.randint(1, 3000)} for _ in range(20)] for t in tokens}},
+    }
+
+def timed_load(path, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        load(path)
+    return (time.perf_counter() - t0) / repeat
+
+def formats():
+    out = ["json", "compact"]
+    if importlib.util.find_spec("msgpack") is not None:
+        out.append("msgpack")
+    else:
+        print("(msgpack not installed: skipping that format)")
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sdks", type=int, default=5000)
+    ap.add_argument("--files", type=int, default=2000)
+    ap.add_argument("--batch", type=int, default=2000, help="Small facts files in the batch-load test")
+    args = ap.parse_args()
+    facts = big_ios_facts(args.sdks, args.files)
+    small = big_ios_facts(40, 50)
+    fmts = formats()
+    assert set(fmts) <= set(FORMATS)
+    with tempfile.TemporaryDirectory() as d:
+        root = pathlib.Path(d)
+        print(f"{'format':<10} {'size':>10} {'load (big)':>12} {'load x' + str(args.batch):>14}")
+        for fmt in fmts:
+            path = root / f"big.{fmt}"
+            dump(facts, path, "facts", fmt)
+            assert load(path) == facts
+            paths = []
+            for i in range(args.batch):
+                paths.append(root / f"small{i}.{fmt}")
+                dump(small, paths[-1], "facts", fmt)
+            t0 = time.perf_counter()
+            for p in paths:
+                load(p)
+            batch = time.perf_counter() - t0
+            print(f"{fmt:<10} {path.stat().st_size / 1e3:>8.0f} kB {timed_load(path, 20) * 1e3:>9.2f} ms {batch:>12.3f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Gradle extraction on a large synthetic multi-module project (Kotlin DSL
+build files using a version catalog, plus per-module lockfiles): the
+single-pass tokenizer against a naive one-regex-per-construct extractor,
+and end-to-end scan_android.
+
+    python benchmarks/bench_gradle.py [--modules 300] [--deps 40]
+"""
+import argparse, pathlib, re, tempfile, time
+from apcop.android_scan import scan_android
+from apcop.gradle import parse_build_file
+
+NAIVE_PATTERNS = [re.compile(p) for p in (
+    r"targetSdk(?:Version)?\s*=?\s*\(?\s*(\d+)",
+    r"minSdk(?:Version)?\s*=?\s*\(?\s*(\d+)",
+    r"targetSdk\s*=\s*(libs\.versions\.[\w.]+)",
+    r"""(\w+)\s*\(?\s*["']([^"':\s]+:[^"':\s]+(?::[^"'\s]+)?)["']""",
+    r"(\w+)\s*\(\s*(libs\.[\w.]+)\s*\)",
+    r"(\w+)\s*\(\s*platform\(\s*(libs\.[\w.]+)\s*\)\s*\)",
+    r"""project\(\s*["']([^"']+)["']\s*\)""",
+    r"""id\s*\(?\s*["']([\w.]+)["']""",
+    r"alias\(\s*(libs\.plugins\.[\w.]+)\s*\)",
+)]
+
+def naive_extract(text):
+    # Each construct gets its own regex pass; comments and block context are ignored.
+    return [p.findall(text) for p in NAIVE_PATTERNS]
+
+def make_project(root: pathlib.Path, modules, deps):
+    (root / "gradle").mkdir()
+    libs = "\n".join(f'lib{i} = {{ module = "com.vendor{i % 23}:artifact{i}", version.ref = "v{i % 17}" }}' for i in range(deps * 3))
+    versions = "\n".join(f'v{i} = "1.{i}.0"' for i in range(17))
+    (root / "gradle/libs.versions.toml").write_text(f"[versions]\ntargetSdk = \"34\"\n{versions}\n[libraries]\n{libs}\n"
+                                                    "[plugins]\nandroid-application = { id = \"com.android.application\" }\n")
+    for m in range(modules):
+        d = root / f"feature{m:03d}"
+        (d / "src/main").mkdir(parents=True)
+        dep_lines = "\n".join(f"    implementation(libs.lib{(m + i) % (deps * 3)})" if i % 3 else
+                              f'    implementation("com.example{i}:direct{i}:2.{i}")' for i in range(deps))
+        plugin = "alias(libs.plugins.android.application)" if m == 0 else 'id("com.android.library")'
+        (d / "build.gradle.kts").write_text(
+            f"plugins {{\n    {plugin}\n}}\n/* module {m} */\nandroid {{\n    namespace = \"com.example.f{m}\"\n"
+            f"    defaultConfig {{\n        minSdk = 24\n        targetSdk = libs.versions.targetSdk.get().toInt()\n    }}\n}}\n"
+            f"dependencies {{\n{dep_lines}\n    implementation(project(\":core\"))\n    testImplementation(\"junit:junit:4.13.2\")\n}}\n")
+        (d / "gradle.lockfile").write_text("".join(f"com.vendor{i % 23}:artifact{i}:1.0.{m}=releaseRuntimeClasspath\n" for i in range(deps)))
+        (d / "src/main/AndroidManifest.xml").write_text('<manifest xmlns:android="http://schemas.android.com/apk/res/android"/>')
+
+def timed(label, fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    print(f"{label:<44} {best:8.3f} s")
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--modules", type=int, default=300)
+    ap.add_argument("--deps", type=int, default=40)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as d:
+        root = pathlib.Path(d)
+        make_project(root, args.modules, args.deps)
+        texts = [p.read_text() for p in sorted(root.glob("*/build.gradle.kts"))]
+        timed(f"naive regexes, {len(texts)} build files", lambda: [naive_extract(t) for t in texts])
+        timed(f"tokenizer, {len(texts)} build files", lambda: [parse_build_file(t) for t in texts])
+        facts = timed("scan_android (sequential, no cache)", lambda: scan_android(str(root)))
+        timed("scan_android --jobs 0", lambda: scan_android(str(root), jobs=0))
+        print(f"{len(facts['modules'])} modules, {len(facts['deps'])} distinct deps, targetsdk={facts['targetsdk']}")
+
+if __name__ == "__main__":
+    main()
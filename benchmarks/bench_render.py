@@ -0,0 +1,58 @@
+"""
+HTML rendering throughput: many small reports through one HtmlRenderer
+versus a fresh Environment + compile per report (the old render_html),
+and peak memory of write() vs render() for one huge report.
+
+    python benchmarks/bench_render.py [--reports 500] [--findings 50000]
+"""
+import argparse, os, tempfile, time, tracemalloc
+from apcop.report import HtmlRenderer
+
+def make_report(n, seed=0):
+    findings = [{"id": f"rule.{seed}.{i}", "platform": "ios" if i % 2 else "android", "severity": "advisory",
+                 "because": {"section": f"Section {i}", "url": "https://example.com"}, "missing": [f"key{i}"], "status": "warn"}
+                for i in range(n)]
+    return {"summary": {"advisory": n}, "findings": findings}
+
+def legacy_render(report):
+    # Pre-HtmlRenderer behaviour: build an Environment and compile per call.
+    from jinja2 import Environment, BaseLoader
+    from apcop.report import _load_text
+    env = Environment(loader=BaseLoader(), autoescape=True)
+    tmpl = env.from_string(_load_text("apcop.templates", "report.html"))
+    renderer = HtmlRenderer.__new__(HtmlRenderer)
+    renderer.css = _load_text("apcop.assets", "report.css")
+    return tmpl.render(renderer._context(report))
+
+def timed(label, fn):
+    t0 = time.perf_counter()
+    fn()
+    print(f"{label:<44} {time.perf_counter() - t0:8.3f} s")
+
+def peak(label, fn):
+    tracemalloc.start()
+    fn()
+    print(f"{label:<44} {tracemalloc.get_traced_memory()[1] / 1e6:8.1f} MB peak")
+    tracemalloc.stop()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reports", type=int, default=500)
+    ap.add_argument("--findings", type=int, default=50000)
+    args = ap.parse_args()
+    reports = [make_report(8, s) for s in range(args.reports)]
+    timed(f"legacy: compile per report x{args.reports}", lambda: [legacy_render(r) for r in reports])
+    renderer = HtmlRenderer()
+    timed(f"HtmlRenderer.render x{args.reports}", lambda: [renderer.render(r) for r in reports])
+    with tempfile.TemporaryDirectory() as bc:
+        HtmlRenderer(bc)
+        timed("HtmlRenderer() cold, no bytecode cache", lambda: HtmlRenderer())
+        timed("HtmlRenderer() with warm bytecode cache", lambda: HtmlRenderer(bc))
+    big = make_report(args.findings)
+    with tempfile.TemporaryDirectory() as d:
+        out = os.path.join(d, "big.html")
+        peak(f"render() {args.findings} findings", lambda: renderer.render(big))
+        peak(f"write() {args.findings} findings", lambda: renderer.write(big, out))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Symbol scanning cost vs. token count: the old per-token `t in txt` loop
+against apcop.symbols.TokenMatcher.
+
+    python benchmarks/bench_symbols.py [--files 200] [--kb 64]
+"""
+import argparse, random, string, time
+from apcop.ios_scan import SYMBOL_TOKENS
+from apcop.symbols import TokenMatcher
+
+def make_tokens(n, rnd):
+    tokens = list(SYMBOL_TOKENS[:n])
+    while len(tokens) < n:
+        tokens.append("".join(rnd.choice(string.ascii_letters) for _ in range(rnd.randint(8, 24))))
+    return tokens
+
+def make_sources(files, kb, rnd):
+    words = ["let", "var", "func", "return", "self", "guard", "view", "frame", "UIView", "String", "UIPasteboard", "UserDefaults"]
+    out = []
+    for _ in range(files):
+        lines, size = [], 0
+        while size < kb * 1024:
+            line = " ".join(rnd.choice(words) for _ in range(10))
+            lines.append(line)
+            size += len(line) + 1
+        out.append("\n".join(lines))
+    return out
+
+def naive(sources, tokens):
+    found = set()
+    for txt in sources:
+        for t in tokens:
+            if t in txt:
+                found.add(t)
+    return found
+
+def matcher(sources, tokens):
+    m = TokenMatcher(tokens)
+    found = set()
+    for data in sources:
+        found.update(m.find(data))
+    return found
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=200)
+    ap.add_argument("--kb", type=int, default=64)
+    args = ap.parse_args()
+    rnd = random.Random(0)
+    texts = make_sources(args.files, args.kb, rnd)
+    blobs = [t.encode() for t in texts]
+    print(f"{args.files} files x {args.kb} KiB")
+    print(f"{'tokens':>7} {'naive s':>9} {'matcher s':>10}")
+    for n in (4, 16, 64, 128, 256, 500):
+        tokens = make_tokens(n, rnd)
+        t0 = time.perf_counter(); a = naive(texts, tokens); t1 = time.perf_counter()
+        b = matcher(blobs, tokens); t2 = time.perf_counter()
+        assert a == b
+        print(f"{n:>7} {t1 - t0:>9.3f} {t2 - t1:>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Deterministic synthetic inputs for the benchmark suite: large iOS and
+Android project trees and large rules documents. Same arguments and seed,
+byte-identical output.
+
+    python benchmarks/generate.py ios OUT_DIR [--swift 5000] [--pods 200]
+    python benchmarks/generate.py android OUT_DIR [--modules 400]
+    python benchmarks/generate.py rules OUT.json [--rules 5000]
+"""
+import argparse, json, pathlib, plistlib, random
+from apcop.ios_scan import COMMON_IOS_SDK_HINTS, SYMBOL_TOKENS
+
+USAGE_KEYS = ["NSCameraUsageDescription", "NSMicrophoneUsageDescription", "NSLocationWhenInUseUsageDescription",
+              "NSPhotoLibraryUsageDescription", "NSContactsUsageDescription", "NSUserTrackingUsageDescription"]
+PERMISSIONS = ["android.permission." + p for p in (
+    "INTERNET", "CAMERA", "RECORD_AUDIO", "ACCESS_FINE_LOCATION", "ACCESS_COARSE_LOCATION", "ACCESS_BACKGROUND_LOCATION",
+    "READ_CONTACTS", "READ_SMS", "POST_NOTIFICATIONS", "READ_MEDIA_IMAGES", "QUERY_ALL_PACKAGES", "SYSTEM_ALERT_WINDOW")]
+DEPS = ["com.appsflyer:af-android-sdk", "com.adjust.sdk:adjust-android", "com.google.android.gms:play-services-ads",
+        "com.google.firebase:firebase-analytics", "com.facebook.android:facebook-login", "com.squareup.okhttp3:okhttp"]
+REASONS = ["CA92.1", "35F9.1", "C617.1", "E174.1", "1C8F.1", "DDA9.1"]
+_WORDS = ["view", "model", "store", "cache", "client", "session", "item", "list", "detail", "feed", "profile", "auth"]
+
+def _swift_source(rnd, i, lines):
+    out = [f"import UIKit\n\nfinal class Type{i}: NSObject {{\n"]
+    for n in range(lines):
+        w = rnd.choice(_WORDS)
+        if rnd.random() < 0.01:
+            out.append(f"    let {w}{n} = {rnd.choice(SYMBOL_TOKENS)}.self\n")
+        else:
+            out.append(f"    func {w}{n}(_ value: Int) -> Int {{ return value &* {n} &+ {len(w)} }}\n")
+    out.append("}\n")
+    return "".join(out)
+
+def make_ios_project(root, swift=5000, pods=200, plists=20, pins=2000, lines=60, seed=1):
+    """An app with `swift` sources in nested groups, a Pods/ tree, several targets' Info.plists and a big Package.resolved."""
+    rnd = random.Random(seed)
+    root = pathlib.Path(root)
+    for i in range(swift):
+        d = root / "App" / f"Feature{i % 40:02d}" / f"Group{i % 7}"
+        d.mkdir(parents=True, exist_ok=True)
+        (d / f"Type{i}.swift").write_text(_swift_source(rnd, i, lines))
+    for p in range(pods):
+        d = root / "Pods" / f"Pod{p:03d}" / "Sources" / "Core"
+        d.mkdir(parents=True, exist_ok=True)
+        (d / f"Pod{p}.m").write_text(_swift_source(rnd, p, lines // 2).replace("import UIKit", "#import <Foundation/Foundation.h>"))
+        if p % 10 == 0:
+            (d.parent / "PrivacyInfo.xcprivacy").write_bytes(plistlib.dumps({"NSPrivacyAccessedAPITypes": [
+                {"NSPrivacyAccessedAPIType": "NSPrivacyAccessedAPICategoryUserDefaults", "NSPrivacyAccessedAPITypeReasons": [rnd.choice(REASONS)]}]}))
+    for t in range(plists):
+        d = root / ("App" if t == 0 else f"Extension{t:02d}")
+        d.mkdir(parents=True, exist_ok=True)
+        keys = {k: "Needed for a feature" for k in rnd.sample(USAGE_KEYS, rnd.randint(1, 3))}
+        (d / "Info.plist").write_bytes(plistlib.dumps({"CFBundleName": f"Target{t}", **keys}))
+    (root / "App" / "App.entitlements").write_bytes(plistlib.dumps({"com.apple.developer.applesignin": ["Default"]}))
+    (root / "App" / "PrivacyInfo.xcprivacy").write_bytes(plistlib.dumps({"NSPrivacyTracking": False}))
+    names = [f"package-{i}" for i in range(pins)] + [h.lower() for h in COMMON_IOS_SDK_HINTS]
+    (root / "Package.resolved").write_text(json.dumps({"pins": [
+        {"identity": n, "location": f"https://github.com/example/{n}.git", "state": {"revision": f"{rnd.getrandbits(160):040x}", "version": "1.0.0"}}
+        for n in names], "version": 2}, indent=2))
+    (root / "Podfile.lock").write_text("PODS:\n" + "".join(f"  - Pod{p:03d} (1.{p}.0)\n" for p in range(pods)) + "  - AppsFlyerFramework (6.12.0)\n")
+
+def make_android_project(root, modules=400, deps=20, seed=1):
+    """`modules` Gradle modules (Groovy and Kotlin DSL alternating), each with a manifest and dependencies."""
+    rnd = random.Random(seed)
+    root = pathlib.Path(root)
+    for m in range(modules):
+        d = root / ("app" if m == 0 else f"feature{m:03d}")
+        (d / "src" / "main").mkdir(parents=True, exist_ok=True)
+        perms = "".join(f'    <uses-permission android:name="{p}"/>\n' for p in rnd.sample(PERMISSIONS, rnd.randint(0, 3)))
+        (d / "src" / "main" / "AndroidManifest.xml").write_text(
+            '<manifest xmlns:android="http://schemas.android.com/apk/res/android">\n' + perms + "    <application/>\n</manifest>\n")
+        coords = [f"com.example{i % 31}:lib{(m * 7 + i) % 500}:1.{i}.0" for i in range(deps)]
+        coords += [f"{c}:1.0.0" for c in rnd.sample(DEPS, rnd.randint(0, 2))]
+        plugin = "com.android.application" if m == 0 else "com.android.library"
+        if m % 2:
+            body = "".join(f'    implementation("{c}")\n' for c in coords)
+            (d / "build.gradle.kts").write_text(
+                f'plugins {{\n    id("{plugin}")\n}}\nandroid {{\n    defaultConfig {{\n        minSdk = 24\n        targetSdk = {rnd.choice([33, 34])}\n    }}\n}}\n'
+                f'dependencies {{\n{body}    testImplementation("junit:junit:4.13.2")\n}}\n')
+        else:
+            body = "".join(f"    implementation '{c}'\n" for c in coords)
+            (d / "build.gradle").write_text(
+                f"plugins {{\n    id '{plugin}'\n}}\nandroid {{\n    defaultConfig {{\n        minSdkVersion 24\n        targetSdkVersion {rnd.choice([33, 34])}\n    }}\n}}\n"
+                f"dependencies {{\n{body}    testImplementation 'junit:junit:4.13.2'\n}}\n")
+
+def _condition(rnd, i):
+    # About half the rules test for something the generated projects never contain, so they don't fire.
+    kind, absent = rnd.randrange(7), rnd.random() < 0.5
+    if kind == 0:
+        return {"ios.plist.has": f"NSSynthetic{i}UsageDescription" if absent else rnd.choice(USAGE_KEYS)}
+    if kind == 1:
+        return {"ios.api.uses": f"SyntheticAPI{i}" if absent else rnd.choice(SYMBOL_TOKENS)}
+    if kind == 2:
+        return {"ios.sdk.present": f"SyntheticSDK{i}" if absent else rnd.choice(COMMON_IOS_SDK_HINTS)}
+    if kind == 3:
+        return {"android.permission.present": f"com.example.permission.P{i}" if absent else rnd.choice(PERMISSIONS)}
+    if kind == 4:
+        return {"android.dep.present": f"com.example.synthetic:sdk{i}" if absent else rnd.choice(DEPS)}
+    if kind == 5:
+        return {"any": [{"ios.api.uses": t} for t in rnd.sample(SYMBOL_TOKENS, 3)]}
+    return {"all": [{"android.permission.present": rnd.choice(PERMISSIONS)}, {"android.targetsdk.lt_policy_min": 35}]}
+
+def make_rules(n=5000, seed=1):
+    """A rules document of `n` rules over the generated projects' vocabulary."""
+    rnd = random.Random(seed)
+    rules = []
+    for i in range(n):
+        when = _condition(rnd, i)
+        platform = "android" if "android" in json.dumps(when) else "ios"
+        require = [f"ios.plist.has: {rnd.choice(USAGE_KEYS)}"] if platform == "ios" and rnd.random() < 0.5 else []
+        rules.append({"id": f"SYN-{i:05d}", "platform": platform, "severity": rnd.choice(["blocking", "advisory", "fyi"]),
+                      "when": when, "then": {"require": require},
+                      "because": {"policy": f"Synthetic policy {i}", "url": f"https://example.com/policy/{i}"}})
+    return {"version": f"synthetic-{n}", "rules": rules}
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="what", required=True)
+    ios = sub.add_parser("ios")
+    ios.add_argument("out")
+    ios.add_argument("--swift", type=int, default=5000)
+    ios.add_argument("--pods", type=int, default=200)
+    ios.add_argument("--plists", type=int, default=20)
+    ios.add_argument("--pins", type=int, default=2000)
+    android = sub.add_parser("android")
+    android.add_argument("out")
+    android.add_argument("--modules", type=int, default=400)
+    rules = sub.add_parser("rules")
+    rules.add_argument("out")
+    rules.add_argument("--rules", type=int, default=5000)
+    for p in (ios, android, rules):
+        p.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    if args.what == "ios":
+        make_ios_project(args.out, args.swift, args.pods, args.plists, args.pins, seed=args.seed)
+    elif args.what == "android":
+        make_android_project(args.out, args.modules, seed=args.seed)
+    else:
+        pathlib.Path(args.out).write_text(json.dumps(make_rules(args.rules, args.seed)))
+    print(f"Wrote {args.what} to {args.out}")
+
+if __name__ == "__main__":
+    main()
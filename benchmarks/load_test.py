@@ -0,0 +1,63 @@
+"""
+Load test for `apppolicy serve`: N keep-alive connections issuing POST
+/evaluate (or /render) back to back; reports requests/sec and latency
+percentiles. Start the server first, e.g.
+
+    apppolicy serve --rules rules/community.yaml &
+    python benchmarks/load_test.py --facts android.facts.json [--connections 16] [--requests 2000]
+"""
+import argparse, asyncio, json, pathlib, time
+
+async def client(host, port, path, body, count, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    req = (f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+           f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+    for _ in range(count):
+        t0 = time.perf_counter()
+        writer.write(req)
+        await writer.drain()
+        status = await reader.readline()
+        length = 0
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            k, _, v = line.decode().partition(":")
+            if k.lower() == "content-length":
+                length = int(v)
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - t0)
+        if b" 200 " not in status:
+            raise SystemExit(f"server answered {status.decode().strip()}")
+    writer.close()
+
+async def run(args):
+    facts = [json.loads(pathlib.Path(f).read_text()) for f in args.facts]
+    payload = {"facts": facts}
+    if args.rules:
+        payload["rules"] = args.rules
+    if args.endpoint == "/render":
+        from apcop.rules import evaluate_rules, load_rules
+        payload = {"report": evaluate_rules(facts, load_rules(args.rules or "rules/community.yaml"))}
+    body = json.dumps(payload).encode()
+    latencies = []
+    per_conn = args.requests // args.connections
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(args.host, args.port, args.endpoint, body, per_conn, latencies)
+                           for _ in range(args.connections)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    print(f"{len(latencies)} requests over {args.connections} connections in {elapsed:.2f} s")
+    print(f"{len(latencies) / elapsed:10.1f} req/s   p50 {pct(0.50):.2f} ms   p99 {pct(0.99):.2f} ms   max {latencies[-1] * 1000:.2f} ms")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--endpoint", default="/evaluate", choices=["/evaluate", "/render"])
+    ap.add_argument("--facts", nargs="+", required=True)
+    ap.add_argument("--rules", help="Rules path sent with each request (default: the server's --rules)")
+    ap.add_argument("--connections", type=int, default=16)
+    ap.add_argument("--requests", type=int, default=2000)
+    asyncio.run(run(ap.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark suite: scan_ios, scan_android, evaluate_rules and render_html on
+deterministic synthetic inputs (benchmarks/generate.py), with stored
+baselines and a comparison that fails on regressions.
+
+    python benchmarks/suite.py run [--scale small|full] [--only scan] [--out results.json]
+    python benchmarks/suite.py run --save-baseline          # -> benchmarks/baselines/<scale>.json
+    python benchmarks/suite.py compare [RESULTS] [--baseline PATH] [--threshold 1.25]
+
+`compare` without RESULTS runs the suite first, at the baseline's scale.
+It exits 1 when any case's best time exceeds threshold x the baseline.
+Baselines are only comparable on the same machine; `meta` records which.
+"""
+import argparse, json, os, pathlib, platform, random, shutil, statistics, sys, tempfile, time
+from generate import make_android_project, make_ios_project, make_rules
+from apcop.android_scan import scan_android
+from apcop.ios_scan import scan_ios
+from apcop.report import render_html
+from apcop.rules import compile_rules, evaluate_rules
+
+BASELINES = pathlib.Path(__file__).resolve().parent / "baselines"
+
+SCALES = {
+    "small": {"swift": 500, "pods": 40, "plists": 5, "pins": 300, "modules": 60, "rules": 500, "apps": 40},
+    "full": {"swift": 5000, "pods": 200, "plists": 20, "pins": 2000, "modules": 400, "rules": 5000, "apps": 100},
+}
+
+def _fleet(facts, n):
+    """n apps' facts: each keeps a random half of the scanned symbols, plist keys, SDKs and permissions."""
+    rnd = random.Random(7)
+    half = lambda xs: sorted(rnd.sample(xs, len(xs) // 2))
+    ios, android = facts
+    return [[{**ios, "plist_keys": half(ios["plist_keys"]),
+              "signals": {**ios["signals"], "symbols": half(ios["signals"]["symbols"]), "sdk_names": half(ios["signals"]["sdk_names"])}},
+             {**android, "permissions": half(android["permissions"]), "targetsdk": rnd.choice([30, 33, 34])}] for _ in range(n)]
+
+def _cases(work: pathlib.Path, size):
+    """[(name, fn)]; fn() runs one measured iteration. Inputs are generated once, up front."""
+    ios, android = work / "ios", work / "android"
+    make_ios_project(ios, size["swift"], size["pods"], size["plists"], size["pins"])
+    make_android_project(android, size["modules"])
+    rules = make_rules(size["rules"])
+    facts = [scan_ios(str(ios)), scan_android(str(android))]
+    plan = compile_rules(rules)
+    report = evaluate_rules(facts, plan)
+    cache = work / "cache"
+    scan_ios(str(ios), cache_dir=str(cache / "ios"))
+    scan_android(str(android), cache_dir=str(cache / "android"))
+    fleet = _fleet(facts, size["apps"])
+    cases = [
+        ("scan_ios", lambda: scan_ios(str(ios))),
+        ("scan_ios_cached", lambda: scan_ios(str(ios), cache_dir=str(cache / "ios"))),
+        ("scan_android", lambda: scan_android(str(android))),
+        ("scan_android_cached", lambda: scan_android(str(android), cache_dir=str(cache / "android"))),
+        ("evaluate_rules", lambda: evaluate_rules(facts, rules)),
+        ("evaluate_rules_compiled", lambda: evaluate_rules(facts, plan)),
+        ("render_html", lambda: render_html(report)),
+        ("evaluate_fleet", lambda: [evaluate_rules(f, plan) for f in fleet]),
+    ]
+    try:
+        from apcop.matrix import MatrixPlan, evaluate_matrix
+    except ImportError:  # NumPy not installed
+        return cases
+    matrix_plan = MatrixPlan(rules)
+    return cases + [("evaluate_fleet_numpy", lambda: evaluate_matrix(fleet, matrix_plan))]
+
+def run(scale, repeat, only=None):
+    results = {}
+    work = pathlib.Path(tempfile.mkdtemp(prefix="apcop-bench-"))
+    try:
+        t0 = time.perf_counter()
+        cases = _cases(work, SCALES[scale])
+        print(f"generated {scale} inputs in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+        for name, fn in cases:
+            if only and only not in name:
+                continue
+            fn()  # warm-up: imports, lru caches, page cache
+            times = []
+            for _ in range(repeat):
+                t = time.perf_counter()
+                fn()
+                times.append(time.perf_counter() - t)
+            results[name] = {"best": min(times), "median": statistics.median(times), "repeat": repeat}
+            print(f"{name:26} best {min(times) * 1000:10.1f} ms   median {statistics.median(times) * 1000:10.1f} ms", file=sys.stderr)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    meta = {"scale": scale, "python": platform.python_version(), "machine": platform.machine(),
+            "cpus": os.cpu_count(), "date": time.strftime("%Y-%m-%d")}
+    return {"meta": meta, "results": results}
+
+def compare(baseline, current, threshold):
+    """Print a ratio table; the names of cases slower than threshold x baseline."""
+    slower = []
+    host = lambda m: (m.get("machine"), m.get("cpus"), m.get("python"))
+    if host(baseline["meta"]) != host(current["meta"]):
+        print(f"note: baseline from {host(baseline['meta'])}, this run on {host(current['meta'])}; ratios are indicative only")
+    print(f"{'case':26} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:26} {'-':>12} {cur['best'] * 1000:12.1f}    new")
+            continue
+        ratio = cur["best"] / base["best"] if base["best"] else float("inf")
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{name:26} {base['best'] * 1000:12.1f} {cur['best'] * 1000:12.1f} {ratio:7.2f}{flag}")
+        if flag:
+            slower.append(name)
+    return slower
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run")
+    r.add_argument("--scale", choices=SCALES, default="small")
+    r.add_argument("--repeat", type=int, default=5)
+    r.add_argument("--only", help="Run only cases whose name contains this")
+    r.add_argument("--out", help="Write results JSON here")
+    r.add_argument("--save-baseline", action="store_true", help="Store the results as benchmarks/baselines/<scale>.json")
+    c = sub.add_parser("compare")
+    c.add_argument("results", nargs="?", help="Results JSON from `run --out` (default: run the suite now)")
+    c.add_argument("--baseline", help="Baseline JSON (default: benchmarks/baselines/<scale>.json)")
+    c.add_argument("--scale", choices=SCALES, default="small")
+    c.add_argument("--repeat", type=int, default=5)
+    c.add_argument("--threshold", type=float, default=1.25, help="Allowed slowdown factor (default: 1.25)")
+    args = ap.parse_args()
+
+    if args.cmd == "run":
+        out = run(args.scale, args.repeat, args.only)
+        paths = [args.out] if args.out else []
+        if args.save_baseline:
+            BASELINES.mkdir(exist_ok=True)
+            paths.append(BASELINES / f"{args.scale}.json")
+        for p in paths:
+            pathlib.Path(p).write_text(json.dumps(out, indent=2) + "\n")
+            print(f"wrote {p}", file=sys.stderr)
+        if not paths:
+            print(json.dumps(out, indent=2))
+        return
+    current = json.loads(pathlib.Path(args.results).read_text()) if args.results else None
+    scale = current["meta"]["scale"] if current else args.scale
+    baseline = json.loads(pathlib.Path(args.baseline or BASELINES / f"{scale}.json").read_text())
+    if current is None:
+        current = run(baseline["meta"]["scale"], args.repeat)
+    slower = compare(baseline, current, args.threshold)
+    if slower:
+        print(f"{len(slower)} regression(s) over {args.threshold:.2f}x: {', '.join(slower)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
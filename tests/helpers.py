@@ -0,0 +1,126 @@
+"""
+Helpers shared by several test modules: sample project trees, random
+rules/facts generators for the differential tests, and a local pack host.
+"""
+import http.server, io, json, plistlib, tarfile, threading
+
+def mk_ios_project(root):
+    app = root / "App"
+    app.mkdir()
+    (app / "Info.plist").write_bytes(plistlib.dumps({"NSCameraUsageDescription": "x", "CFBundleName": "App"}))
+    (app / "App.entitlements").write_bytes(plistlib.dumps({"com.apple.developer.applesignin": ["Default"]}))
+    (app / "PrivacyInfo.xcprivacy").write_bytes(plistlib.dumps({"NSPrivacyTracking": False}))
+    (app / "Paste.swift").write_text("let p = UIPasteboard.general\n")
+    (root / "Podfile.lock").write_text("PODS:\n  - AppsFlyerFramework (6.0)\n")
+    (root / "Package.resolved").write_text(json.dumps({"pins": [{"identity": "firebase-ios-sdk"}]}))
+    derived = root / "DerivedData" / "Build"
+    derived.mkdir(parents=True)
+    (derived / "Gen.swift").write_text("AVCaptureDevice.default(for: .video)\n")
+    (derived / "Info.plist").write_bytes(plistlib.dumps({"NSMicrophoneUsageDescription": "x"}))
+
+def mk_project(root):
+    mk_ios_project(root)
+    (root / "android/app").mkdir(parents=True)
+    (root / "android/app/AndroidManifest.xml").write_text(
+        '<manifest xmlns:android="http://schemas.android.com/apk/res/android">'
+        '<uses-permission android:name="android.permission.CAMERA"/></manifest>')
+    (root / "android/app/build.gradle").write_text(
+        "plugins { id 'com.android.application' }\nandroid { defaultConfig { targetSdkVersion 31 } }\n"
+        "dependencies { implementation 'com.appsflyer:af-android-sdk:6.12.1' }\n")
+
+def batch_apps(n):
+    apps = []
+    for i in range(n):
+        facts = [{"platform": "android", "permissions": ["android.permission.ACCESS_BACKGROUND_LOCATION"] if i % 2 else [], "targetsdk": 30 + i % 6},
+                 {"platform": "ios", "plist_keys": [], "signals": {"symbols": ["AVCaptureDevice"] if i % 3 == 0 else []}}]
+        apps.append((f"app{i:02d}", facts))
+    return apps
+
+LEAVES = [
+    ("ios.api.uses", ["UIPasteboard", "AVCaptureDevice", "UserDefaults"]),
+    ("ios.sdk.present", ["AppsFlyer", "any_ads_or_clipboard_sdk", "firebase-ios-sdk"]),
+    ("ios.signin.present", [True]),
+    ("ios.plist.has", ["NSCameraUsageDescription", "NSMicrophoneUsageDescription"]),
+    ("ios.privacy.reason", ["pasteboard", "CA92.1", "", "{"]),
+    ("android.permission.present", ["android.permission.CAMERA", "android.permission.INTERNET"]),
+    ("android.targetsdk.lt_policy_min", [33, 34, "x"]),
+    ("exists.true", ["ios.auth_present", "android.permissions", "ios.plist_keys"]),
+    ("no.such.key", ["v"]),
+]
+
+def rand_cond(rnd, depth=0, leaves=LEAVES):
+    roll = rnd.random()
+    if depth < 2 and roll < 0.3:
+        op = rnd.choice(["any", "all"])
+        return {op: [rand_cond(rnd, depth + 1, leaves) for _ in range(rnd.randint(0, 3))]}
+    if roll < 0.33:
+        return {}
+    key, values = rnd.choice(leaves)
+    return {key: rnd.choice(values)}
+
+def rand_facts(rnd):
+    facts = []
+    if rnd.random() < 0.8:
+        facts.append({"platform": "ios",
+                      "plist_keys": rnd.sample(["NSCameraUsageDescription", "NSMicrophoneUsageDescription"], rnd.randint(0, 2)),
+                      "privacy_manifest": rnd.choice([{}, {"NSPrivacyAccessedAPITypes": [{"NSPrivacyAccessedAPITypeReasons": ["CA92.1"]}]}]),
+                      "signals": {"symbols": rnd.sample(["UIPasteboard", "AVCaptureDevice", "UserDefaults"], rnd.randint(0, 3)),
+                                  "sdk_names": rnd.sample(["AppsFlyer", "firebase-ios-sdk"], rnd.randint(0, 2)),
+                                  "auth_present": rnd.random() < 0.5}})
+    if rnd.random() < 0.8:
+        facts.append({"platform": "android",
+                      "permissions": rnd.sample(["android.permission.CAMERA", "android.permission.INTERNET"], rnd.randint(0, 2)),
+                      "targetsdk": rnd.choice([None, 0, 31, 34])})
+    return facts
+
+def rand_rules(rnd, n=40, leaves=LEAVES):
+    rules = []
+    for i in range(n):
+        require = [rand_cond(rnd, leaves=leaves) for _ in range(rnd.randint(0, 2))]
+        if rnd.random() < 0.3:
+            require.append(rnd.choice(["ios.plist.has: NSCameraUsageDescription", "ios.auth_present", "android.targetsdk.lt_policy_min: 40"]))
+        rules.append({"id": f"r{i}", "platform": rnd.choice(["ios", "android"]), "severity": rnd.choice(["blocking", "advisory", "fyi"]),
+                      "when": rand_cond(rnd, leaves=leaves), "then": {"require": require}, "because": {}})
+    return {"version": "rand", "rules": rules}
+
+def pack_bytes(rules, sk):
+    """A signed rules pack (.tar.gz bytes); `sk` is a nacl SigningKey."""
+    from nacl import encoding
+    payload = json.dumps({"version": "test", "rules": rules, "format": "apppolicy-rules-pack@1"},
+                         separators=(",", ":"), sort_keys=True).encode()
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        for name, data in (("rules.json", payload), ("SIGNATURE.hex", sk.sign(payload).signature.hex().encode()),
+                           ("PUBLIC_KEY.hex", sk.verify_key.encode(encoder=encoding.HexEncoder))):
+            ti = tarfile.TarInfo(name); ti.size = len(data); tar.addfile(ti, io.BytesIO(data))
+    return buf.getvalue()
+
+class PackServer:
+    """Local stand-in for the pack host: serves one body, honours If-None-Match when `etags` is on."""
+
+    def __init__(self, body, etags=True):
+        self.body, self.etag, self.etags, self.requests = body, '"v1"', etags, []
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                if server.etags and self.headers.get("If-None-Match") == server.etag:
+                    self.send_response(304); self.end_headers(); return
+                self.send_response(200)
+                if server.etags:
+                    self.send_header("ETag", server.etag)
+                self.send_header("Content-Length", str(len(server.body)))
+                self.end_headers()
+                self.wfile.write(server.body)
+
+            def log_message(self, *a):
+                pass
+
+        self.httpd = http.server.HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/pack.tar.gz"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
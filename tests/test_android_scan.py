@@ -0,0 +1,43 @@
+import json, pathlib, subprocess, sys
+from apcop.android_scan import scan_android
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+MANIFEST = """<manifest xmlns:android="http://schemas.android.com/apk/res/android">
+  {perms}
+</manifest>"""
+
+def _perm(name):
+    return f'<uses-permission android:name="{name}"/>'
+
+def _mk_android_project(root, modules=6):
+    for i in range(modules):
+        mod = root / f"mod{i}"
+        (mod / "src/main").mkdir(parents=True)
+        perms = [_perm("android.permission.INTERNET"), _perm(f"com.example.PERM_{i}")]
+        (mod / "src/main/AndroidManifest.xml").write_text(MANIFEST.format(perms="\n  ".join(perms)))
+        (mod / "build.gradle.kts").write_text(f"android {{ defaultConfig {{ targetSdk = {30 + i} }} }}\n")
+    (root / "app").mkdir()
+    (root / "app/build.gradle").write_text("android {\n  defaultConfig { targetSdkVersion 33 }\n}\n")
+    (root / "build/intermediates").mkdir(parents=True)
+    (root / "build/intermediates/AndroidManifest.xml").write_text(MANIFEST.format(perms=_perm("android.permission.CAMERA")))
+
+def test_scan_android_facts(tmp_path):
+    _mk_android_project(tmp_path, modules=2)
+    facts = scan_android(str(tmp_path))
+    assert facts["permissions"] == ["android.permission.INTERNET", "com.example.PERM_0", "com.example.PERM_1"]
+    assert facts["targetsdk"] == 33
+
+def test_scan_android_parallel_matches_sequential(tmp_path):
+    _mk_android_project(tmp_path)
+    seq = scan_android(str(tmp_path))
+    par = scan_android(str(tmp_path), jobs=4)
+    assert json.dumps(par, indent=2) == json.dumps(seq, indent=2)
+
+def test_cli_no_default_prune_reads_build_dirs(tmp_path):
+    _mk_android_project(tmp_path / "proj", modules=1)
+    for flags, camera in (([], False), (["--no-default-prune"], True)):
+        out = tmp_path / "facts.json"
+        subprocess.run([sys.executable, "-m", "apcop.cli", "scan-android", "--project", str(tmp_path / "proj"), "--out", str(out),
+                        "--no-cache", *flags], cwd=ROOT, check=True, capture_output=True)
+        assert ("android.permission.CAMERA" in json.loads(out.read_text())["permissions"]) == camera
@@ -0,0 +1,156 @@
+import pathlib, plistlib, struct, subprocess, sys, zipfile
+import pytest
+from apcop.artifact import axml_elements, dex_packages, proto_xml_elements, scan_artifact
+from apcop.rules import evaluate_rules
+
+# --- minimal encoders for the binary formats the scanner reads ---
+
+def axml(elements):
+    """AXML with a UTF-16 string pool; attribute names resolved through the resource map only."""
+    strings = ["name", "targetSdkVersion", "manifest", "uses-permission", "uses-sdk", "application"]
+    ref = lambda s: strings.index(s) if s in strings else strings.append(s) or len(strings) - 1
+    body = b""
+    for tag, attrs in elements:
+        t = ref(tag)
+        raw = b""
+        for k, v in attrs.items():
+            if isinstance(v, int):
+                raw += struct.pack("<IIIHBBI", 0, ref(k), 0xFFFFFFFF, 8, 0, 0x10, v)
+            else:
+                raw += struct.pack("<IIIHBBI", 0, ref(k), ref(v), 8, 0, 0x03, ref(v))
+        node = struct.pack("<IIHHH", 0xFFFFFFFF, t, 20, 20, len(attrs)) + b"\0" * 6 + raw
+        body += struct.pack("<HHIII", 0x0102, 16, 16 + len(node), 1, 0xFFFFFFFF) + node
+    # Blank the attribute-name strings so the decoder has to use the resource IDs.
+    data = [b"\0\0\0\0" if i < 2 else struct.pack("<H", len(s)) + s.encode("utf-16-le") + b"\0\0" for i, s in enumerate(strings)]
+    offs, pos = [], 0
+    for d in data:
+        offs.append(pos)
+        pos += len(d)
+    blob = b"".join(data)
+    blob += b"\0" * (-len(blob) % 4)
+    pool = struct.pack("<5I", len(strings), 0, 0, 28 + 4 * len(strings), 0) + struct.pack(f"<{len(offs)}I", *offs) + blob
+    pool = struct.pack("<HHI", 0x0001, 28, 8 + len(pool)) + pool
+    resmap = struct.pack("<HHI2I", 0x0180, 8, 16, 0x01010003, 0x01010270)
+    inner = pool + resmap + body
+    return struct.pack("<HHI", 0x0003, 8, 8 + len(inner)) + inner
+
+def dex(descriptors):
+    strings = sorted(descriptors)
+    header = bytearray(0x70)
+    header[:8] = b"dex\n035\0"
+    str_ids_off = 0x70
+    type_ids_off = str_ids_off + 4 * len(strings)
+    data_off = type_ids_off + 4 * len(strings)
+    data, offs = b"", []
+    for s in strings:
+        offs.append(data_off + len(data))
+        data += bytes([len(s)]) + s.encode() + b"\0"
+    struct.pack_into("<4I", header, 0x38, len(strings), str_ids_off, len(strings), type_ids_off)
+    return bytes(header) + struct.pack(f"<{len(strings)}I", *offs) + struct.pack(f"<{len(strings)}I", *range(len(strings))) + data
+
+def _varint(n):
+    out = b""
+    while n >= 0x80:
+        out += bytes([n & 0x7F | 0x80])
+        n >>= 7
+    return out + bytes([n])
+
+def _ld(field, payload):
+    return _varint(field << 3 | 2) + _varint(len(payload)) + payload
+
+def proto_node(tag, attrs=(), children=()):
+    elem = _ld(3, tag.encode())
+    for name, value in attrs:
+        if isinstance(value, int):
+            attr = _ld(2, name.encode()) + _ld(6, _ld(7, _varint(6 << 3) + _varint(value)))
+        else:
+            attr = _ld(2, name.encode()) + _ld(3, value.encode())
+        elem += _ld(4, attr)
+    for child in children:
+        elem += _ld(5, child)
+    return _ld(1, elem)
+
+def _zip(path, members):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return path
+
+MANIFEST = [("manifest", {}), ("uses-sdk", {"targetSdkVersion": 33}),
+            ("uses-permission", {"name": "android.permission.CAMERA"}),
+            ("uses-permission", {"name": "android.permission.ACCESS_FINE_LOCATION"}), ("application", {})]
+CLASSES = ["Lcom/appsflyer/AppsFlyerLib;", "Lcom/example/app/MainActivity;", "[I", "Ljava/lang/String;"]
+
+def test_axml_and_dex_decoders():
+    elements = list(axml_elements(axml(MANIFEST)))
+    assert elements[1] == ("uses-sdk", {"targetSdkVersion": 33})
+    assert elements[2] == ("uses-permission", {"name": "android.permission.CAMERA"})
+    assert dex_packages(dex(CLASSES)) == {"com.appsflyer", "com.example.app", "java.lang"}
+    node = proto_node("manifest", children=[proto_node("uses-sdk", [("targetSdkVersion", 34)])])
+    assert list(proto_xml_elements(node)) == [("manifest", {}), ("uses-sdk", {"targetSdkVersion": 34})]
+
+def test_apk_and_aab(tmp_path):
+    apk = _zip(tmp_path / "app.apk", {"AndroidManifest.xml": axml(MANIFEST), "classes.dex": dex(CLASSES),
+                                     "res/raw/x.bin": b"\0" * 1000})
+    facts = scan_artifact(apk)
+    assert facts["platform"] == "android"
+    assert facts["targetsdk"] == 33
+    assert facts["permissions"] == ["android.permission.ACCESS_FINE_LOCATION", "android.permission.CAMERA"]
+    assert facts["deps"] == ["com.appsflyer:af-android-sdk"]
+
+    manifest = proto_node("manifest", children=[
+        proto_node("uses-sdk", [("minSdkVersion", 24), ("targetSdkVersion", 30)]),
+        proto_node("uses-permission", [("name", "android.permission.READ_CONTACTS")])])
+    aab = _zip(tmp_path / "app.aab", {"base/manifest/AndroidManifest.xml": manifest,
+                                     "base/dex/classes.dex": dex(["Lcom/adjust/sdk/Adjust;"]),
+                                     "base/dex/classes2.dex": dex(CLASSES)})
+    facts = scan_artifact(aab)
+    assert facts["targetsdk"] == 30
+    assert facts["permissions"] == ["android.permission.READ_CONTACTS"]
+    assert facts["deps"] == ["com.adjust.sdk:adjust-android", "com.appsflyer:af-android-sdk"]
+
+def test_ipa(tmp_path):
+    app = "Payload/Demo.app/"
+    profile = b"\x30\x82garbage" + plistlib.dumps({"Entitlements": {"aps-environment": "production"}}) + b"\x00sig"
+    binary = b"\xcf\xfa\xed\xfe" + b"\0" * (3 << 20) + b"_OBJC_CLASS_$_UIPasteboard\0NSUserDefaults\0"
+    ipa = _zip(tmp_path / "Demo.ipa", {
+        app + "Info.plist": plistlib.dumps({"CFBundleExecutable": "Demo", "NSCameraUsageDescription": "scan",
+                                            "CFBundleName": "Demo"}, fmt=plistlib.FMT_BINARY),
+        app + "Demo": binary,
+        app + "embedded.mobileprovision": profile,
+        app + "PrivacyInfo.xcprivacy": plistlib.dumps({"NSPrivacyTracking": False}),
+        app + "Frameworks/FirebaseAuth.framework/FirebaseAuth": b"\0",
+        app + "Frameworks/AFLib.framework/Info.plist": plistlib.dumps({"CFBundleIdentifier": "com.appsflyer.AppsFlyerLib"}),
+        app + "Frameworks/FirebaseAuth.framework/PrivacyInfo.xcprivacy": plistlib.dumps({"NSPrivacyTracking": True}),
+    })
+    facts = scan_artifact(ipa)
+    assert facts["platform"] == "ios"
+    assert facts["plist_keys"] == ["NSCameraUsageDescription"]
+    assert facts["entitlements"] == {"aps-environment": "production"}
+    # The app's own manifest wins over its frameworks'.
+    assert facts["privacy_manifest"] == {"NSPrivacyTracking": False}
+    assert {"FirebaseAuth", "AFLib", "AppsFlyer"} <= set(facts["signals"]["sdk_names"]) and facts["signals"]["auth_present"]
+    assert {"UIPasteboard", "NSUserDefaults"} <= set(facts["signals"]["symbols"])
+    assert facts["signals"]["symbol_hits"]["UIPasteboard"] == [{"file": app + "Demo", "line": None}]
+    report = evaluate_rules([facts], {"version": "t", "rules": []})
+    assert report["findings"] == []
+
+def test_malformed_members_name_the_member(tmp_path):
+    good = {"AndroidManifest.xml": axml(MANIFEST), "classes.dex": dex(CLASSES)}
+    for name, data, what in [("classes.dex", dex(CLASSES)[:0x90], "DEX file"),
+                             ("AndroidManifest.xml", axml(MANIFEST)[:120], "binary XML manifest")]:
+        apk = _zip(tmp_path / "bad.apk", {**good, name: data})
+        with pytest.raises(ValueError, match=f"^{name}: malformed {what}"):
+            scan_artifact(apk)
+    aab = _zip(tmp_path / "bad.aab", {"base/manifest/AndroidManifest.xml": proto_node("manifest") + b"\x0a\xff"})
+    with pytest.raises(ValueError, match="^base/manifest/AndroidManifest.xml: malformed protobuf XML manifest"):
+        scan_artifact(aab)
+
+def test_cli_reports_bad_artifacts_in_one_line(tmp_path):
+    (tmp_path / "junk.apk").write_bytes(b"not a zip")
+    _zip(tmp_path / "bad.apk", {"AndroidManifest.xml": axml(MANIFEST), "classes.dex": dex(CLASSES)[:0x90]})
+    root = pathlib.Path(__file__).resolve().parents[1]
+    for name, message in (("junk.apk", "junk.apk: not a zip archive"), ("bad.apk", "bad.apk: classes.dex: malformed DEX file")):
+        proc = subprocess.run([sys.executable, "-m", "apcop.cli", "scan-artifact", "--artifact", str(tmp_path / name),
+                               "--out", str(tmp_path / "f.json")], cwd=root, capture_output=True, text=True)
+        assert proc.returncode == 2 and message in proc.stderr and "Traceback" not in proc.stderr
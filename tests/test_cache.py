@@ -0,0 +1,101 @@
+import json, os, plistlib
+from apcop import android_scan, ios_scan
+from apcop import cache as cache_mod
+
+def _count_extracts(monkeypatch, module):
+    calls = []
+    real = module.extract_file
+    def spy(kind, path, *a):
+        calls.append(os.path.basename(path))
+        return real(kind, path, *a)
+    monkeypatch.setattr(module, "extract_file", spy)
+    return calls
+
+def _mk(root):
+    (root / "App").mkdir()
+    (root / "App/Info.plist").write_bytes(plistlib.dumps({"NSCameraUsageDescription": "x"}))
+    (root / "App/A.swift").write_text("UIPasteboard.general\n")
+    (root / "App/B.swift").write_text("let x = 1\n")
+    (root / "Podfile.lock").write_text("PODS:\n  - Adjust (4.0)\n")
+
+def test_rescan_only_reparses_changed_files(tmp_path, monkeypatch):
+    proj, cache = tmp_path / "proj", tmp_path / "cache"
+    proj.mkdir(); _mk(proj)
+    calls = _count_extracts(monkeypatch, ios_scan)
+    first = ios_scan.scan_ios(str(proj), cache_dir=str(cache))
+    assert sorted(calls) == ["A.swift", "B.swift", "Info.plist", "Podfile.lock"]
+
+    calls.clear()
+    assert ios_scan.scan_ios(str(proj), cache_dir=str(cache)) == first
+    assert calls == []
+
+    (proj / "App/B.swift").write_text("AVCaptureDevice.default()\nlet y = 2\n")
+    again = ios_scan.scan_ios(str(proj), cache_dir=str(cache))
+    assert calls == ["B.swift"]
+    assert again == ios_scan.scan_ios(str(proj))
+    assert again["signals"]["symbols"] == ["AVCaptureDevice", "UIPasteboard"]
+
+def test_token_change_invalidates(tmp_path, monkeypatch):
+    proj, cache = tmp_path / "proj", tmp_path / "cache"
+    proj.mkdir(); _mk(proj)
+    ios_scan.scan_ios(str(proj), cache_dir=str(cache))
+    calls = _count_extracts(monkeypatch, ios_scan)
+    facts = ios_scan.scan_ios(str(proj), cache_dir=str(cache), tokens=["UIPasteboard", "Adjust"])
+    assert len(calls) == 4
+    assert facts["signals"]["symbols"] == ["UIPasteboard"]
+
+def test_hash_mode_survives_mtime_change(tmp_path, monkeypatch):
+    proj, cache = tmp_path / "proj", tmp_path / "cache"
+    proj.mkdir(); _mk(proj)
+    ios_scan.scan_ios(str(proj), cache_dir=str(cache), cache_hash=True)
+    for p in proj.rglob("*"):
+        if p.is_file():
+            os.utime(p, (1, 1))
+    calls = _count_extracts(monkeypatch, ios_scan)
+    ios_scan.scan_ios(str(proj), cache_dir=str(cache), cache_hash=True)
+    assert calls == []
+    # New mtime, same size, different content: the digest notices.
+    (proj / "App/A.swift").write_text("UserDefaults\n" + " " * 8)
+    facts = ios_scan.scan_ios(str(proj), cache_dir=str(cache), cache_hash=True)
+    assert calls == ["A.swift"]
+    assert facts["signals"]["symbols"] == ["UserDefaults"]
+    # Unchanged mtime and size: a hit without reading the file.
+    hashed = []
+    monkeypatch.setattr(cache_mod, "_digest", lambda path: hashed.append(path))
+    ios_scan.scan_ios(str(proj), cache_dir=str(cache), cache_hash=True)
+    assert calls == ["A.swift"] and hashed == []
+
+def test_unusable_cache_falls_back_to_uncached_scan(tmp_path, capsys):
+    proj = tmp_path / "proj"
+    proj.mkdir(); _mk(proj)
+    (proj / ".apppolicy-cache").write_text("not a directory")
+    assert ios_scan.scan_ios(str(proj), cache_dir=str(proj / ".apppolicy-cache")) == ios_scan.scan_ios(str(proj))
+    assert "not using the cache" in capsys.readouterr().err
+    (proj / "bad").mkdir()
+    (proj / "bad/android.sqlite").write_bytes(b"garbage" * 100)
+    assert android_scan.scan_android(str(proj), cache_dir=str(proj / "bad"), prune={"bad"}) == android_scan.scan_android(str(proj))
+    assert "not using the cache" in capsys.readouterr().err
+
+def test_shared_cache_dir_keeps_each_project(tmp_path, monkeypatch):
+    shared = tmp_path / "shared"
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir(); _mk(tmp_path / name)
+        ios_scan.scan_ios(str(tmp_path / name), cache_dir=str(shared))
+    calls = _count_extracts(monkeypatch, ios_scan)
+    ios_scan.scan_ios(str(tmp_path / "a"), cache_dir=str(shared))
+    ios_scan.scan_ios(str(tmp_path / "b"), cache_dir=str(shared))
+    assert calls == []
+    assert len(list(shared.glob("ios-*.sqlite"))) == 2
+
+def test_android_cache(tmp_path, monkeypatch):
+    proj, cache = tmp_path / "proj", tmp_path / "cache"
+    (proj / "app").mkdir(parents=True)
+    (proj / "app/AndroidManifest.xml").write_text(
+        '<manifest xmlns:android="http://schemas.android.com/apk/res/android">'
+        '<uses-permission android:name="android.permission.CAMERA"/></manifest>')
+    (proj / "app/build.gradle").write_text("targetSdkVersion 33\n")
+    first = android_scan.scan_android(str(proj), cache_dir=str(cache))
+    calls = _count_extracts(monkeypatch, android_scan)
+    assert android_scan.scan_android(str(proj), cache_dir=str(cache)) == first
+    assert calls == []
+    assert json.loads(json.dumps(first)) == first
@@ -0,0 +1,67 @@
+import json, pathlib, random, subprocess, sys
+from apcop.android_scan import scan_android
+from apcop.check import check_project, plan_extraction
+from apcop.ios_scan import scan_ios
+from apcop.rules import CONDITION_READS, CONDITIONS, compile_rules, evaluate_rules, load_rules
+from apcop.timings import Timings
+from helpers import mk_project, rand_rules
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+def _ids(report):
+    return [(f["id"], f["status"], f["missing"]) for f in report["findings"]]
+
+def test_condition_reads_cover_every_condition():
+    assert CONDITION_READS.keys() == CONDITIONS.keys() - {"exists.true"}
+
+def test_check_matches_full_scan(tmp_path):
+    mk_project(tmp_path)
+    full = [scan_ios(str(tmp_path)), scan_android(str(tmp_path))]
+    rnd = random.Random(5)
+    for rules in [load_rules(ROOT / "rules/community.yaml")] + [rand_rules(rnd) for _ in range(30)]:
+        assert _ids(check_project(tmp_path, rules)) == _ids(evaluate_rules(full, rules))
+
+def test_only_needed_kinds_are_extracted(tmp_path):
+    mk_project(tmp_path)
+    rules = {"version": "t", "rules": [
+        {"id": "cam", "platform": "ios", "when": {"ios.plist.has": "NSCameraUsageDescription"},
+         "then": {"require": ["ios.privacy.reason: CA92.1"]}}]}
+    kinds, tokens = plan_extraction(compile_rules(rules))
+    assert kinds == {"ios": {"plist", "privacy"}, "android": set()} and tokens == []
+    t = Timings()
+    report = check_project(tmp_path, rules, timings=t)
+    assert [f["id"] for f in report["findings"]] == ["cam"]
+    assert t.counts["files_parsed"] == 2   # App/Info.plist, App/PrivacyInfo.xcprivacy; no sources, lockfiles or Gradle
+    assert "ios.symbols" not in report["facts"] and "android.deps" not in report["facts"]
+    assert {"ios.symbols", "ios.sdk_names", "android.permissions", "android.deps"} <= set(report["not_extracted"])
+    assert "ios.plist_keys" in report["facts"] and "ios.plist_keys" not in report["not_extracted"]
+
+    rules["rules"].append({"id": "paste", "platform": "ios", "when": {"ios.api.uses": "UIPasteboard"}})
+    assert plan_extraction(compile_rules(rules))[1] == ["UIPasteboard"]
+    assert [f["id"] for f in check_project(tmp_path, rules)["findings"]] == ["cam", "paste"]
+
+def test_fail_fast_stops_before_source_pass(tmp_path):
+    mk_project(tmp_path)
+    rules = {"version": "t", "rules": [
+        {"id": "paste", "platform": "ios", "when": {"ios.api.uses": "UIPasteboard"}},
+        {"id": "cam", "platform": "android", "severity": "blocking",
+         "when": {"android.permission.present": "android.permission.CAMERA"}}]}
+    t = Timings()
+    report = check_project(tmp_path, rules, fail_fast=True, timings=t)
+    assert report["partial"] and [f["id"] for f in report["findings"]] == ["cam"]
+    assert all(f["kind"] == "manifest" for f in t.as_dict()["slowest_files"])
+    # Nothing blocking: every stage runs and the report is complete.
+    rules["rules"][1]["when"] = {"android.permission.present": "android.permission.READ_SMS"}
+    report = check_project(tmp_path, rules, fail_fast=True)
+    assert "partial" not in report and [f["id"] for f in report["findings"]] == ["paste"]
+
+def test_cli_check_exit_status(tmp_path):
+    mk_project(tmp_path)
+    rules = tmp_path / "rules.yaml"
+    rules.write_text(json.dumps({"version": "t", "rules": [
+        {"id": "cam", "platform": "android", "severity": "blocking",
+         "when": {"android.permission.present": "android.permission.CAMERA"}}]}))
+    proc = subprocess.run([sys.executable, "-m", "apcop.cli", "check", "--project", str(tmp_path), "--rules", str(rules),
+                           "--out", str(tmp_path / "r.json"), "--no-cache"], cwd=ROOT, capture_output=True, text=True)
+    assert proc.returncode == 1 and "FAIL cam" in proc.stdout
+    assert json.loads((tmp_path / "r.json").read_text())["summary"]["blocking"] == 1
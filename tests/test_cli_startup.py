@@ -0,0 +1,36 @@
+import json, os, pathlib, subprocess, sys
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+HEAVY = {"yaml", "jinja2", "nacl", "multiprocessing", "apcop.rules", "apcop.report", "apcop.pro_pack"}
+
+def _imported(args, cwd):
+    """Run `python -X importtime -m apcop.cli ARGS` and return the modules it imported."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-m", "apcop.cli", *args],
+                          cwd=cwd, env=env, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    mods = set()
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            if name != "package":
+                mods.add(name)
+    return mods
+
+@pytest.mark.parametrize("cmd", ["scan-ios", "scan-android"])
+def test_scan_commands_skip_heavy_imports(tmp_path, cmd):
+    mods = _imported([cmd, "--project", str(tmp_path), "--out", str(tmp_path / "facts.json")], tmp_path)
+    assert not HEAVY & mods
+
+def test_evaluate_imports_yaml_only(tmp_path):
+    (tmp_path / "facts.json").write_text(json.dumps({"platform": "android", "permissions": [], "targetsdk": 31}))
+    mods = _imported(["evaluate", "--facts", "facts.json", "--rules", str(ROOT / "rules/community.yaml"), "--out", "r.json"], tmp_path)
+    assert "yaml" in mods
+    assert not {"jinja2", "nacl", "multiprocessing", "apcop.report"} & mods
+
+def test_html_imports_jinja_only(tmp_path):
+    (tmp_path / "r.json").write_text(json.dumps({"summary": {}, "findings": []}))
+    mods = _imported(["html", "--report", "r.json", "--out", "r.html"], tmp_path)
+    assert "jinja2" in mods
+    assert not {"yaml", "nacl", "multiprocessing", "apcop.rules"} & mods
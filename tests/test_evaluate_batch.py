@@ -0,0 +1,37 @@
+import json, sys
+import pytest
+from apcop import cli
+from apcop.rules import evaluate_batch, evaluate_rules, load_rules
+from helpers import batch_apps
+
+def test_evaluate_batch_matches_single_evaluations():
+    rules = load_rules("rules/community.yaml")
+    apps = batch_apps(9)
+    expected = [(name, evaluate_rules(facts, rules)) for name, facts in apps]
+    assert list(evaluate_batch(apps, rules)) == expected
+    assert list(evaluate_batch(apps, rules, jobs=3)) == expected
+
+def test_evaluate_batch_cli(tmp_path, monkeypatch):
+    apps_dir = tmp_path / "apps"
+    for name, facts in batch_apps(4):
+        (apps_dir / name).mkdir(parents=True)
+        for f in facts:
+            (apps_dir / name / f"{f['platform']}.json").write_text(json.dumps(f))
+    out = tmp_path / "out"
+    monkeypatch.setattr(sys, "argv", ["apppolicy", "evaluate-batch", "--apps-dir", str(apps_dir), "--rules", "rules/community.yaml",
+                                      "--out-dir", str(out), "--jsonl", str(tmp_path / "all.jsonl"), "--jobs", "2"])
+    cli.main()
+    lines = [json.loads(l) for l in (tmp_path / "all.jsonl").read_text().splitlines()]
+    assert [l["app"] for l in lines] == ["app00", "app01", "app02", "app03"]
+    report = json.loads((out / "app01.report.json").read_text())
+    assert lines[1]["summary"] == report["summary"]
+    assert {f["id"] for f in lines[1]["findings"]} == {"android.target_sdk.minimum", "android.permission.background_location.disclosure"}
+
+def test_manifest_apps(tmp_path):
+    (tmp_path / "a.json").write_text("{}")
+    (tmp_path / "apps.jsonl").write_text('{"app": "one", "facts": ["a.json"]}\n\n')
+    assert cli._manifest_apps(str(tmp_path / "apps.jsonl")) == [("one", [str(tmp_path / "a.json")])]
+    for bad in ("../escape", "sub/app", "a\\b", ".."):
+        (tmp_path / "apps.jsonl").write_text(json.dumps({"app": bad, "facts": ["a.json"]}) + "\n")
+        with pytest.raises(ValueError, match="plain file name"):
+            cli._manifest_apps(str(tmp_path / "apps.jsonl"))
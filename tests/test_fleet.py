@@ -0,0 +1,51 @@
+import json, subprocess, sys
+from apcop.fleet import build_index, iter_jsonl, iter_reports, write_dashboard
+
+def _finding(rid, severity, status):
+    return {"id": rid, "platform": "ios", "severity": severity, "status": status, "missing": [], "evidence": {}}
+
+def _write_reports(d, apps):
+    d.mkdir(parents=True, exist_ok=True)
+    for name, findings in apps.items():
+        (d / f"{name}.report.json").write_text(json.dumps({"version": "t", "findings": findings, "summary": {}}))
+
+APPS = {
+    "alpha": [_finding("target_sdk", "blocking", "fail"), _finding("camera", "advisory", "warn")],
+    "beta": [_finding("camera", "advisory", "fail")],
+    "gamma": [],
+}
+
+def test_summary_counts_and_trend(tmp_path):
+    _write_reports(tmp_path / "run1", APPS)
+    first = write_dashboard(build_index(iter_reports([tmp_path / "run1"])), tmp_path / "dash", page_size=2)
+    assert first["apps"] == 3 and first["blocked"] == ["alpha"]
+    assert first["totals"] == {"blocking": 1, "advisory": 2, "fyi": 0}
+    assert first["rules"]["camera"] == {"severity": "advisory", "apps": 2, "fail": 1, "warn": 1}
+    assert sorted(p.name for p in (tmp_path / "dash").iterdir()) == ["apps-0001.html", "apps-0002.html", "index.html", "summary.json"]
+    page2 = (tmp_path / "dash/apps-0002.html").read_text()
+    assert "gamma" in page2 and "alpha" not in page2 and 'href="apps-0001.html"' in page2
+
+    _write_reports(tmp_path / "run2", {**APPS, "alpha": [], "beta": [_finding("target_sdk", "blocking", "fail")]})
+    second = build_index(iter_reports([tmp_path / "run2"])).summary(first)
+    assert second["trend"]["newly_blocked"] == ["beta"] and second["trend"]["unblocked"] == ["alpha"]
+    assert second["trend"]["rules"] == {"camera": -2}
+
+def test_no_findings_row_spans_the_trend_column(tmp_path):
+    _write_reports(tmp_path / "run", {"gamma": []})
+    first = write_dashboard(build_index(iter_reports([tmp_path / "run"])), tmp_path / "dash")
+    assert '<td colspan="5">No findings.' in (tmp_path / "dash/index.html").read_text()
+    write_dashboard(build_index(iter_reports([tmp_path / "run"])), tmp_path / "dash", previous=first)
+    assert '<td colspan="6">No findings.' in (tmp_path / "dash/index.html").read_text()
+
+def test_cli_reads_batch_jsonl_and_uses_previous_summary(tmp_path):
+    stream = tmp_path / "all.jsonl"
+    stream.write_text("".join(json.dumps({"app": a, "findings": f}) + "\n" for a, f in APPS.items()))
+    assert [a for a, _f in iter_jsonl(stream)] == ["alpha", "beta", "gamma"]
+    cmd = [sys.executable, "-m", "apcop.cli", "aggregate", "--jsonl", str(stream), "--out-dir", str(tmp_path / "dash")]
+    subprocess.run(cmd, check=True, capture_output=True)
+    subprocess.run(cmd, check=True, capture_output=True)
+    summary = json.loads((tmp_path / "dash/summary.json").read_text())
+    assert summary["trend"] == {"previous_apps": 3, "blocked_delta": 0, "newly_blocked": [], "unblocked": [], "rules": {}}
+    assert "target_sdk" in (tmp_path / "dash/index.html").read_text()
+    bad = subprocess.run(cmd + ["--page-size", "0"], capture_output=True, text=True)
+    assert bad.returncode == 2 and "--page-size: must be at least 1" in bad.stderr
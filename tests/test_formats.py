@@ -0,0 +1,51 @@
+import json, subprocess, sys
+import pytest
+from apcop.formats import dumps, loads
+from apcop.rules import evaluate_rules, load_facts, load_rules
+
+IOS = {"platform": "ios", "plist_keys": ["NSCameraUsageDescription"], "entitlements": {"aps-environment": "production"},
+       "privacy_manifest": {"NSPrivacyAccessedAPITypes": [{"NSPrivacyAccessedAPIType": "NSPrivacyAccessedAPICategoryUserDefaults",
+                                                           "NSPrivacyAccessedAPITypeReasons": ["CA92.1"]}]},
+       "signals": {"auth_present": True, "sdk_names": ["AppsFlyer", "FirebaseAuth"], "symbols": ["UIPasteboard", "UserDefaults"],
+                   "symbol_hits": {"UIPasteboard": [{"file": "A.swift", "line": 3}, {"file": "B.swift", "line": 9}],
+                                   "UserDefaults": [{"file": "A.swift", "line": 12}]}}}
+ANDROID = {"platform": "android", "permissions": ["android.permission.CAMERA", "android.permission.INTERNET"], "targetsdk": 33, "deps": []}
+
+@pytest.mark.parametrize("fmt", ["json", "compact", "msgpack"])
+def test_facts_and_reports_round_trip(fmt):
+    if fmt == "msgpack":
+        pytest.importorskip("msgpack")
+    for facts in (IOS, ANDROID, {"platform": "other", "x": ["y"]}):
+        assert loads(dumps(facts, "facts", fmt)) == facts
+    report = evaluate_rules([IOS, ANDROID], load_rules("rules/community.yaml"))
+    assert loads(dumps(report, "report", fmt)) == report
+
+def test_compact_interns_repeated_strings():
+    data = dumps(IOS, "facts", "compact")
+    env = json.loads(data)
+    assert env["apppolicy"] == "facts" and env["schema"] == 1
+    assert env["strings"].count("A.swift") == 1 and data.count(b"A.swift") == 1
+    assert len(data) < len(dumps(IOS, "facts", "json"))
+
+def test_newer_schema_is_rejected():
+    with pytest.raises(ValueError, match="schema 99"):
+        loads(json.dumps({"apppolicy": "facts", "schema": 99, "strings": [], "facts": {}}).encode())
+
+def test_empty_or_truncated_json_is_a_json_error(tmp_path):
+    for data in (b"", b"  \n", b'{"platform": "io', b"garbage"):
+        (tmp_path / "f.json").write_bytes(data)
+        with pytest.raises(ValueError, match=r"f\.json: not a JSON, compact JSON or MessagePack file"):
+            load_facts(tmp_path / "f.json")
+
+def test_cli_formats_are_detected_on_read(tmp_path):
+    (tmp_path / "app/src/main").mkdir(parents=True)
+    (tmp_path / "app/src/main/AndroidManifest.xml").write_text(
+        '<manifest xmlns:android="http://schemas.android.com/apk/res/android">'
+        '<uses-permission android:name="android.permission.ACCESS_BACKGROUND_LOCATION"/></manifest>')
+    cli = [sys.executable, "-m", "apcop.cli"]
+    subprocess.run(cli + ["scan-android", "--project", str(tmp_path), "--out", str(tmp_path / "f.json"), "--format", "compact", "--no-cache"], check=True)
+    subprocess.run(cli + ["evaluate", "--facts", str(tmp_path / "f.json"), "--rules", "rules/community.yaml",
+                          "--out", str(tmp_path / "r.json"), "--format", "compact"], check=True)
+    subprocess.run(cli + ["html", "--report", str(tmp_path / "r.json"), "--out", str(tmp_path / "r.html")], check=True)
+    assert load_facts(tmp_path / "f.json")["permissions"] == ["android.permission.ACCESS_BACKGROUND_LOCATION"]
+    assert "background_location" in (tmp_path / "r.html").read_text()
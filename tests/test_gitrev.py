@@ -0,0 +1,79 @@
+import json, pathlib, shutil, subprocess, sys
+import pytest
+from apcop.android_scan import scan_android
+from apcop.gitrev import scan_rev
+from apcop.ios_scan import scan_ios
+from apcop.timings import Timings
+from helpers import mk_project
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+def _git(repo, *args):
+    return subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args], cwd=repo,
+                          check=True, capture_output=True, text=True).stdout.strip()
+
+def _commit(repo, msg):
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-qm", msg)
+    return _git(repo, "rev-parse", "HEAD")
+
+def _without_git(facts):
+    return {k: v for k, v in facts.items() if k != "git"}
+
+@pytest.fixture
+def repo(tmp_path):
+    _git(tmp_path, "init", "-q")
+    mk_project(tmp_path)
+    (tmp_path / "App/Helpers").mkdir()
+    (tmp_path / "App/Helpers/Defaults.swift").write_text("UserDefaults.standard\n")
+    return tmp_path
+
+def _edit(root):
+    (root / "App/Paste.swift").write_text("// gone\nlet d = FileManager.default.creationDate\n")
+    (root / "App/PrivacyInfo.xcprivacy").unlink()
+    (root / "App/Cam.swift").write_text("AVCaptureDevice.default(for: .video)\n")
+    (root / "android/app/build.gradle").write_text("android { defaultConfig { targetSdkVersion 34 } }\n")
+    (root / "notes.txt").write_text("not scanned\n")
+
+def test_rev_scan_matches_checkout_scan(repo):
+    base = _commit(repo, "base")
+    _edit(repo)   # uncommitted: the work tree now differs from the revision scanned
+    ios, android = scan_rev("ios", repo, "HEAD"), scan_rev("android", repo, base)
+    assert ios["git"]["commit"] == base
+    _git(repo, "stash", "-q", "--include-untracked")
+    assert _without_git(ios) == scan_ios(str(repo))
+    assert _without_git(android) == scan_android(str(repo))
+
+def test_baseline_patch_reads_only_changed_paths(repo):
+    base = _commit(repo, "base")
+    baseline = {p: json.loads(json.dumps(scan_rev(p, repo, base))) for p in ("ios", "android")}
+    _edit(repo)
+    head = _commit(repo, "head")
+    for platform, scan in (("ios", scan_ios), ("android", scan_android)):
+        t = Timings()
+        patched = scan_rev(platform, repo, head, baseline=baseline[platform], timings=t)
+        assert patched == scan_rev(platform, repo, head)
+        assert _without_git(patched) == scan(str(repo))
+        parsed = {f["file"] for f in t.as_dict()["slowest_files"]}
+        assert parsed == ({"App/Paste.swift", "App/Cam.swift"} if platform == "ios" else {"android/app/build.gradle"})
+    with pytest.raises(ValueError, match="token list"):
+        scan_rev("ios", repo, head, tokens=["UIPasteboard"], baseline=baseline["ios"])
+
+def test_project_subdirectory_and_cli(repo):
+    head = _commit(repo, "base")
+    sub = repo / "android"
+    facts = scan_rev("android", sub, "HEAD")
+    assert set(facts["git"]["files"]) == {"app/AndroidManifest.xml", "app/build.gradle"}
+    out = repo.parent / "ios.json"
+    proc = subprocess.run([sys.executable, "-m", "apcop.cli", "scan-ios", "--project", str(repo), "--git-rev", head[:10],
+                           "--out", str(out)], cwd=ROOT, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    assert json.loads(out.read_text())["git"]["commit"] == head
+    proc = subprocess.run([sys.executable, "-m", "apcop.cli", "scan-ios", "--project", str(repo), "--baseline", str(out),
+                           "--out", str(out)], cwd=ROOT, capture_output=True, text=True)
+    assert proc.returncode == 2 and "--baseline needs --git-rev" in proc.stderr
+    proc = subprocess.run([sys.executable, "-m", "apcop.cli", "scan-ios", "--project", str(repo), "--git-rev", "HEAD",
+                           "--jobs", "4", "--no-cache", "--out", str(out)], cwd=ROOT, capture_output=True, text=True)
+    assert proc.returncode == 2 and "--git-rev does not take --jobs, --no-cache" in proc.stderr
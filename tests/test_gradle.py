@@ -0,0 +1,104 @@
+from apcop.android_scan import scan_android
+from apcop.gradle import parse_build_file, parse_catalog
+from apcop.rules import evaluate_rules
+
+CATALOG = """
+[versions]
+targetSdk = "33"
+okhttp = "4.12.0"
+[libraries]
+okhttp = { module = "com.squareup.okhttp3:okhttp", version.ref = "okhttp" }
+appsflyer-core = { group = "com.appsflyer", name = "af-android-sdk", version = "6.12.1" }
+compose-ui = "androidx.compose.ui:ui:1.5.4"
+compose_material = "androidx.compose.material:material:1.5.4"
+[bundles]
+compose = ["compose-ui", "compose-material"]
+[plugins]
+android-application = { id = "com.android.application", version = "8.2.0" }
+"""
+
+APP = """
+plugins {
+    alias(libs.plugins.android.application)
+}
+android {
+    lint { targetSdk = 30 }  // lint's own target, not the app's
+    defaultConfig {
+        // targetSdk = 21
+        targetSdk = libs.versions.targetSdk.get().toInt()
+        minSdk = 24
+    }
+}
+dependencies {
+    implementation(libs.okhttp)
+    implementation(libs.bundles.compose)
+    implementation(project(":core"))
+    testImplementation("junit:junit:4.13.2")
+}
+"""
+
+CORE = """
+apply plugin: 'com.android.library'
+android { defaultConfig { targetSdkVersion 34 } }
+dependencies {
+    api libs.appsflyer.core
+    implementation group: 'com.google.code.gson', name: 'gson', version: '2.9.0'
+}
+"""
+
+def _mk_project(root):
+    (root / "gradle").mkdir()
+    (root / "gradle/libs.versions.toml").write_text(CATALOG)
+    for mod, text in (("app", APP), ("core", CORE)):
+        (root / mod).mkdir()
+        (root / mod / "build.gradle.kts" if mod == "app" else root / mod / "build.gradle").write_text(text)
+    (root / "core/gradle.lockfile").write_text(
+        "com.google.code.gson:gson:2.10.1=releaseRuntimeClasspath\njunit:junit:4.13.2=testRuntimeClasspath\nempty=\n")
+
+def test_parse_build_file_tracks_blocks_and_comments():
+    facts = parse_build_file(APP)
+    assert facts["targetsdk"] == "libs.versions.targetSdk" and facts["minsdk"] == 24
+    assert facts["plugins"] == ["@libs.plugins.android.application"]
+    assert facts["deps"] == [["implementation", "@libs.okhttp"], ["implementation", "@libs.bundles.compose"],
+                             ["implementation", "project::core"], ["testImplementation", "junit:junit:4.13.2"]]
+    assert parse_catalog(CATALOG)["libraries"]["appsflyer.core"] == "com.appsflyer:af-android-sdk:6.12.1"
+
+def test_declarations_in_dependencies_are_not_dependencies():
+    text = """
+dependencies {
+    val x = "a:b:c"
+    def y = "d:e:f"
+    implementation("g:h:1.0")
+    extra = "i:j:k"
+    var z = libs.okhttp
+    implementation project(':lib')
+}
+"""
+    assert parse_build_file(text)["deps"] == [["implementation", "g:h:1.0"], ["implementation", "project::lib"]]
+
+def test_catalog_strings_keep_non_ascii_and_decode_toml_escapes():
+    catalog = parse_catalog('[versions]\nname = "Zoë \\u00e9\\t\\"q\\" \\\\ \\U0001F600"\nlit = \'a\\nb\'\n')
+    assert catalog["versions"] == {"name": 'Zoë é\t"q" \\ \U0001F600', "lit": "a\\nb"}
+
+def test_scan_android_per_module_facts_and_catalog_resolution(tmp_path):
+    _mk_project(tmp_path)
+    facts = scan_android(str(tmp_path))
+    app, core = facts["modules"][":app"], facts["modules"][":core"]
+    assert (app["application"], app["targetsdk"], app["minsdk"], app["projects"]) == (True, 33, 24, [":core"])
+    assert app["deps"] == ["androidx.compose.material:material:1.5.4", "androidx.compose.ui:ui:1.5.4", "com.squareup.okhttp3:okhttp:4.12.0"]
+    # The lockfile's resolved version wins; test-only configurations are left out.
+    assert core["deps"] == ["com.appsflyer:af-android-sdk:6.12.1", "com.google.code.gson:gson:2.10.1"]
+    # targetsdk is the application module's, not the first one found.
+    assert facts["targetsdk"] == 33
+    assert "com.appsflyer:af-android-sdk" in facts["deps"] and "junit:junit" not in facts["deps"]
+
+def test_dep_present_condition(tmp_path):
+    _mk_project(tmp_path)
+    rules = {"version": "t", "rules": [
+        {"id": "af", "platform": "android", "when": {"android.dep.present": "com.appsflyer:*"}, "then": {"require": []}},
+        {"id": "okhttp", "platform": "android", "when": {"android.dep.present": "com.squareup.okhttp3:okhttp"}, "then": {"require": []}},
+        {"id": "none", "platform": "android", "when": {"android.dep.present": "com.facebook.android:*"}, "then": {"require": []}},
+    ]}
+    report = evaluate_rules([scan_android(str(tmp_path))], rules)
+    assert [f["id"] for f in report["findings"]] == ["af", "okhttp"]
+    assert report["findings"][0]["evidence"]["facts_used"] == {"android.deps": ["com.appsflyer:af-android-sdk"]}
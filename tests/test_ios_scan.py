@@ -0,0 +1,40 @@
+import json, plistlib
+from apcop.ios_scan import scan_ios, scan_for_symbols, read_lockfiles
+from apcop.walk import walk_files
+from helpers import mk_ios_project
+
+def test_scan_ios_single_walk(tmp_path):
+    mk_ios_project(tmp_path)
+    facts = scan_ios(str(tmp_path))
+    assert facts["plist_keys"] == ["NSCameraUsageDescription"]
+    assert facts["entitlements"] == {"com.apple.developer.applesignin": ["Default"]}
+    assert facts["privacy_manifest"] == {"NSPrivacyTracking": False}
+    assert facts["signals"]["sdk_names"] == ["AppsFlyer", "firebase-ios-sdk"]
+    assert facts["signals"]["symbols"] == ["UIPasteboard"]
+    assert facts["signals"]["symbol_hits"] == {"UIPasteboard": [{"file": "App/Paste.swift", "line": 1}]}
+
+def test_scan_ios_prune_is_configurable(tmp_path):
+    mk_ios_project(tmp_path)
+    facts = scan_ios(str(tmp_path), prune=())
+    assert facts["plist_keys"] == ["NSCameraUsageDescription", "NSMicrophoneUsageDescription"]
+    assert facts["signals"]["symbols"] == ["AVCaptureDevice", "UIPasteboard"]
+    assert scan_for_symbols(tmp_path, ["AVCaptureDevice"], prune={"DerivedData"}) == []
+    assert read_lockfiles(tmp_path) == ["AppsFlyer", "firebase-ios-sdk"]
+
+def test_walk_files_skips_pruned_dirs(tmp_path):
+    mk_ios_project(tmp_path)
+    names = [e.name for e in walk_files(tmp_path)]
+    assert "Gen.swift" not in names
+    assert names.count("Info.plist") == 1
+
+def test_scan_ios_parallel_matches_sequential(tmp_path):
+    mk_ios_project(tmp_path)
+    for i in range(12):
+        d = tmp_path / f"Pods/Lib{i}"
+        d.mkdir(parents=True)
+        (d / "Info.plist").write_bytes(plistlib.dumps({f"NSLib{i}UsageDescription": "x"}))
+        (d / f"Lib{i}.m").write_text(f"// {i}\n" * i + "[[NSUserDefaults standardUserDefaults] synchronize];\n")
+    seq = scan_ios(str(tmp_path))
+    par = scan_ios(str(tmp_path), jobs=3)
+    assert json.dumps(par, indent=2) == json.dumps(seq, indent=2)
+    assert len(seq["signals"]["symbol_hits"]["NSUserDefaults"]) == 12
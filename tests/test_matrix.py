@@ -0,0 +1,45 @@
+import random
+import pytest
+
+pytest.importorskip("numpy")
+from apcop.matrix import MatrixPlan, evaluate_matrix  # noqa: E402
+from apcop.rules import evaluate_batch, evaluate_rules, load_rules  # noqa: E402
+from helpers import LEAVES, batch_apps, rand_facts, rand_rules  # noqa: E402
+
+UD = "NSPrivacyAccessedAPICategoryUserDefaults"
+EXTRA_LEAVES = [
+    ("android.dep.present", ["com.appsflyer:af-android-sdk", "com.appsflyer:*", "com.google.*"]),
+    ("ios.privacy.api_reason", [f"{UD}: CA92.1", f"{UD}:1C8F.1", "CA92.1"]),
+    ("ios.privacy.api_declared", [UD]),
+    ("exists.true", ["ios.privacy.tracking"]),
+]
+
+def _more_facts(rnd):
+    facts = rand_facts(rnd)
+    for f in facts:
+        if f["platform"] == "android":
+            f["deps"] = rnd.sample(["com.appsflyer:af-android-sdk", "com.google.firebase:firebase-auth", "androidx.core:core"], rnd.randint(0, 3))
+        elif rnd.random() < 0.5:
+            f["privacy"] = {"api_reasons": {UD: rnd.sample(["CA92.1", "1C8F.1"], rnd.randint(0, 2))}, "tracking": rnd.random() < 0.5}
+    return facts
+
+def test_matrix_matches_evaluate_rules():
+    rnd = random.Random(25)
+    for _ in range(40):
+        rules = rand_rules(rnd, 60, LEAVES + EXTRA_LEAVES)
+        apps = [_more_facts(rnd) for _ in range(rnd.randint(1, 30))]
+        for evidence in ("compact", "verbose"):
+            assert evaluate_matrix(apps, rules, evidence) == [evaluate_rules(facts, rules, evidence) for facts in apps]
+
+def test_shared_leaves_and_nodes_become_one_column():
+    cond = {"any": [{"ios.api.uses": "UIPasteboard"}, {"android.targetsdk.lt_policy_min": 34}]}
+    rules = {"version": "t", "rules": [{"id": f"r{i}", "when": cond, "then": {"require": ["android.targetsdk.lt_policy_min: 34"]}}
+                                       for i in range(50)]}
+    mp = MatrixPlan(rules)
+    assert mp.ncols == 6 and len(mp.vocab) == 1 and len(mp.generic) == 2
+    assert len(set(mp.when.tolist())) == 1
+
+def test_evaluate_batch_numpy_engine():
+    rules = load_rules("rules/community.yaml")
+    apps = batch_apps(12)
+    assert list(evaluate_batch(apps, rules, engine="numpy")) == list(evaluate_batch(apps, rules))
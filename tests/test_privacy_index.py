@@ -0,0 +1,49 @@
+import plistlib
+from apcop.ios_scan import privacy_summary, scan_ios
+from apcop.rules import compile_rules, evaluate_rules, index_facts
+
+UD, FT = "NSPrivacyAccessedAPICategoryUserDefaults", "NSPrivacyAccessedAPICategoryFileTimestamp"
+
+def _manifest(api=(), tracking=None, domains=(), data_types=()):
+    m = {"NSPrivacyAccessedAPITypes": [{"NSPrivacyAccessedAPIType": c, "NSPrivacyAccessedAPITypeReasons": list(r)} for c, r in api],
+         "NSPrivacyTrackingDomains": list(domains),
+         "NSPrivacyCollectedDataTypes": [{"NSPrivacyCollectedDataType": t, "NSPrivacyCollectedDataTypeLinked": False} for t in data_types]}
+    if tracking is not None:
+        m["NSPrivacyTracking"] = tracking
+    return m
+
+def test_scan_merges_every_manifest(tmp_path):
+    (tmp_path / "App").mkdir()
+    (tmp_path / "App/PrivacyInfo.xcprivacy").write_bytes(plistlib.dumps(_manifest([(UD, ["CA92.1"])], tracking=False)))
+    for name, m in (("Ads", _manifest([(UD, ["1C8F.1"]), (FT, ["C617.1"])], True, ["ads.example.com"], ["NSPrivacyCollectedDataTypeDeviceID"])),
+                    ("Broken", {"NSPrivacyAccessedAPITypes": "nope", "NSPrivacyTrackingDomains": [1, "t.example.com"]})):
+        (tmp_path / "Pods" / name).mkdir(parents=True)
+        (tmp_path / "Pods" / name / "PrivacyInfo.xcprivacy").write_bytes(plistlib.dumps(m))
+    facts = scan_ios(str(tmp_path))
+    assert facts["privacy"] == {"api_reasons": {FT: ["C617.1"], UD: ["1C8F.1", "CA92.1"]}, "tracking": True,
+                                "tracking_domains": ["ads.example.com", "t.example.com"],
+                                "collected_data_types": ["NSPrivacyCollectedDataTypeDeviceID"]}
+
+def test_exact_privacy_conditions():
+    facts = [{"platform": "ios", "privacy_manifest": {}, "privacy": privacy_summary([
+        _manifest([(UD, ["CA92.1"])]), _manifest([(FT, ["C617.1"])], True, ["ads.example.com"], ["NSPrivacyCollectedDataTypeEmailAddress"])])}]
+    conds = {
+        "ud": {"ios.privacy.api_declared": UD},
+        "ud-reason": {"ios.privacy.api_reason": f"{UD}: CA92.1"},
+        "ud-wrong-reason": {"ios.privacy.api_reason": f"{UD}:C617.1"},
+        "no-category": {"ios.privacy.api_reason": "CA92.1"},
+        "domain": {"ios.privacy.tracking_domain": "ads.example.com"},
+        "email": {"ios.privacy.data_type": "NSPrivacyCollectedDataTypeEmailAddress"},
+        "tracking": {"exists.true": "ios.privacy.tracking"},
+    }
+    rules = {"version": "t", "rules": [{"id": i, "platform": "ios", "when": c} for i, c in conds.items()]}
+    report = evaluate_rules(facts, rules)
+    assert [f["id"] for f in report["findings"]] == ["ud", "ud-reason", "domain", "email", "tracking"]
+    assert report["findings"][1]["evidence"]["facts_used"] == {"ios.privacy.api_reasons": [f"{UD}:CA92.1"]}
+    assert compile_rules(rules).by_key["ios.privacy.api_reasons"] == [1, 2]
+
+def test_facts_without_summary_index_their_manifest():
+    manifest = _manifest([(UD, ["CA92.1"])])
+    idx = index_facts([{"platform": "ios", "privacy_manifest": manifest}])
+    assert idx["ios.privacy.api_reasons"] == {f"{UD}:CA92.1"} and idx["ios.privacy.tracking"] is False
+    assert idx == index_facts([{"platform": "ios", "privacy_manifest": manifest, "privacy": privacy_summary([manifest])}])
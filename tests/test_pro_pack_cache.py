@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip("nacl")
+from nacl import signing, encoding, exceptions  # noqa: E402
+
+from apcop import pro_pack  # noqa: E402
+from helpers import PackServer, pack_bytes  # noqa: E402
+
+@pytest.fixture
+def verify_calls(monkeypatch):
+    calls = []
+    real = pro_pack._verify
+    monkeypatch.setattr(pro_pack, "_verify", lambda *a: (calls.append(a), real(*a)))
+    monkeypatch.setattr(pro_pack, "TRUSTED_PUBKEY_HEX", "")
+    return calls
+
+RULES = [{"id": "android.target_sdk.minimum", "platform": "android", "severity": "blocking",
+          "when": {"all": [{"android.targetsdk.lt_policy_min": 34}]}, "then": {"policy_min": 34, "require": []}}]
+
+def test_conditional_get_reuses_verified_pack(tmp_path, verify_calls):
+    srv = PackServer(pack_bytes(RULES, signing.SigningKey.generate()))
+    try:
+        first = pro_pack.load_rules_pack(srv.url, cache_dir=str(tmp_path))
+        again = pro_pack.load_rules_pack(srv.url, cache_dir=str(tmp_path))
+    finally:
+        srv.close()
+    assert first == again and first["rules"][0]["id"] == "android.target_sdk.minimum"
+    assert srv.requests[1].get("If-None-Match") == '"v1"'
+    assert len(verify_calls) == 1
+
+def test_unchanged_digest_skips_verification_without_etags(tmp_path, verify_calls):
+    srv = PackServer(pack_bytes(RULES, signing.SigningKey.generate()), etags=False)
+    try:
+        pro_pack.load_rules_pack(srv.url, cache_dir=str(tmp_path))
+        pro_pack.load_rules_pack(srv.url, cache_dir=str(tmp_path))
+        srv.body = pack_bytes(RULES + [{"id": "new"}], signing.SigningKey.generate())
+        doc = pro_pack.load_rules_pack(srv.url, cache_dir=str(tmp_path))
+    finally:
+        srv.close()
+    assert len(srv.requests) == 3
+    assert len(verify_calls) == 2
+    assert [r["id"] for r in doc["rules"]] == ["android.target_sdk.minimum", "new"]
+
+def test_offline_mode_uses_cache_only(tmp_path, verify_calls):
+    srv = PackServer(pack_bytes(RULES, signing.SigningKey.generate()))
+    url = srv.url
+    try:
+        online = pro_pack.load_rules_pack(url, cache_dir=str(tmp_path))
+    finally:
+        srv.close()
+    assert pro_pack.load_rules_pack(url, cache_dir=str(tmp_path), offline=True) == online
+    with pytest.raises(RuntimeError):
+        pro_pack.load_rules_pack(url + "?other", cache_dir=str(tmp_path), offline=True)
+
+def test_offline_without_cache_never_downloads(tmp_path, verify_calls):
+    srv = PackServer(pack_bytes(RULES, signing.SigningKey.generate()))
+    try:
+        with pytest.raises(RuntimeError, match="Offline mode"):
+            pro_pack.load_rules_pack(srv.url, cache_dir=str(tmp_path), use_cache=False, offline=True)
+    finally:
+        srv.close()
+    assert srv.requests == []
+
+def test_cached_pack_is_reverified_under_a_new_trusted_key(tmp_path, verify_calls, monkeypatch):
+    srv = PackServer(pack_bytes(RULES, signing.SigningKey.generate()))
+    try:
+        pro_pack.load_rules_pack(srv.url, cache_dir=str(tmp_path))
+        other = signing.SigningKey.generate().verify_key.encode(encoder=encoding.HexEncoder).decode()
+        monkeypatch.setattr(pro_pack, "TRUSTED_PUBKEY_HEX", other)
+        with pytest.raises(exceptions.BadSignatureError):
+            pro_pack.load_rules_pack(srv.url, cache_dir=str(tmp_path), offline=True)
+    finally:
+        srv.close()
@@ -0,0 +1,97 @@
+import io, json, tarfile, tracemalloc
+import pytest
+
+pytest.importorskip("nacl")
+from nacl import signing, encoding, exceptions  # noqa: E402
+
+from apcop import pro_pack  # noqa: E402
+from helpers import PackServer, pack_bytes  # noqa: E402
+
+def _rules(n):
+    return [{"id": f"r{i}", "platform": "android", "severity": "warning", "because": {"note": "x" * 200},
+             "when": {"android.permission.present": f"android.permission.P{i}"}} for i in range(n)]
+
+def _tar(members):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        for name, data in members:
+            ti = tarfile.TarInfo(name); ti.size = len(data); tar.addfile(ti, io.BytesIO(data))
+    return buf.getvalue()
+
+def test_json_stream_matches_json_loads(monkeypatch):
+    monkeypatch.setattr(pro_pack, "CHUNK", 5)   # split numbers, strings and escapes across refills
+    doc = {"version": "t", "rules": [{"n": 12345678901234567890, "f": -1.5e-7, "s": "é€\"\\\n", "l": [1, [2, {}]]},
+                                     3.25, None, True, "x"], "empty": [], "nested": {"a": [1, 2]}, "n": 10000}
+    for text in (json.dumps(doc), json.dumps(doc, indent=3, ensure_ascii=False)):
+        assert pro_pack._load_json(io.BytesIO(text.encode())) == doc
+    for bad in ('{"a": [1 2]}', '{"a": 1} x', '{"a" 1}', '{"a": [1,'):
+        with pytest.raises(json.JSONDecodeError):
+            pro_pack._load_json(io.BytesIO(bad.encode()))
+
+def test_large_pack_memory_stays_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(pro_pack, "TRUSTED_PUBKEY_HEX", "")
+    body = pack_bytes(_rules(40000), signing.SigningKey.generate())
+    size = len(tarfile.open(fileobj=io.BytesIO(body)).extractfile("rules.json").read())
+    assert size > 10 << 20
+    # Peak traced memory per phase, above what was held when the phase began.
+    phases = {}
+    real = pro_pack._verify
+
+    def verify(*a):
+        held, peak = tracemalloc.get_traced_memory()
+        phases["download"] = peak - start
+        tracemalloc.reset_peak()
+        real(*a)
+        phases["verify"] = tracemalloc.get_traced_memory()[1] - held
+        tracemalloc.reset_peak()
+    monkeypatch.setattr(pro_pack, "_verify", verify)
+
+    server = PackServer(body)
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        doc = pro_pack.load_rules_pack(server.url, cache_dir=str(tmp_path))
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        server.close()
+    assert len(doc["rules"]) == 40000
+    # Download, gunzip and spool hold a chunk and the in-memory spool, whatever the pack's size.
+    assert phases["download"] < 4 << 20
+    # PyNaCl verifies one buffer: rules.json read whole, its signature+message copy and the opened message it returns.
+    assert phases["verify"] < 3 * size + (1 << 20)
+    # Parsing holds one chunk or one rule beyond the rules it returns.
+    assert peak - retained < 4 << 20
+
+def test_cached_url_streams_through_spool(tmp_path, monkeypatch):
+    monkeypatch.setattr(pro_pack, "TRUSTED_PUBKEY_HEX", "")
+    server = PackServer(pack_bytes(_rules(50), signing.SigningKey.generate()))
+    try:
+        doc = pro_pack.load_rules_pack(server.url, cache_dir=str(tmp_path))
+        assert [r["id"] for r in doc["rules"]][-1] == "r49"
+        entry = next(tmp_path.iterdir())
+        assert sorted(p.name for p in entry.iterdir()) == ["meta.json", "rules.json"]
+        assert pro_pack.load_rules_pack(server.url, cache_dir=str(tmp_path), offline=True) == doc
+    finally:
+        server.close()
+
+def test_limits_and_missing_members(tmp_path):
+    sk = signing.SigningKey.generate()
+    path = tmp_path / "p.tar.gz"
+    path.write_bytes(pack_bytes(_rules(10), sk))
+    with open(path, "rb") as f, pytest.raises(ValueError, match="limit is 1000"):
+        pro_pack._read_pack(f, io.BytesIO(), max_rules_bytes=1000)
+
+    payload = b'{"rules":[]}'
+    path.write_bytes(_tar([("rules.json", payload), ("SIGNATURE.hex", sk.sign(payload).signature.hex().encode())]))
+    with pytest.raises(ValueError, match="missing PUBLIC_KEY.hex"):
+        pro_pack.load_rules_pack(str(path))
+    path.write_bytes(_tar([("rules.json", payload), ("SIGNATURE.hex", b"00" * 4096),
+                           ("PUBLIC_KEY.hex", sk.verify_key.encode(encoder=encoding.HexEncoder))]))
+    with pytest.raises(ValueError, match="SIGNATURE.hex"):
+        pro_pack.load_rules_pack(str(path))
+    bad = bytearray(sk.sign(payload).signature); bad[0] ^= 1
+    path.write_bytes(_tar([("rules.json", payload), ("SIGNATURE.hex", bad.hex().encode()),
+                           ("PUBLIC_KEY.hex", sk.verify_key.encode(encoder=encoding.HexEncoder))]))
+    with pytest.raises(exceptions.BadSignatureError):
+        pro_pack.load_rules_pack(str(path))
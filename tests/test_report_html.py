@@ -1,5 +1,5 @@
 from apcop.report import render_html
-import re
+import json, re
 
 def test_render_html_groups_and_summary(tmp_path):
     report = {
@@ -44,3 +44,28 @@ def test_render_html_groups_and_summary(tmp_path):
     assert "android.target_sdk.minimum" in html_text
     assert "apple.permissions.camera.usage_description" in html_text
     assert "Target API level" in html_text
+
+def _big_report(n):
+    findings = [{"id": f"rule.{i}", "platform": "ios" if i % 2 else "android", "severity": "advisory",
+                 "because": {"section": f"Section {i}"}, "missing": [f"key{i}"], "status": "warn"} for i in range(n)]
+    return {"summary": {"advisory": n}, "findings": findings}
+
+def test_renderer_reuses_template_and_leaves_findings_alone(tmp_path):
+    from apcop.report import HtmlRenderer
+    report = _big_report(50)
+    snapshot = json.dumps(report, sort_keys=True)
+    renderer = HtmlRenderer(bytecode_cache=str(tmp_path / "bc"))
+    html_text = renderer.render(report)
+    assert html_text == render_html(report) == "".join(renderer.generate(report))
+    assert json.dumps(report, sort_keys=True) == snapshot
+    assert list((tmp_path / "bc").iterdir())  # bytecode written for the next process
+    assert HtmlRenderer(bytecode_cache=str(tmp_path / "bc")).render(report) == html_text
+
+def test_renderer_write_streams_to_file(tmp_path):
+    from apcop.report import HtmlRenderer
+    report = _big_report(5000)
+    out = tmp_path / "big.html"
+    HtmlRenderer().write(report, str(out))
+    text = out.read_text(encoding="utf-8")
+    assert text == render_html(report)
+    assert "rule.4999" in text and text.count('class="card"') == 5000
@@ -0,0 +1,30 @@
+from apcop.rules import evaluate_rules, load_rules
+
+FACTS = [
+    {"platform": "android", "permissions": ["android.permission.ACCESS_BACKGROUND_LOCATION", "android.permission.INTERNET"], "targetsdk": 31},
+    {"platform": "ios", "plist_keys": ["NSCameraUsageDescription"], "privacy_manifest": {},
+     "signals": {"symbols": ["UIImagePickerController", "UIPasteboard"], "sdk_names": ["AppsFlyer", "Alamofire"]}},
+]
+
+def _by_id(report):
+    return {f["id"]: f for f in report["findings"]}
+
+def test_compact_evidence_lists_only_touched_facts():
+    report = evaluate_rules(FACTS, load_rules("rules/community.yaml"))
+    assert report["facts"]["android.permissions"] == ["android.permission.ACCESS_BACKGROUND_LOCATION", "android.permission.INTERNET"]
+    found = _by_id(report)
+    assert found["android.target_sdk.minimum"]["evidence"]["facts_used"] == {"android.targetsdk": 31}
+    assert found["android.permission.background_location.disclosure"]["evidence"]["facts_used"] == {
+        "android.permissions": ["android.permission.ACCESS_BACKGROUND_LOCATION"]}
+    camera = found["apple.permissions.camera.usage_description"]["evidence"]["facts_used"]
+    assert camera == {"ios.symbols": ["UIImagePickerController"], "ios.plist_keys": ["NSCameraUsageDescription"]}
+
+def test_verbose_evidence_keeps_legacy_layout():
+    compact = evaluate_rules(FACTS, load_rules("rules/community.yaml"))
+    verbose = evaluate_rules(FACTS, load_rules("rules/community.yaml"), evidence="verbose")
+    assert "facts" not in verbose
+    assert [f["id"] for f in verbose["findings"]] == [f["id"] for f in compact["findings"]]
+    used = _by_id(verbose)["android.target_sdk.minimum"]["evidence"]["facts_used"]
+    assert set(used) == {"android.permissions", "android.targetsdk", "android.deps"}
+    ios = next(f for f in verbose["findings"] if f["platform"] == "ios")["evidence"]["facts_used"]
+    assert set(ios) == {"ios.plist_keys", "ios.entitlements", "ios.privacy_manifest", "ios.sdk_names", "ios.symbols", "ios.auth_present"}
@@ -0,0 +1,79 @@
+import json, random
+from apcop.rules import compile_rules, evaluate_rules, index_facts
+from helpers import rand_facts, rand_rules
+
+def _reference_match(cond, idx):
+    # The original dict-walking interpreter, kept as an oracle.
+    if "any" in cond:
+        return any(_reference_match(c, idx) for c in cond["any"])
+    if "all" in cond:
+        return all(_reference_match(c, idx) for c in cond["all"])
+    if len(cond.keys()) != 1:
+        return False
+    key, value = next(iter(cond.items()))
+    if key == "ios.api.uses":
+        return value in idx.get("ios.symbols", set())
+    if key == "ios.sdk.present":
+        if str(value).lower() == "any_ads_or_clipboard_sdk":
+            names = ",".join(idx.get("ios.sdk_names", set())).lower()
+            return any(h in names for h in ["adsupport","googlemobileads","appsflyer","adjust","applovin","ironsource","unityads","tiktok"])
+        return value in idx.get("ios.sdk_names", set())
+    if key == "ios.signin.present":
+        return bool(idx.get("ios.auth_present", False))
+    if key == "ios.plist.has":
+        return value in idx.get("ios.plist_keys", set())
+    if key == "ios.privacy.reason":
+        return str(value).lower() in json.dumps(idx.get("ios.privacy_manifest") or {}).lower()
+    if key == "android.permission.present":
+        return value in idx.get("android.permissions", set())
+    if key == "android.targetsdk.lt_policy_min":
+        tsdk = idx.get("android.targetsdk")
+        try:
+            return tsdk is not None and int(tsdk) < int(value)
+        except Exception:
+            return False
+    if key == "exists.true":
+        return bool(idx.get(value, False))
+    return False
+
+def _reference_ids(facts, rules_doc):
+    idx = index_facts(facts)
+    out = []
+    for r in rules_doc["rules"]:
+        if not _reference_match(r.get("when") or {}, idx):
+            continue
+        missing = []
+        for req in r["then"]["require"]:
+            if isinstance(req, str):
+                k, v = [s.strip() for s in req.split(":", 1)] if ":" in req else ("exists.true", req)
+                ok = _reference_match({k: v}, idx)
+            else:
+                ok = _reference_match(req, idx)
+            if not ok:
+                missing.append(req)
+        out.append((r["id"], missing))
+    return out
+
+def test_compiled_matches_reference_interpreter():
+    rnd = random.Random(11)
+    for _ in range(300):
+        rules_doc, facts = rand_rules(rnd), rand_facts(rnd)
+        report = evaluate_rules(facts, rules_doc)
+        assert [(f["id"], f["missing"]) for f in report["findings"]] == _reference_ids(facts, rules_doc)
+
+def test_compiled_plan_is_reusable_and_skips_impossible_rules():
+    rules_doc = {"version": "t", "rules": [
+        {"id": "cam", "platform": "ios", "when": {"any": [{"ios.api.uses": "AVCaptureDevice"}]}, "then": {"require": []}},
+        {"id": "bg", "platform": "android", "when": {"android.permission.present": "android.permission.ACCESS_BACKGROUND_LOCATION"}, "then": {"require": []}},
+        {"id": "always", "platform": "ios", "when": {"all": []}, "then": {"require": ["ios.plist.has: NSCameraUsageDescription"]}},
+    ]}
+    plan = compile_rules(rules_doc)
+    assert compile_rules(plan) is plan
+    assert plan.by_key == {"ios.symbols": [0], "android.permissions": [1]}
+    ios_only = index_facts([{"platform": "ios", "signals": {"symbols": ["AVCaptureDevice"]}}])
+    assert [r.id for r in plan.candidates(ios_only)] == ["cam", "always"]
+    r1 = evaluate_rules([{"platform": "ios", "signals": {"symbols": ["AVCaptureDevice"]}}], plan)
+    r2 = evaluate_rules([{"platform": "android", "permissions": ["android.permission.ACCESS_BACKGROUND_LOCATION"]}], plan)
+    assert [f["id"] for f in r1["findings"]] == ["cam", "always"]
+    assert r1["findings"][1]["missing"] == ["ios.plist.has: NSCameraUsageDescription"]
+    assert [f["id"] for f in r2["findings"]] == ["bg", "always"]
@@ -0,0 +1,114 @@
+import asyncio, http.client, json, socket, threading
+import pytest
+from apcop.android_scan import scan_android
+from apcop.rules import evaluate_rules, load_rules
+from apcop.server import PolicyServer
+
+@pytest.fixture
+def server():
+    app = PolicyServer(workers=1, rules="rules/community.yaml")
+    loop = asyncio.new_event_loop()
+    srv = loop.run_until_complete(app.start("127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield app, srv.sockets[0].getsockname()[1]
+
+    async def shutdown():
+        srv.close()
+        await srv.wait_closed()
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for t in pending:
+            t.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+    app.close()
+
+def _post(conn, path, body):
+    conn.request("POST", path, json.dumps(body), {"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    data = resp.read()
+    return resp.status, data
+
+FACTS = [{"platform": "android", "permissions": ["android.permission.ACCESS_BACKGROUND_LOCATION"], "targetsdk": 31}]
+
+def test_evaluate_and_render_reuse_one_connection(server):
+    app, port = server
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    expected = evaluate_rules(FACTS, load_rules("rules/community.yaml"))
+    for _ in range(3):
+        status, data = _post(conn, "/evaluate", {"facts": FACTS})
+        assert status == 200 and json.loads(data) == expected
+    assert len(app._plans) == 1
+    status, data = _post(conn, "/render", {"report": expected})
+    assert status == 200 and b"android.target_sdk.minimum" in data
+    conn.close()
+
+def test_scan_runs_in_worker_pool(server, tmp_path):
+    _app, port = server
+    (tmp_path / "app").mkdir()
+    (tmp_path / "app/build.gradle").write_text("targetSdkVersion 30\n")
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    status, data = _post(conn, "/scan", {"platform": "android", "project": str(tmp_path), "cache": False})
+    assert status == 200 and json.loads(data) == scan_android(str(tmp_path))
+    conn.close()
+
+def test_errors_are_json(server):
+    _app, port = server
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    assert _post(conn, "/scan", {"platform": "windows"})[0] == 400
+    assert _post(conn, "/nope", {})[0] == 404
+    conn.request("GET", "/health")
+    assert json.loads(conn.getresponse().read())["status"] == "ok"
+    conn.close()
+
+def _raw(port, request):
+    with socket.create_connection(("127.0.0.1", port)) as s:
+        s.sendall(request)
+        return s.makefile("rb").readline()
+
+def test_refuses_foreign_host_origin_and_bad_length(server):
+    _app, port = server
+    assert b" 403 " in _raw(port, b"GET /health HTTP/1.1\r\nHost: evil.example\r\n\r\n")
+    assert b" 403 " in _raw(port, b"GET /health HTTP/1.1\r\nHost: localhost\r\nOrigin: http://localhost\r\n\r\n")
+    assert b" 200 " in _raw(port, b"GET /health HTTP/1.1\r\nHost: localhost:1\r\n\r\n")
+    assert b" 400 " in _raw(port, b"POST /evaluate HTTP/1.1\r\nHost: localhost\r\nContent-Length: abc\r\n\r\n")
+    assert b" 400 " in _raw(port, b"POST /evaluate HTTP/1.1\r\nHost: localhost\r\nContent-Length: -5\r\n\r\n")
+
+def test_slow_plan_load_does_not_block_the_loop(server, monkeypatch):
+    app, port = server
+    release = threading.Event()
+    plan = app.plan
+    monkeypatch.setattr(app, "plan", lambda *a: release.wait(5) and plan(*a))
+    slow = http.client.HTTPConnection("127.0.0.1", port)
+    slow.request("POST", "/evaluate", json.dumps({"facts": FACTS}))
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+    conn.request("GET", "/health")
+    assert json.loads(conn.getresponse().read())["status"] == "ok"
+    release.set()
+    assert slow.getresponse().status == 200
+    slow.close()
+    conn.close()
+
+def test_cold_pack_load_does_not_block_loaded_plans(monkeypatch):
+    from apcop import pro_pack
+    app = PolicyServer(workers=1, rules="rules/community.yaml")
+    release = threading.Event()
+    monkeypatch.setattr(pro_pack, "load_rules_pack", lambda *a, **k: release.wait(5) and {"rules": []})
+    try:
+        rules_plan = app.plan()
+        cold = threading.Thread(target=app.plan, kwargs={"rules_pack": "https://example.invalid/pack.tar.gz"})
+        cold.start()
+        done = []
+        warm = threading.Thread(target=lambda: done.append(app.plan()))
+        warm.start()
+        warm.join(2)
+        assert done == [rules_plan]
+        release.set()
+        cold.join(5)
+        assert len(app._plans) == 2
+    finally:
+        release.set()
+        app.close()
@@ -0,0 +1,61 @@
+import random
+import pytest
+from apcop.symbols import TokenMatcher
+
+@pytest.fixture(params=[32, 0], ids=["linear", "trie"])
+def linear_max(request, monkeypatch):
+    monkeypatch.setattr(TokenMatcher, "linear_max", request.param)
+
+def test_first_line_per_token(linear_max):
+    m = TokenMatcher(["UIPasteboard", "AVCaptureDevice", "UserDefaults"])
+    data = b"import UIKit\nlet a = UIPasteboard.general\n\nUIPasteboard.general.string\nAVCaptureDevice.default()\n"
+    assert m.find(data) == {"UIPasteboard": 2, "AVCaptureDevice": 5}
+
+def test_prefix_and_overlapping_tokens(linear_max):
+    m = TokenMatcher(["UserDefaults", "NSUserDefaults", "abc", "bcd"])
+    assert m.find(b"NSUserDefaults\nabcd") == {"NSUserDefaults": 1, "UserDefaults": 1, "abc": 2, "bcd": 2}
+
+def test_matches_substring_semantics(linear_max):
+    rnd = random.Random(7)
+    alphabet = "abcde.\n"
+    for _ in range(300):
+        tokens = ["".join(rnd.choice("abcde.") for _ in range(rnd.randint(1, 4))) for _ in range(rnd.randint(1, 8))]
+        text = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 60)))
+        found = TokenMatcher(tokens).find(text.encode())
+        assert set(found) == {t for t in tokens if t in text}
+        for t, line in found.items():
+            assert line == text[:text.index(t)].count("\n") + 1
+
+def test_empty_token_list(linear_max):
+    assert TokenMatcher([]).find(b"anything") == {}
+
+def test_stream_chunks_keep_boundary_matches(linear_max):
+    import io
+    rnd = random.Random(3)
+    for _ in range(200):
+        tokens = ["".join(rnd.choice("abcd") for _ in range(rnd.randint(1, 5))) for _ in range(rnd.randint(1, 6))]
+        text = "".join(rnd.choice("abcd.\n") for _ in range(rnd.randint(0, 80)))
+        m = TokenMatcher(tokens)
+        assert m.find_stream(io.BytesIO(text.encode()), chunk_size=rnd.randint(1, 9)) == m.find(text.encode())
+
+def test_ignore_case():
+    m = TokenMatcher(["AppsFlyer", "Adjust"], ignore_case=True)
+    assert m.find(b"PODS:\n  - APPSFLYERframework\n") == {"appsflyer": 2}
+
+def test_find_file_memory_is_bounded(tmp_path):
+    import tracemalloc
+    big = tmp_path / "Generated.swift"
+    line = b"let value = someIdentifier(of: otherIdentifier) + 42\n"
+    with open(big, "wb") as f:
+        for _ in range(9):
+            f.write(line * ((1 << 20) // len(line)))
+        f.write(b"UIPasteboard.general\n")
+    m = TokenMatcher(["UIPasteboard", "UserDefaults"])
+    tracemalloc.start()
+    found = m.find_file(big, chunk_size=1 << 16)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert list(found) == ["UIPasteboard"]
+    assert found["UIPasteboard"] == big.read_bytes().count(b"\n")
+    assert big.stat().st_size > 8 << 20
+    assert peak < 1 << 20
@@ -0,0 +1,45 @@
+import json, pathlib, pstats, subprocess, sys
+from apcop.ios_scan import scan_ios
+from apcop.rules import evaluate_rules
+from apcop.timings import Timings
+from helpers import mk_ios_project
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+def test_scan_and_evaluate_timings(tmp_path):
+    mk_ios_project(tmp_path)
+    (tmp_path / "README.md").write_text("not scanned\n")
+    t = Timings(slowest=2)
+    facts = scan_ios(str(tmp_path), timings=t)
+    assert facts == scan_ios(str(tmp_path))
+    rules = {"version": "t", "rules": [
+        {"id": "cam", "platform": "ios", "when": {"ios.plist.has": "NSCameraUsageDescription"}, "severity": "advisory"},
+        {"id": "and", "platform": "android", "when": {"android.permission.present": "android.permission.CAMERA"}}]}
+    report = evaluate_rules([facts], rules, timings=t)
+    assert report == evaluate_rules([facts], rules)
+
+    out = t.as_dict()
+    assert {"ios.walk", "ios.extract", "ios.aggregate", "evaluate.rules"} <= out["phases"].keys()
+    counts = out["counts"]
+    # App/{Info.plist, App.entitlements, PrivacyInfo.xcprivacy, Paste.swift}, Podfile.lock, Package.resolved + README.md
+    assert counts["files_visited"] == 7 and counts["files_skipped"] == 1 and counts["files_parsed"] == 6
+    assert counts["bytes_read"] == sum(p.stat().st_size for p in tmp_path.rglob("*")
+                                       if p.is_file() and "DerivedData" not in p.parts and p.name != "README.md")
+    assert len(out["slowest_files"]) == 2
+    assert [r["id"] for r in out["rules"]] == ["cam"] and counts["rules_skipped"] == 1
+
+def test_cached_files_are_not_counted_as_parsed(tmp_path):
+    mk_ios_project(tmp_path)
+    scan_ios(str(tmp_path), cache_dir=str(tmp_path / "c"))
+    t = Timings()
+    scan_ios(str(tmp_path), cache_dir=str(tmp_path / "c"), timings=t)
+    assert t.counts["files_cached"] == 6 and "files_parsed" not in t.counts
+
+def test_cli_timings_and_profile(tmp_path):
+    mk_ios_project(tmp_path)
+    subprocess.run([sys.executable, "-m", "apcop.cli", "scan-ios", "--project", str(tmp_path), "--out", str(tmp_path / "f.json"),
+                    "--no-cache", "--timings", str(tmp_path / "t.json"), "--profile", str(tmp_path / "scan.prof")],
+                   cwd=ROOT, check=True, capture_output=True)
+    timings = json.loads((tmp_path / "t.json").read_text())
+    assert timings["counts"]["files_parsed"] == 6
+    assert pstats.Stats(str(tmp_path / "scan.prof")).total_calls > 0
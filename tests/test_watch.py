@@ -0,0 +1,90 @@
+import random, sys, time
+import pytest
+from apcop.android_scan import scan_android
+from apcop.ios_scan import scan_ios
+from apcop.rules import LiveEvaluation, evaluate_rules, load_rules
+from apcop.watch import InotifyWatcher, LiveProject, PollWatcher
+from helpers import rand_facts, rand_rules
+
+MANIFEST = """<manifest xmlns:android="http://schemas.android.com/apk/res/android">
+  <uses-permission android:name="{}"/>
+</manifest>"""
+
+def test_live_evaluation_matches_full_evaluation():
+    rnd = random.Random(5)
+    for evidence in ("compact", "verbose"):
+        for _ in range(40):
+            rules_doc = rand_rules(rnd)
+            facts = rand_facts(rnd)
+            live = LiveEvaluation(facts, rules_doc, evidence)
+            for _ in range(8):
+                before = {f["id"]: f for f in live.report()["findings"]}
+                facts = rand_facts(rnd)
+                diff = live.update(facts)
+                expected = evaluate_rules(facts, rules_doc, evidence)
+                assert live.report() == expected
+                after = {f["id"]: f for f in expected["findings"]}
+                assert [f["id"] for f in diff["added"]] == [i for i in after if i not in before]
+                assert [f["id"] for f in diff["removed"]] == [i for i in before if i not in after]
+                assert [f["id"] for f in diff["changed"]] == [i for i in after if i in before and after[i] != before[i]]
+
+def test_live_project_patches_changed_files(tmp_path):
+    (tmp_path / "app/src/main").mkdir(parents=True)
+    manifest = tmp_path / "app/src/main/AndroidManifest.xml"
+    manifest.write_text(MANIFEST.format("android.permission.INTERNET"))
+    (tmp_path / "app/build.gradle").write_text("targetSdkVersion 34\n")
+    rules = load_rules("rules/community.yaml")
+    live = LiveProject(tmp_path, rules)
+    assert list(live.states) == ["android"] and live.report()["findings"] == []
+
+    manifest.write_text(MANIFEST.format("android.permission.ACCESS_BACKGROUND_LOCATION"))
+    diff = live.apply(["app/src/main/AndroidManifest.xml"])
+    assert [f["id"] for f in diff["added"]] == ["android.permission.background_location.disclosure"]
+    assert live.apply(["app/src/main/AndroidManifest.xml"]) is None  # unchanged content
+
+    (tmp_path / "lib").mkdir()
+    (tmp_path / "lib/build.gradle").write_text("targetSdkVersion 30\n")
+    (tmp_path / "app/build.gradle").unlink()
+    diff = live.apply(["lib", "app/build.gradle"])
+    assert [f["id"] for f in diff["added"]] == ["android.target_sdk.minimum"]
+    assert live.report() == evaluate_rules([scan_android(str(tmp_path))], rules)
+
+def test_live_project_tracks_ios_sources(tmp_path):
+    (tmp_path / "Sources").mkdir()
+    (tmp_path / "Info.plist").write_bytes(b'<?xml version="1.0"?><plist version="1.0"><dict/></plist>')
+    src = tmp_path / "Sources/Camera.swift"
+    src.write_text("let x = 1\n")
+    rules = load_rules("rules/community.yaml")
+    live = LiveProject(tmp_path, rules, platforms=["ios"])
+    src.write_text("let s = AVCaptureDevice.default(for: .video)\n")
+    diff = live.apply(["Sources/Camera.swift"])
+    assert [f["id"] for f in diff["added"]] == ["apple.permissions.camera.usage_description"]
+    assert live.report() == evaluate_rules([scan_ios(str(tmp_path))], rules)
+
+def _wait_for(watcher, want):
+    seen, deadline = set(), time.monotonic() + 5
+    while not want <= seen and time.monotonic() < deadline:
+        seen |= watcher.wait(0.5) or set()
+    return seen
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+def test_inotify_watcher_reports_files_and_new_dirs(tmp_path):
+    (tmp_path / "build").mkdir()
+    w = InotifyWatcher(tmp_path, prune={"build"})
+    try:
+        (tmp_path / "build/AndroidManifest.xml").write_text("x")
+        (tmp_path / "AndroidManifest.xml").write_text("x")
+        assert _wait_for(w, {"AndroidManifest.xml"}) == {"AndroidManifest.xml"}
+        (tmp_path / "feature").mkdir()
+        assert "feature" in _wait_for(w, {"feature"})
+        (tmp_path / "feature/build.gradle").write_text("x")
+        assert "feature/build.gradle" in _wait_for(w, {"feature/build.gradle"})
+    finally:
+        w.close()
+
+def test_poll_watcher_reports_changed_files(tmp_path):
+    (tmp_path / "build.gradle").write_text("targetSdkVersion 33\n")
+    w = PollWatcher(tmp_path, interesting=lambda name: name.endswith(".gradle"), interval=0.01)
+    (tmp_path / "build.gradle").write_text("targetSdkVersion 34  \n")
+    (tmp_path / "notes.txt").write_text("ignored")
+    assert w.wait(1) == {"build.gradle"}